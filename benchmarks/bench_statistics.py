@@ -0,0 +1,56 @@
+"""
+Benchmarks de escala do StatisticsGenerator (1k a 1M linhas).
+
+    python -m pytest benchmarks/bench_statistics.py --bench-sizes 1000,10000
+    python -m pytest benchmarks/bench_statistics.py -k summary --bench-compare main
+"""
+
+import pytest
+
+from benchmarks.synthetic import generate_records
+from src.statistics import StatisticsGenerator
+
+CHARTS = [
+    'gastos_por_categoria',
+    'tipo_pagamento_mais_usado',
+    'investimentos_por_categoria',
+    'total_gasto_mes',
+    'gastos_por_dia',
+    'fluxo_financeiro',
+    'evolucao_patrimonio',
+]
+
+
+@pytest.fixture(scope='session')
+def records(size):
+    return generate_records(size)
+
+
+@pytest.fixture(scope='session')
+def generator(records):
+    return StatisticsGenerator(records)
+
+
+def test_init(benchmark, records):
+    stats = benchmark(StatisticsGenerator, records)
+
+    assert len(stats.df) == len(records)
+
+
+@pytest.mark.parametrize('chart', CHARTS)
+def test_chart(benchmark, generator, chart):
+    buffer = benchmark(getattr(generator, chart))
+
+    assert buffer is not None
+
+
+def test_generate_all_statistics(benchmark, generator):
+    charts = benchmark(generator.generate_all_statistics)
+
+    assert len(charts) == len(CHARTS)
+
+
+def test_get_summary_text(benchmark, generator):
+    summary = benchmark(generator.get_summary_text)
+
+    assert "RESUMO FINANCEIRO PESSOAL" in summary
@@ -0,0 +1,179 @@
+"""
+Infraestrutura dos benchmarks em pytest, no estilo do pytest-benchmark.
+
+Os testes recebem a fixture `benchmark`, que mede tempo de parede, pico de
+RSS e bytes de PNG gerados. Os resultados podem ser salvos como baseline em
+benchmarks/baselines/<nome>.json e comparados em execuções futuras:
+
+    python -m pytest benchmarks/bench_statistics.py --bench-sizes 1000,10000 --bench-save main
+    python -m pytest benchmarks/bench_statistics.py --bench-compare main
+"""
+
+import io
+import json
+import os
+import platform
+import resource
+import sys
+import threading
+import time
+from datetime import datetime
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+BASELINES_DIR = os.path.join(os.path.dirname(__file__), 'baselines')
+
+_results = {}
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup('bench', 'benchmarks do bot')
+    group.addoption('--bench-sizes', default='1000,10000,100000,1000000',
+                    help="tamanhos do histórico (linhas), separados por vírgula")
+    group.addoption('--bench-rounds', type=int, default=1,
+                    help="repetições por medição (o menor tempo é reportado)")
+    group.addoption('--bench-save', default=None, help="salva os resultados como baseline com este nome")
+    group.addoption('--bench-compare', default=None, help="compara com a baseline com este nome")
+
+
+def pytest_generate_tests(metafunc):
+    if 'size' in metafunc.fixturenames:
+        sizes = [int(s) for s in metafunc.config.getoption('--bench-sizes').split(',') if s]
+        metafunc.parametrize('size', sizes, ids=[f'{s}rows' for s in sizes], scope='session')
+
+
+@pytest.hookimpl(trylast=True)
+def pytest_collection_modifyitems(items):
+    # Roda um tamanho por vez, para gerar cada histórico sintético uma única vez
+    def size_of(item):
+        callspec = getattr(item, 'callspec', None)
+        return callspec.params.get('size', 0) if callspec else 0
+
+    items.sort(key=size_of)
+
+
+def _rss_bytes():
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        # ru_maxrss é em KB no Linux; sem /proc só temos o pico do processo
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class _PeakRSS:
+    """Amostra o RSS em uma thread enquanto a função medida executa"""
+
+    def __init__(self, interval=0.002):
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+
+    def __enter__(self):
+        self.start = self.peak = _rss_bytes()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+        return self
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, _rss_bytes())
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, _rss_bytes())
+
+
+def _png_bytes(result):
+    if isinstance(result, io.BytesIO):
+        return len(result.getbuffer())
+    if isinstance(result, dict):
+        return sum(_png_bytes(v) for v in result.values())
+    return 0
+
+
+class Benchmark:
+    def __init__(self, name, rounds):
+        self.name = name
+        self.rounds = rounds
+        self.stats = None
+
+    def __call__(self, func, *args, **kwargs):
+        times = []
+        peak = start_rss = 0
+        result = None
+        for _ in range(self.rounds):
+            with _PeakRSS() as rss:
+                started = time.perf_counter()
+                result = func(*args, **kwargs)
+                times.append(time.perf_counter() - started)
+            peak = max(peak, rss.peak)
+            start_rss = rss.start
+
+        self.stats = {
+            'wall_s': min(times),
+            'mean_s': sum(times) / len(times),
+            'peak_rss_mb': peak / 2 ** 20,
+            'rss_delta_mb': (peak - start_rss) / 2 ** 20,
+            'png_bytes': _png_bytes(result),
+        }
+        _results[self.name] = self.stats
+        return result
+
+
+@pytest.fixture
+def benchmark(request):
+    return Benchmark(request.node.name, request.config.getoption('--bench-rounds'))
+
+
+def _baseline_path(name):
+    return os.path.join(BASELINES_DIR, f'{name}.json')
+
+
+def _load_baseline(name):
+    try:
+        with open(_baseline_path(name)) as f:
+            return json.load(f)['results']
+    except (OSError, ValueError, KeyError):
+        return {}
+
+
+def pytest_terminal_summary(terminalreporter, config):
+    if not _results:
+        return
+
+    compare_name = config.getoption('--bench-compare')
+    baseline = _load_baseline(compare_name) if compare_name else {}
+
+    write = terminalreporter.write_line
+    terminalreporter.section('benchmarks')
+    header = f"{'medição':<58}{'tempo (s)':>11}{'pico RSS MB':>13}{'Δ RSS MB':>10}{'PNG KB':>9}"
+    if baseline:
+        header += f"{'vs ' + compare_name:>14}"
+    write(header)
+
+    for name, stats in _results.items():
+        line = (f"{name:<58}{stats['wall_s']:>11.4f}{stats['peak_rss_mb']:>13.1f}"
+                f"{stats['rss_delta_mb']:>10.1f}{stats['png_bytes'] / 1024:>9.1f}")
+        previous = baseline.get(name)
+        if previous and previous['wall_s']:
+            change = (stats['wall_s'] - previous['wall_s']) / previous['wall_s']
+            line += f"{change:>+14.1%}"
+        write(line)
+
+    save_name = config.getoption('--bench-save')
+    if save_name:
+        os.makedirs(BASELINES_DIR, exist_ok=True)
+        existing = _load_baseline(save_name)
+        existing.update(_results)
+        with open(_baseline_path(save_name), 'w') as f:
+            json.dump({
+                'created': datetime.now().isoformat(timespec='seconds'),
+                'python': platform.python_version(),
+                'machine': platform.platform(),
+                'results': existing,
+            }, f, indent=2, sort_keys=True)
+        write(f"Baseline salva em {_baseline_path(save_name)}")
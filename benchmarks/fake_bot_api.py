@@ -0,0 +1,129 @@
+"""
+Bot API falsa do Telegram para benchmarks locais.
+
+Responde aos métodos que o bot usa (getMe, sendMessage, sendPhoto, ...) sem
+sair da máquina e guarda as respostas enviadas por chat, para o load test
+identificar erros reportados pelo bot ao usuário.
+"""
+
+import json
+import threading
+import time
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+BOT_USER = {
+    'id': 1,
+    'is_bot': True,
+    'first_name': 'FinanceBench',
+    'username': 'finance_bench_bot',
+    'can_join_groups': False,
+    'can_read_all_group_messages': False,
+    'supports_inline_queries': False
+}
+
+
+class FakeBotAPI:
+    def __init__(self, host='127.0.0.1', port=0, latency=0.0):
+        self.latency = latency
+        self.calls = defaultdict(int)
+        self.replies = defaultdict(list)
+        self.bytes_received = 0
+        self._lock = threading.Lock()
+        self._message_id = 0
+
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                api._handle(self)
+
+            do_GET = do_POST
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}/bot"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def replies_for(self, chat_id, since=0):
+        with self._lock:
+            return list(self.replies[chat_id][since:])
+
+    def reply_count(self, chat_id):
+        with self._lock:
+            return len(self.replies[chat_id])
+
+    def _parse_params(self, handler, body):
+        content_type = handler.headers.get('Content-Type', '')
+        if 'application/json' in content_type:
+            return json.loads(body or b'{}')
+        if 'application/x-www-form-urlencoded' in content_type:
+            return {k: v[0] for k, v in parse_qs(body.decode()).items()}
+        if 'multipart/form-data' in content_type:
+            # Só precisamos do chat_id e da legenda; o PNG é descartado
+            params = {}
+            for part in body.split(b'--'):
+                for name in (b'chat_id', b'caption', b'text'):
+                    marker = b'name="' + name + b'"'
+                    if marker in part:
+                        value = part.split(b'\r\n\r\n', 1)[-1].rstrip(b'\r\n-')
+                        params[name.decode()] = value.decode(errors='replace')
+            return params
+        return {}
+
+    def _handle(self, handler):
+        length = int(handler.headers.get('Content-Length') or 0)
+        body = handler.rfile.read(length) if length else b''
+        method = handler.path.rstrip('/').rsplit('/', 1)[-1]
+        params = self._parse_params(handler, body)
+
+        if self.latency:
+            time.sleep(self.latency)
+
+        with self._lock:
+            self.calls[method] += 1
+            self.bytes_received += len(body)
+            result = self._result(method, params)
+
+        payload = json.dumps({'ok': True, 'result': result}).encode()
+        handler.send_response(200)
+        handler.send_header('Content-Type', 'application/json')
+        handler.send_header('Content-Length', str(len(payload)))
+        handler.end_headers()
+        handler.wfile.write(payload)
+
+    def _result(self, method, params):
+        if method == 'getMe':
+            return BOT_USER
+        if method in ('sendMessage', 'sendPhoto', 'sendDocument'):
+            self._message_id += 1
+            chat_id = int(params.get('chat_id', 0))
+            text = params.get('text') or params.get('caption') or ''
+            self.replies[chat_id].append((method, text))
+            message = {
+                'message_id': self._message_id,
+                'date': int(time.time()),
+                'chat': {'id': chat_id, 'type': 'private'},
+                'from': BOT_USER,
+            }
+            if method == 'sendMessage':
+                message['text'] = text
+            return message
+        return True
@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+"""
+Load test do endpoint /webhook.
+
+Gera updates sintéticos do Telegram e faz POST no /webhook a uma taxa e
+concorrência configuráveis. Por padrão sobe tudo localmente: uma Bot API
+falsa, o servidor webhook de src/webhook_server.py e o armazenamento em
+memória. Ao final mostra throughput, latência p50/p95/p99 e taxa de erro por
+comando.
+
+Uso:
+    python -m benchmarks.load_test --rate 20 --concurrency 8 --duration 30
+    python -m benchmarks.load_test --mix despesa=80,statistics=5,start=15
+    python -m benchmarks.load_test --target http://localhost:8080/webhook
+"""
+
+import argparse
+import json
+import os
+import queue
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from benchmarks.synthetic import COMMANDS, command_text, make_update
+
+DEFAULT_MIX = 'despesa=70,credito=8,investimento=8,start=10,statistics=4'
+
+
+def parse_mix(spec):
+    mix = {}
+    for item in spec.split(','):
+        command, _, weight = item.partition('=')
+        command = command.strip()
+        if command not in COMMANDS:
+            raise ValueError(f"Comando desconhecido no mix: {command}")
+        mix[command] = float(weight or 1)
+    return mix
+
+
+def percentile(values, p):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(int(round(p / 100 * len(ordered) + 0.5)) - 1, 0)
+    return ordered[min(index, len(ordered) - 1)]
+
+
+class LocalStack:
+    """Bot API falsa + servidor webhook com armazenamento em memória"""
+
+    def __init__(self, api_latency=0.0):
+        from benchmarks.fake_bot_api import FakeBotAPI
+
+        self.api = FakeBotAPI(latency=api_latency).start()
+        os.environ['TELEGRAM_BOT_TOKEN'] = '123456:BENCHMARK'
+        os.environ['TELEGRAM_API_URL'] = self.api.base_url
+        os.environ.pop('RENDER', None)
+        # O load test mede o processamento, não as cotas e cooldowns por usuário
+        os.environ.setdefault('TENANT_WRITES_PER_MINUTE', '1000000')
+        os.environ.setdefault('TENANT_WRITE_BURST', '1000000')
+        os.environ.setdefault('STATISTICS_COOLDOWN', '0')
+        # Orçamentos, recorrentes, cópias e snapshot vão para um diretório temporário,
+        # não para o DATA_DIR real; cada execução começa sem o estado da anterior
+        self.data_dir = tempfile.mkdtemp(prefix='load-test-')
+        os.environ['DATA_DIR'] = self.data_dir
+        os.environ.setdefault('SNAPSHOT_PATH', os.path.join(self.data_dir, 'warm_state.json.gz'))
+
+        from src.storage import configure_storage, InMemoryStorage
+        configure_storage(InMemoryStorage())
+
+        from werkzeug.serving import make_server
+        from src import webhook_server
+
+        webhook_server.telegram_app = webhook_server.create_telegram_app()
+        threading.Thread(target=webhook_server.run_async_loop, daemon=True).start()
+        self._wait_until_running(webhook_server)
+
+        self.server = make_server('127.0.0.1', 0, webhook_server.app, threaded=True)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f"http://127.0.0.1:{self.server.server_port}/webhook"
+
+    def _wait_until_running(self, webhook_server, timeout=30):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if webhook_server.telegram_app.running and webhook_server.loop.is_running():
+                return
+            time.sleep(0.05)
+        raise RuntimeError("A aplicação do Telegram não inicializou a tempo")
+
+    def stop(self):
+        self.server.shutdown()
+        self.api.stop()
+        shutil.rmtree(self.data_dir, ignore_errors=True)
+
+
+class LoadTest:
+    def __init__(self, url, rate, concurrency, duration, mix, users, seed, api=None, timeout=120):
+        self.url = url
+        self.rate = rate
+        self.concurrency = concurrency
+        self.duration = duration
+        self.mix = mix
+        self.api = api
+        self.timeout = timeout
+        self.rng = random.Random(seed)
+        self.free_users = queue.Queue()
+        for user_id in range(100001, 100001 + users):
+            self.free_users.put(user_id)
+
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self._lock = threading.Lock()
+        self._update_id = 0
+        self._session = requests.Session()
+        self._session.mount('http://', requests.adapters.HTTPAdapter(pool_maxsize=concurrency))
+
+    def _next_update_id(self):
+        with self._lock:
+            self._update_id += 1
+            return self._update_id
+
+    def _send(self, command, text):
+        # Cada usuário tem no máximo uma requisição em andamento, então as
+        # respostas da Bot API falsa para o chat pertencem a esta requisição
+        user_id = self.free_users.get()
+        try:
+            update = make_update(self._next_update_id(), user_id, text)
+            replies_before = self.api.reply_count(user_id) if self.api else 0
+
+            started = time.perf_counter()
+            failed = False
+            try:
+                response = self._session.post(self.url, json=update, timeout=self.timeout)
+                failed = response.status_code != 200 or response.json().get('status') != 'ok'
+            except requests.RequestException:
+                failed = True
+            elapsed = time.perf_counter() - started
+
+            if self.api and not failed:
+                replies = self.api.replies_for(user_id, replies_before)
+                failed = any(text.startswith('❌') for _, text in replies)
+
+            with self._lock:
+                self.latencies[command].append(elapsed)
+                if failed:
+                    self.errors[command] += 1
+        finally:
+            self.free_users.put(user_id)
+
+    def run(self):
+        commands = list(self.mix)
+        weights = [self.mix[c] for c in commands]
+        interval = 1.0 / self.rate if self.rate else 0
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            sent = 0
+            while time.perf_counter() - started < self.duration:
+                command = self.rng.choices(commands, weights)[0]
+                pool.submit(self._send, command, command_text(command, self.rng))
+                sent += 1
+                if interval:
+                    next_at = started + sent * interval
+                    time.sleep(max(next_at - time.perf_counter(), 0))
+        self.elapsed = time.perf_counter() - started
+        return self.report()
+
+    def report(self):
+        result = {'elapsed_s': round(self.elapsed, 3), 'commands': {}}
+        total = 0
+        total_errors = 0
+        for command, latencies in sorted(self.latencies.items()):
+            count = len(latencies)
+            errors = self.errors[command]
+            total += count
+            total_errors += errors
+            result['commands'][command] = {
+                'requests': count,
+                'throughput_rps': round(count / self.elapsed, 2),
+                'p50_ms': round(percentile(latencies, 50) * 1000, 1),
+                'p95_ms': round(percentile(latencies, 95) * 1000, 1),
+                'p99_ms': round(percentile(latencies, 99) * 1000, 1),
+                'max_ms': round(max(latencies) * 1000, 1),
+                'error_rate': round(errors / count, 4),
+            }
+        result['requests'] = total
+        result['throughput_rps'] = round(total / self.elapsed, 2) if self.elapsed else 0
+        result['error_rate'] = round(total_errors / total, 4) if total else 0
+        return result
+
+
+def print_report(result):
+    print(f"\n{'comando':<14}{'reqs':>7}{'req/s':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}{'erros':>8}")
+    for command, row in result['commands'].items():
+        print(f"{command:<14}{row['requests']:>7}{row['throughput_rps']:>9}{row['p50_ms']:>10}"
+              f"{row['p95_ms']:>10}{row['p99_ms']:>10}{row['max_ms']:>10}{row['error_rate']:>8.1%}")
+    print(f"\nTotal: {result['requests']} requisições em {result['elapsed_s']}s "
+          f"({result['throughput_rps']} req/s), erro {result['error_rate']:.1%}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load test do webhook do bot")
+    parser.add_argument('--rate', type=float, default=10, help="requisições por segundo (0 = sem limite)")
+    parser.add_argument('--concurrency', type=int, default=4, help="requisições simultâneas")
+    parser.add_argument('--duration', type=float, default=10, help="duração em segundos")
+    parser.add_argument('--users', type=int, default=20, help="usuários sintéticos distintos")
+    parser.add_argument('--mix', default=DEFAULT_MIX, help="pesos por comando, ex.: despesa=80,statistics=5")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--target', help="URL de um /webhook já em execução (não sobe a stack local)")
+    parser.add_argument('--api-latency', type=float, default=0.0, help="latência artificial da Bot API falsa (s)")
+    parser.add_argument('--json', dest='json_path', help="salva o relatório em JSON neste caminho")
+    args = parser.parse_args(argv)
+
+    stack = None
+    if args.target:
+        url, api = args.target, None
+    else:
+        stack = LocalStack(api_latency=args.api_latency)
+        url, api = stack.url, stack.api
+
+    try:
+        test = LoadTest(url, args.rate, args.concurrency, args.duration, parse_mix(args.mix),
+                        args.users, args.seed, api=api)
+        result = test.run()
+    finally:
+        if stack:
+            stack.stop()
+
+    print_report(result)
+    if args.json_path:
+        with open(args.json_path, 'w') as f:
+            json.dump(result, f, indent=2)
+    return result
+
+
+if __name__ == '__main__':
+    main()
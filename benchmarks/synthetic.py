@@ -0,0 +1,132 @@
+"""
+Geradores de dados sintéticos para os benchmarks.
+
+Produz mensagens e updates do Telegram no mesmo formato que o bot recebe em
+produção e linhas de transações no formato da planilha.
+"""
+
+import random
+import time
+from datetime import datetime, timedelta
+
+CATEGORIAS = [
+    'Alimentação', 'Transporte', 'Lazer', 'Saúde', 'Moradia',
+    'Educação', 'Vestuário', 'Assinaturas', 'Pets', 'Presentes'
+]
+
+PAGAMENTOS = ['Cartão Visa', 'Cartão Débito', 'Pix', 'Dinheiro', 'Boleto', 'Cartão Master']
+
+DESCRICOES = {
+    'Alimentação': ['supermercado', 'restaurante', 'padaria', 'ifood', 'feira'],
+    'Transporte': ['uber', 'gasolina', 'metrô', 'estacionamento', '99'],
+    'Lazer': ['cinema', 'show', 'bar', 'viagem', 'jogo'],
+    'Saúde': ['farmácia', 'consulta', 'academia', 'exame'],
+    'Moradia': ['aluguel', 'condomínio', 'luz', 'internet', 'água'],
+    'Educação': ['curso', 'livro', 'faculdade'],
+    'Vestuário': ['roupa', 'tênis', 'lavanderia'],
+    'Assinaturas': ['netflix', 'spotify', 'nuvem'],
+    'Pets': ['ração', 'veterinário', 'banho'],
+    'Presentes': ['aniversário', 'natal', 'casamento'],
+}
+
+INVESTIMENTOS = ['Renda Fixa', 'Tesouro Direto', 'Ações', 'CDB', 'Fundos Imobiliários']
+
+COMMANDS = ['despesa', 'credito', 'investimento', 'statistics', 'start', 'clearTable']
+
+
+def _valor(rng, low, high):
+    return f"{rng.uniform(low, high):.2f}".replace('.', rng.choice(['.', ',']))
+
+
+def expense_text(rng):
+    categoria = rng.choice(CATEGORIAS)
+    return (f"{_valor(rng, 2, 400)} - {rng.choice(PAGAMENTOS)} - "
+            f"{categoria} ({rng.choice(DESCRICOES[categoria])})")
+
+
+def credit_text(rng):
+    return f"{_valor(rng, 500, 8000)} - credito"
+
+
+def investment_text(rng):
+    return f"{_valor(rng, 50, 3000)} - investimento - {rng.choice(INVESTIMENTOS)}"
+
+
+def command_text(command, rng):
+    """Texto da mensagem para um tipo de comando do benchmark"""
+    if command == 'despesa':
+        return expense_text(rng)
+    if command == 'credito':
+        return credit_text(rng)
+    if command == 'investimento':
+        return investment_text(rng)
+    return f"/{command}"
+
+
+def make_update(update_id, user_id, text, date=None):
+    """Monta o JSON de um update de mensagem privada como o Telegram envia"""
+    user = {
+        'id': user_id,
+        'is_bot': False,
+        'first_name': f'Usuario{user_id}',
+        'username': f'usuario{user_id}',
+        'language_code': 'pt-br'
+    }
+    message = {
+        'message_id': update_id,
+        'from': user,
+        'chat': {
+            'id': user_id,
+            'first_name': user['first_name'],
+            'username': user['username'],
+            'type': 'private'
+        },
+        'date': int(date or time.time()),
+        'text': text
+    }
+    if text.startswith('/'):
+        message['entities'] = [{
+            'offset': 0,
+            'length': len(text.split()[0]),
+            'type': 'bot_command'
+        }]
+    return {'update_id': update_id, 'message': message}
+
+
+def generate_rows(n, seed=42, end=None, days=365 * 3):
+    """
+    Gera n linhas de transações (formato da planilha) distribuídas ao longo de
+    `days` dias até `end`, em ordem cronológica.
+    """
+    rng = random.Random(seed)
+    end = end or datetime(2024, 12, 31, 23, 59, 59)
+    start = end - timedelta(days=days)
+    span = int((end - start).total_seconds())
+    offsets = sorted(rng.randrange(span) for _ in range(n))
+
+    rows = []
+    for offset in offsets:
+        data_hora = (start + timedelta(seconds=offset)).strftime('%d/%m/%Y %H:%M:%S')
+        kind = rng.random()
+        if kind < 0.85:
+            categoria = rng.choice(CATEGORIAS)
+            rows.append([
+                data_hora, round(rng.uniform(2, 400), 2),
+                rng.choice(PAGAMENTOS).lower().replace(' ', ''),
+                categoria.lower().replace(' ', ''),
+                rng.choice(DESCRICOES[categoria]), '', '', ''
+            ])
+        elif kind < 0.93:
+            rows.append([data_hora, '', '', '', '', round(rng.uniform(500, 8000), 2), '', ''])
+        else:
+            rows.append([
+                data_hora, '', '', '', '', '', round(rng.uniform(50, 3000), 2),
+                rng.choice(INVESTIMENTOS).lower().replace(' ', '')
+            ])
+    return rows
+
+
+def generate_records(n, seed=42, **kwargs):
+    """Mesmo que generate_rows, mas no formato de get_all_records()"""
+    from src.storage import HEADERS
+    return [dict(zip(HEADERS, row)) for row in generate_rows(n, seed=seed, **kwargs)]
@@ -5,7 +5,16 @@ import os
 
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-if os.getenv('RENDER') == 'true' and os.getenv('RENDER_EXTERNAL_URL'):
+from dotenv import load_dotenv
+from src.storage import configure_storage
+
+load_dotenv()
+
+# Backend de armazenamento: sheets (padrão), sqlite ou memory
+STORAGE_BACKEND = os.getenv('STORAGE_BACKEND', 'sheets').lower()
+configure_storage(STORAGE_BACKEND)
+
+if STORAGE_BACKEND == 'sheets' and os.getenv('RENDER') == 'true' and os.getenv('RENDER_EXTERNAL_URL'):
     # Verificar se já existe arquivo de credenciais (arquivo secreto do Render)
     credentials_file = '/app/credentials.json'
     if os.path.exists(credentials_file):
@@ -19,6 +28,7 @@ if os.getenv('RENDER') == 'true' and os.getenv('RENDER_EXTERNAL_URL'):
             sys.exit(1)
 
 if __name__ == '__main__':
+    print(f"💾 Backend de armazenamento: {STORAGE_BACKEND}")
     if os.getenv('RENDER') == 'true' and os.getenv('RENDER_EXTERNAL_URL'):
         print("🌐 Iniciando em modo WEBHOOK para produção...")
         from src.webhook_server import main
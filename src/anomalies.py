@@ -0,0 +1,142 @@
+"""
+Aviso de despesas fora do padrão da categoria.
+
+Para cada categoria de despesa o tenant tem quantidade, média e soma dos
+quadrados dos desvios (algoritmo de Welford) do logaritmo dos valores: gastos
+são assimétricos, então o "típico" é a média geométrica e o desvio é medido em
+escala logarítmica. É uma visão incremental como o cubo de agregados
+(src/rollup.py): atualizada em O(1) a cada linha gravada, editada ou removida
+e salva no snapshot de estado, então a checagem após cada despesa não lê a
+planilha (enquanto a visão do tenant é carregada em segundo plano, não há
+aviso).
+
+Uma despesa é marcada quando a categoria já tem ANOMALY_MIN_COUNT (padrão 5)
+despesas anteriores, o valor fica ANOMALY_Z (padrão 3) desvios acima da média
+e é pelo menos ANOMALY_MIN_RATIO (padrão 2) vezes o típico.
+"""
+
+import math
+import os
+
+from .rollup import IncrementalView, ViewRegistry, row_cells
+
+
+class Welford:
+    """Média e variância acumuladas, com remoção de valores"""
+
+    def __init__(self, count=0, mean=0.0, m2=0.0):
+        self.count = count
+        self.mean = mean
+        self.m2 = m2
+
+    def add(self, x):
+        self.count += 1
+        delta = x - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (x - self.mean)
+
+    def remove(self, x):
+        if self.count <= 1:
+            self.count, self.mean, self.m2 = 0, 0.0, 0.0
+            return
+        mean = (self.count * self.mean - x) / (self.count - 1)
+        self.m2 = max(self.m2 - (x - mean) * (x - self.mean), 0.0)
+        self.mean = mean
+        self.count -= 1
+
+    def without(self, x):
+        """Cópia sem o valor x (a despesa recém-gravada)"""
+        other = Welford(self.count, self.mean, self.m2)
+        other.remove(x)
+        return other
+
+    @property
+    def std(self):
+        if self.count < 2:
+            return 0.0
+        return math.sqrt(self.m2 / (self.count - 1))
+
+
+class SpendingStats(IncrementalView):
+    def _clear(self):
+        self.stats = {}
+
+    def _cells(self, row):
+        return [(categoria, math.log(valor))
+                for tipo, categoria, pagamento, valor in row_cells(row) if tipo == 'despesa']
+
+    def _add_row(self, index, row):
+        cells = self._cells(row)
+        for categoria, x in cells:
+            stats = self.stats.get(categoria)
+            if stats is None:
+                stats = self.stats[categoria] = Welford()
+            stats.add(x)
+        return bool(cells)
+
+    def _remove_row(self, index, row):
+        cells = self._cells(row)
+        for categoria, x in cells:
+            stats = self.stats.get(categoria)
+            if stats is None:
+                continue
+            stats.remove(x)
+            if stats.count == 0:
+                del self.stats[categoria]
+        return bool(cells)
+
+    def _dump(self):
+        return {'stats': [[categoria, s.count, s.mean, s.m2] for categoria, s in self.stats.items()]}
+
+    def _restore(self, state):
+        for categoria, count, mean, m2 in state['stats']:
+            self.stats[categoria] = Welford(count, mean, m2)
+
+    def check(self, categoria, valor):
+        """
+        (valor típico, vezes o típico) se a despesa recém-gravada destoa das
+        anteriores da categoria, senão None
+        """
+        if valor <= 0:
+            return None
+        x = math.log(valor)
+        with self._lock:
+            stats = self.stats.get(categoria)
+            if stats is None:
+                return None
+            before = stats.without(x)
+        if before.count < int(os.getenv('ANOMALY_MIN_COUNT', 5)):
+            return None
+        typical = math.exp(before.mean)
+        ratio = valor / typical
+        if ratio < float(os.getenv('ANOMALY_MIN_RATIO', 2)):
+            return None
+        if x - before.mean < float(os.getenv('ANOMALY_Z', 3)) * before.std:
+            return None
+        return typical, ratio
+
+
+class AnomalyDetector:
+    def __init__(self, registry=None):
+        self.registry = registry or ViewRegistry(SpendingStats, max_age_env='ANOMALY_MAX_AGE')
+
+    async def check(self, sheets_manager, categoria, valor):
+        """Mensagem de aviso se a despesa recém-gravada está fora do padrão da categoria"""
+        stats = await self.registry.ready(sheets_manager)
+        if stats is None:
+            return None
+        found = stats.check(categoria, valor)
+        if found is None:
+            return None
+        typical, ratio = found
+        return (f"👀 Gasto fora do padrão: R$ {valor:.2f} é {ratio:.1f}× o seu gasto "
+                f"típico em {categoria} (R$ {typical:.2f})")
+
+    def dump(self):
+        return self.registry.dump()
+
+    def restore(self, states):
+        self.registry.restore(states)
+
+
+anomaly_detector = AnomalyDetector()
@@ -0,0 +1,95 @@
+"""
+Cópias de segurança locais feitas antes do /clearTable.
+
+Antes de limpar a tabela as linhas são gravadas (JSON + gzip) em
+DATA_DIR/backups/<tenant>-<data>-<linhas>.json.gz; se a cópia falhar, a tabela
+não é limpa. Ficam as BACKUP_KEEP (padrão 5) cópias mais recentes de cada
+tenant. O /restaurar recarrega uma cópia com append_rows, em lotes de
+RESTORE_BATCH_ROWS linhas (padrão 5000).
+"""
+
+import gzip
+import json
+import os
+import re
+from datetime import datetime
+
+from .local_store import data_dir
+from .schema import SCHEMA
+from .storage import HEADERS, numeric_row
+
+BACKUP_FORMAT = 1
+
+_NAME_RE = re.compile(r'^(?P<tenant>.+)-(?P<created>\d{8}-\d{6}-\d{6})-(?P<rows>\d+)\.json\.gz$')
+
+
+def backup_dir():
+    return os.getenv('BACKUP_DIR') or os.path.join(data_dir(), 'backups')
+
+
+def _safe(tenant):
+    return re.sub(r'\W', '_', str(tenant))
+
+
+class BackupStore:
+    def __init__(self, directory=None, keep=None):
+        self.directory = directory
+        self.keep = keep or int(os.getenv('BACKUP_KEEP', 5))
+
+    def _dir(self):
+        return self.directory or backup_dir()
+
+    def save(self, tenant, rows):
+        """Grava as linhas do tenant e retorna o caminho da cópia"""
+        directory = self._dir()
+        os.makedirs(directory, exist_ok=True)
+        created = datetime.now().strftime('%Y%m%d-%H%M%S-%f')
+        path = os.path.join(directory, f'{_safe(tenant)}-{created}-{len(rows)}.json.gz')
+        payload = json.dumps({
+            'format': BACKUP_FORMAT,
+            'tenant': tenant,
+            'headers': HEADERS,
+            'rows': [list(row) for row in rows],
+        }, ensure_ascii=False).encode('utf-8')
+        temp_path = f'{path}.tmp'
+        with open(temp_path, 'wb') as f:
+            f.write(gzip.compress(payload))
+        os.replace(temp_path, path)
+        self._prune(tenant)
+        return path
+
+    def list(self, tenant):
+        """Cópias do tenant, da mais recente para a mais antiga"""
+        try:
+            names = os.listdir(self._dir())
+        except FileNotFoundError:
+            return []
+        found = []
+        for name in names:
+            match = _NAME_RE.match(name)
+            if match and match.group('tenant') == _safe(tenant):
+                found.append({
+                    'path': os.path.join(self._dir(), name),
+                    'created_at': datetime.strptime(match.group('created'), '%Y%m%d-%H%M%S-%f'),
+                    'rows': int(match.group('rows')),
+                })
+        return sorted(found, key=lambda backup: backup['created_at'], reverse=True)
+
+    def load(self, path):
+        """Linhas de uma cópia no esquema atual, com os valores convertidos em número"""
+        with gzip.open(path, 'rb') as f:
+            state = json.loads(f.read().decode('utf-8'))
+        version = SCHEMA.version_of(state['headers']) if state.get('headers') else None
+        if state.get('format') != BACKUP_FORMAT or version is None:
+            raise ValueError(f'cópia {path} em formato desconhecido')
+        return [numeric_row(SCHEMA.upgrade_row(row, version)) for row in state['rows']]
+
+    def _prune(self, tenant):
+        for backup in self.list(tenant)[self.keep:]:
+            try:
+                os.remove(backup['path'])
+            except OSError as e:
+                print(f"Erro ao remover cópia antiga {backup['path']}: {e}")
+
+
+backups = BackupStore()
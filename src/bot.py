@@ -5,23 +5,30 @@ from dotenv import load_dotenv
 from telegram import Update, InputFile
 from telegram.ext import Application, CommandHandler, MessageHandler, filters, ContextTypes
 from .google_sheets import GoogleSheetsManager
-from .statistics import StatisticsGenerator
+from .metrics import instrument_handler
+from .tracing import traced_handler, span
+from .profiling import profiler, profiled, is_admin
+from .logging_config import setup_logging
+from .tenants import write_scheduler, QuotaExceeded
+from .reports import report_service, schedule_report_refresh, parse_format, preferred_format, set_preferred_format
+from .budgets import budget_manager, current_month
+from .anomalies import anomaly_detector
+from .recurring import recurring_manager, schedule_recurring, describe as describe_recurring
+from .snapshots import schedule_snapshots
+from .search import indexes as search_indexes, parse_query, tokenize
+from .rollup import cubes
+from .comparison import Comparison, parse_month
+from .categories import schedule_renormalization
+from .history import describe_row
+from .backups import backups
 
 load_dotenv()
 
-logging.basicConfig(
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    level=logging.INFO,
-    handlers=[
-        logging.FileHandler('logs/bot.log'),
-        logging.StreamHandler()
-    ]
-)
 logger = logging.getLogger(__name__)
 
 class PersonalFinanceBotManager:
-    def __init__(self):
-        self.sheets_manager = GoogleSheetsManager()
+    def __init__(self, chat_id=None):
+        self.sheets_manager = GoogleSheetsManager(chat_id=chat_id)
         
         self.expense_pattern = re.compile(
             r'^(\d+(?:[.,]\d{1,2})?)\s*-\s*([^-]+?)\s*-\s*([^-()]+?)\s*\(([^)]+)\)\s*$',
@@ -96,9 +103,13 @@ class PersonalFinanceBotManager:
         
         return None
 
+QUOTA_MESSAGE = "⏳ Muitas transações em pouco tempo. Aguarde alguns segundos e tente novamente."
+
 # Remover esta linha que está causando problema nos testes
 # bot_manager = PersonalFinanceBotManager()
 
+@instrument_handler('start')
+@traced_handler('start')
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     welcome_message = """
 🤖 **Bot de Controle Financeiro Pessoal**
@@ -129,8 +140,17 @@ Olá! Eu sou seu assistente financeiro pessoal.
 
 📊 **Comandos disponíveis:**
 • /start - Mostra esta mensagem
-• /statistics - Gera relatórios e gráficos completos
+• /statistics - Gera relatórios e gráficos completos (`/statistics texto` para a versão em texto)
+• /formato - Define o formato padrão do /statistics
+• /budget - Orçamentos mensais por categoria
+• /previsao - Previsão de gastos e saldo no fim do mês
+• /comparar - Compara o mês com o anterior e com o mesmo mês do ano passado
+• /recorrente - Transações recorrentes (salário, aluguel, assinaturas)
+• /buscar - Busca transações pela descrição, categoria ou forma de pagamento
+• /desfazer - Remove a última transação registrada
+• /editar - Corrige a última transação registrada
 • /clearTable - Limpa todos os dados (cuidado!)
+• /restaurar - Recupera os dados apagados pelo /clearTable
 
 📈 **Relatórios incluem:**
 • Resumo financeiro com saldo líquido
@@ -153,39 +173,104 @@ Vamos começar a controlar suas finanças pessoais! 💰
     
     await update.message.reply_text(welcome_message, parse_mode='Markdown')
 
+@instrument_handler('clear_table')
+@traced_handler('clear_table')
 async def clear_table(update: Update, context: ContextTypes.DEFAULT_TYPE):
     try:
-        bot_manager = PersonalFinanceBotManager()
-        success = bot_manager.sheets_manager.clear_table()
+        bot_manager = PersonalFinanceBotManager(update.effective_chat.id)
+        sheets_manager = bot_manager.sheets_manager
+        with span('storage'):
+            success = await write_scheduler.submit(
+                sheets_manager.tenant, sheets_manager.clear_table, quota_key=update.effective_chat.id
+            )
         
         if success:
-            message = "✅ Tabela limpa com sucesso! Todos os dados foram removidos."
+            message = (
+                "✅ Tabela limpa com sucesso! Todos os dados foram removidos.\n\n"
+                "Uma cópia foi guardada; use /restaurar para recuperá-la."
+            )
         else:
             message = "❌ Erro ao limpar a tabela. Tente novamente."
         
         await update.message.reply_text(message)
         
+    except QuotaExceeded:
+        await update.message.reply_text(QUOTA_MESSAGE)
     except Exception as e:
         logger.error(f"Erro no comando clear_table: {e}")
         await update.message.reply_text("❌ Erro interno. Tente novamente mais tarde.")
 
+@instrument_handler('restaurar')
+@traced_handler('restaurar')
+async def restaurar(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    try:
+        sheets_manager = GoogleSheetsManager(chat_id=update.effective_chat.id)
+        saved = backups.list(sheets_manager.tenant)
+        if not saved:
+            await update.message.reply_text("📦 Nenhuma cópia do /clearTable disponível.")
+            return
+        
+        args = context.args or []
+        if not args:
+            lines = ["📦 **Cópias guardadas pelo /clearTable**\n"]
+            for number, backup in enumerate(saved, 1):
+                lines.append(f"{number}. {backup['created_at']:%d/%m/%Y %H:%M} · {backup['rows']} linhas")
+            lines.append("\nUse `/restaurar 1` para recarregar a mais recente (a tabela precisa estar vazia).")
+            await update.message.reply_text("\n".join(lines), parse_mode='Markdown')
+            return
+        
+        if not args[0].isdigit() or not 1 <= int(args[0]) <= len(saved):
+            await update.message.reply_text(f"❌ Escolha uma cópia de 1 a {len(saved)}. Use /restaurar para ver a lista.")
+            return
+        
+        with span('storage'):
+            restored = await write_scheduler.submit(
+                sheets_manager.tenant, sheets_manager.restore_backup, saved[int(args[0]) - 1],
+                quota_key=update.effective_chat.id
+            )
+        
+        if restored is None:
+            await update.message.reply_text("❌ A tabela não está vazia. Use /clearTable antes de restaurar uma cópia.")
+        elif restored is False:
+            await update.message.reply_text("❌ Erro ao restaurar a cópia. Tente novamente.")
+        else:
+            await update.message.reply_text(f"✅ Cópia restaurada: {restored} linhas recarregadas.")
+    
+    except QuotaExceeded:
+        await update.message.reply_text(QUOTA_MESSAGE)
+    except Exception as e:
+        logger.error(f"Erro no comando restaurar: {e}")
+        await update.message.reply_text("❌ Erro interno. Tente novamente mais tarde.")
+
+@instrument_handler('statistics')
+@traced_handler('statistics')
+@profiled('statistics')
 async def statistics(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    chat_id = update.effective_chat.id
     try:
+        formato = parse_format(context.args[0] if context.args else None) or preferred_format(chat_id)
+        if formato == 'texto':
+            await send_text_report(update, chat_id)
+            return
+        
+        wait = report_service.cooldown.hit(chat_id)
+        if wait:
+            await update.message.reply_text(
+                f"⏳ Você pediu um relatório há pouco. Aguarde {int(wait) + 1}s para pedir outro."
+            )
+            return
+        
         await update.message.reply_text("📊 Gerando estatísticas... Por favor, aguarde.")
         
-        bot_manager = PersonalFinanceBotManager()
-        data = bot_manager.sheets_manager.get_all_data()
+        bot_manager = PersonalFinanceBotManager(chat_id)
+        report = await report_service.get(bot_manager.sheets_manager)
         
-        if not data:
+        if report is None:
             await update.message.reply_text("📈 Nenhum dado encontrado para gerar estatísticas. Adicione algumas transações primeiro!")
             return
         
-        stats_gen = StatisticsGenerator(data)
-        
-        summary = stats_gen.get_summary_text()
-        await update.message.reply_text(summary, parse_mode='Markdown')
-        
-        charts = stats_gen.generate_all_statistics()
+        with span('send'):
+            await update.message.reply_text(report.summary, parse_mode='Markdown')
         
         chart_names = {
             'gastos_por_categoria': '🏷️ Gastos por Categoria',
@@ -197,11 +282,10 @@ async def statistics(update: Update, context: ContextTypes.DEFAULT_TYPE):
             'evolucao_patrimonio': '📈 Evolução do Patrimônio'
         }
         
-        for chart_key, chart_buffer in charts.items():
-            if chart_buffer:
-                chart_buffer.seek(0)
-                caption = chart_names.get(chart_key, chart_key)
-                
+        for chart_key, chart_buffer in report.chart_files():
+            caption = chart_names.get(chart_key, chart_key)
+            
+            with span('send', chart=chart_key):
                 await update.message.reply_photo(
                     photo=InputFile(chart_buffer, filename=f'{chart_key}.png'),
                     caption=caption
@@ -210,15 +294,53 @@ async def statistics(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await update.message.reply_text("✅ Relatório completo enviado!")
         
     except Exception as e:
+        report_service.cooldown.reset(chat_id)
         logger.error(f"Erro no comando statistics: {e}")
         await update.message.reply_text("❌ Erro ao gerar estatísticas. Tente novamente mais tarde.")
 
+async def send_text_report(update, chat_id):
+    bot_manager = PersonalFinanceBotManager(chat_id)
+    report = await report_service.get(bot_manager.sheets_manager, 'texto')
+    
+    if report is None:
+        await update.message.reply_text("📈 Nenhum dado encontrado para gerar estatísticas. Adicione algumas transações primeiro!")
+        return
+    
+    with span('send'):
+        await update.message.reply_text(report.summary, parse_mode='Markdown')
+
+@instrument_handler('formato')
+@traced_handler('formato')
+async def formato(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    chat_id = update.effective_chat.id
+    try:
+        escolhido = parse_format(context.args[0] if context.args else None)
+        if escolhido is None:
+            await update.message.reply_text(
+                f"📋 Formato atual do /statistics: **{preferred_format(chat_id)}**\n\n"
+                "Use `/formato texto` (resumo em uma mensagem, sem imagens) ou `/formato graficos`.\n"
+                "Também é possível escolher a cada pedido: `/statistics texto`.",
+                parse_mode='Markdown'
+            )
+            return
+        
+        set_preferred_format(chat_id, escolhido)
+        await update.message.reply_text(f"✅ O /statistics agora usa o formato **{escolhido}**.", parse_mode='Markdown')
+    
+    except Exception as e:
+        logger.error(f"Erro no comando formato: {e}")
+        await update.message.reply_text("❌ Erro interno. Tente novamente mais tarde.")
+
+@instrument_handler('handle_transaction')
+@traced_handler('handle_transaction')
 async def handle_transaction(update: Update, context: ContextTypes.DEFAULT_TYPE):
     try:
         message_text = update.message.text
         
-        bot_manager = PersonalFinanceBotManager()
-        transaction_data = bot_manager.parse_transaction(message_text)
+        bot_manager = PersonalFinanceBotManager(update.effective_chat.id)
+        sheets_manager = bot_manager.sheets_manager
+        with span('parse'):
+            transaction_data = bot_manager.parse_transaction(message_text)
         
         if not transaction_data:
             await update.message.reply_text(
@@ -237,7 +359,11 @@ async def handle_transaction(update: Update, context: ContextTypes.DEFAULT_TYPE)
             return
         
         if transaction_data['tipo'] == 'credito':
-            success = bot_manager.sheets_manager.add_credit(transaction_data['valor'])
+            with span('storage'):
+                success = await write_scheduler.submit(
+                    sheets_manager.tenant, sheets_manager.add_credit, transaction_data['valor'],
+                    quota_key=update.effective_chat.id
+                )
             if success:
                 await update.message.reply_text(
                     f"✅ Crédito registrado com sucesso! ➕\n\n"
@@ -247,42 +373,378 @@ async def handle_transaction(update: Update, context: ContextTypes.DEFAULT_TYPE)
                 await update.message.reply_text("❌ Erro ao registrar crédito. Tente novamente.")
                 
         elif transaction_data['tipo'] == 'investimento':
-            success = bot_manager.sheets_manager.add_investment(
-                transaction_data['valor'],
-                transaction_data['categoria_investimento']
-            )
+            with span('storage'):
+                success = await write_scheduler.submit(
+                    sheets_manager.tenant,
+                    sheets_manager.add_investment,
+                    transaction_data['valor'],
+                    transaction_data['categoria_investimento'],
+                    quota_key=update.effective_chat.id
+                )
             if success:
+                categoria = sheets_manager.resolve_name('investimento', transaction_data['categoria_investimento'])
                 await update.message.reply_text(
                     f"✅ Investimento registrado com sucesso! 📈\n\n"
                     f"💰 Valor: R$ {transaction_data['valor']:.2f}\n"
-                    f"📊 Categoria: {transaction_data['categoria_investimento']}"
+                    f"📊 Categoria: {categoria}"
                 )
             else:
                 await update.message.reply_text("❌ Erro ao registrar investimento. Tente novamente.")
                 
         else:
-            success = bot_manager.sheets_manager.add_expense(
-                transaction_data['valor'],
-                transaction_data['tipo_pagamento'],
-                transaction_data['categoria'],
-                transaction_data['descricao']
-            )
+            with span('storage'):
+                success = await write_scheduler.submit(
+                    sheets_manager.tenant,
+                    sheets_manager.add_expense,
+                    transaction_data['valor'],
+                    transaction_data['tipo_pagamento'],
+                    transaction_data['categoria'],
+                    transaction_data['descricao'],
+                    quota_key=update.effective_chat.id
+                )
             
             if success:
-                await update.message.reply_text(
+                # Nomes como foram gravados na linha
+                tipo_pagamento = sheets_manager.resolve_name('pagamento', transaction_data['tipo_pagamento'])
+                categoria = sheets_manager.resolve_name('categoria', transaction_data['categoria'])
+                message = (
                     f"✅ Despesa registrada com sucesso! ➖\n\n"
                     f"💰 Valor: R$ {transaction_data['valor']:.2f}\n"
-                    f"💳 Tipo: {transaction_data['tipo_pagamento']}\n"
-                    f"🏷️ Categoria: {transaction_data['categoria']}\n"
+                    f"💳 Tipo: {tipo_pagamento}\n"
+                    f"🏷️ Categoria: {categoria}\n"
                     f"📝 Descrição: {transaction_data['descricao']}"
                 )
+                with span('budget'):
+                    alert = await budget_manager.check(sheets_manager, categoria, transaction_data['valor'])
+                if alert:
+                    message += f"\n\n{alert}"
+                with span('anomaly'):
+                    unusual = await anomaly_detector.check(sheets_manager, categoria, transaction_data['valor'])
+                if unusual:
+                    message += f"\n\n{unusual}"
+                await update.message.reply_text(message)
             else:
                 await update.message.reply_text("❌ Erro ao registrar despesa. Tente novamente.")
     
+    except QuotaExceeded:
+        await update.message.reply_text(QUOTA_MESSAGE)
     except Exception as e:
         logger.error(f"Erro ao processar transação: {e}")
         await update.message.reply_text("❌ Erro interno. Tente novamente mais tarde.")
 
+@instrument_handler('budget')
+@traced_handler('budget')
+async def budget(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    usage_message = (
+        "Uso:\n"
+        "`/budget` - mostra os orçamentos do mês\n"
+        "`/budget categoria valor` - define o orçamento mensal da categoria\n"
+        "`/budget categoria remover` - remove o orçamento"
+    )
+    try:
+        sheets_manager = GoogleSheetsManager(chat_id=update.effective_chat.id)
+        args = context.args or []
+        
+        if not args:
+            usage = await budget_manager.usage(sheets_manager)
+            if not usage:
+                await update.message.reply_text(
+                    "💰 Nenhum orçamento definido.\n\n" + usage_message, parse_mode='Markdown'
+                )
+                return
+            lines = [f"💰 **Orçamentos de {current_month()}**\n"]
+            for categoria, gasto, limite in usage:
+                lines.append(f"• {categoria}: R$ {gasto:.2f} de R$ {limite:.2f} ({gasto / limite * 100:.0f}%)")
+            await update.message.reply_text("\n".join(lines), parse_mode='Markdown')
+            return
+        
+        if len(args) < 2:
+            await update.message.reply_text(usage_message, parse_mode='Markdown')
+            return
+        
+        categoria = sheets_manager.resolve_name('categoria', ' '.join(args[:-1]))
+        if args[-1].lower() == 'remover':
+            if budget_manager.remove_budget(sheets_manager.tenant, categoria):
+                await update.message.reply_text(f"🗑️ Orçamento de {categoria} removido.")
+            else:
+                await update.message.reply_text(f"❌ Não há orçamento para {categoria}.")
+            return
+        
+        try:
+            limite = float(args[-1].replace(',', '.'))
+        except ValueError:
+            limite = 0
+        if limite <= 0:
+            await update.message.reply_text(usage_message, parse_mode='Markdown')
+            return
+        
+        budget_manager.set_budget(sheets_manager.tenant, categoria, limite)
+        await update.message.reply_text(
+            f"✅ Orçamento mensal de {categoria} definido: R$ {limite:.2f}\n"
+            f"Aviso quando os gastos passarem de 50%, 80% e 100%."
+        )
+    
+    except Exception as e:
+        logger.error(f"Erro no comando budget: {e}")
+        await update.message.reply_text("❌ Erro interno. Tente novamente mais tarde.")
+
+@instrument_handler('recorrente')
+@traced_handler('recorrente')
+async def recorrente(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    usage_message = (
+        "Uso:\n"
+        "`/recorrente` - lista as transações recorrentes\n"
+        "`/recorrente adicionar dia transação` - lança a transação todo mês nesse dia\n"
+        "`/recorrente remover id` - remove uma recorrente\n\n"
+        "Exemplos:\n"
+        "`/recorrente adicionar 5 3000.00 - credito`\n"
+        "`/recorrente adicionar 10 39.90 - Cartão Visa - Assinaturas (streaming)`"
+    )
+    try:
+        bot_manager = PersonalFinanceBotManager(update.effective_chat.id)
+        tenant = bot_manager.sheets_manager.tenant
+        args = context.args or []
+        action = args[0].lower() if args else 'listar'
+        
+        if action == 'listar':
+            rules = recurring_manager.rules(tenant)
+            if not rules:
+                await update.message.reply_text(
+                    "🔁 Nenhuma transação recorrente cadastrada.\n\n" + usage_message, parse_mode='Markdown'
+                )
+                return
+            lines = ["🔁 **Transações recorrentes**\n"]
+            for rule in rules:
+                proxima = rule['proxima'].split('-')
+                lines.append(
+                    f"{rule['id']}. dia {rule['dia']}: {describe_recurring(rule['transacao'])} "
+                    f"(próxima: {proxima[2]}/{proxima[1]}/{proxima[0]})"
+                )
+            await update.message.reply_text("\n".join(lines))
+            return
+        
+        if action == 'remover' and len(args) == 2 and args[1].isdigit():
+            if recurring_manager.remove_rule(tenant, int(args[1])):
+                await update.message.reply_text(f"🗑️ Recorrente {args[1]} removida.")
+            else:
+                await update.message.reply_text(f"❌ Recorrente {args[1]} não encontrada.")
+            return
+        
+        if action == 'adicionar' and len(args) >= 3 and args[1].isdigit() and 1 <= int(args[1]) <= 31:
+            transaction_data = bot_manager.parse_transaction(' '.join(args[2:]))
+            if transaction_data:
+                dia = int(args[1])
+                rule = recurring_manager.add_rule(tenant, dia, transaction_data)
+                launched = await recurring_manager.materialize_async(tenant)
+                message = (
+                    f"✅ Recorrente {rule['id']} cadastrada: todo dia {dia}\n"
+                    f"{describe_recurring(transaction_data)}"
+                )
+                if launched:
+                    message += "\n\nA ocorrência de hoje já foi lançada."
+                await update.message.reply_text(message)
+                return
+        
+        await update.message.reply_text(usage_message, parse_mode='Markdown')
+    
+    except Exception as e:
+        logger.error(f"Erro no comando recorrente: {e}")
+        await update.message.reply_text("❌ Erro interno. Tente novamente mais tarde.")
+
+@instrument_handler('buscar')
+@traced_handler('buscar')
+async def buscar(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    usage_message = (
+        "Uso:\n"
+        "`/buscar termo` - busca nas descrições, categorias e formas de pagamento\n"
+        "`/buscar termo pagina 2` - outras páginas do resultado\n\n"
+        "Exemplos:\n"
+        "`/buscar uber`\n"
+        "`/buscar mercado pix`"
+    )
+    try:
+        query, page = parse_query(context.args)
+        if not tokenize(query):
+            await update.message.reply_text(usage_message, parse_mode='Markdown')
+            return
+        
+        bot_manager = PersonalFinanceBotManager(update.effective_chat.id)
+        index = await search_indexes.loaded(bot_manager.sheets_manager, stale_ok=True)
+        result = index.search(query)
+        if not result:
+            await update.message.reply_text(f"🔎 Nenhuma transação encontrada para \"{query}\".")
+            return
+        
+        page = min(page, result.pages)
+        lines = [f"🔎 {len(result)} transações para \"{query}\" (página {page}/{result.pages})\n"]
+        for label, tipo in (('💸 Débitos', 'despesa'), ('💰 Créditos', 'credito'), ('📈 Investimentos', 'investimento')):
+            if result.counts[tipo]:
+                lines.append(f"{label}: R$ {result.totals[tipo]:.2f} ({result.counts[tipo]})")
+        lines.append("")
+        for _, data_hora, descricao, categoria, pagamento, cells in result.page(page):
+            valor = sum(v for _, v in cells)
+            detalhes = ' · '.join(text for text in (categoria, pagamento, descricao) if text)
+            lines.append(f"{data_hora[:10]} · R$ {valor:.2f} · {detalhes}")
+        if page < result.pages:
+            lines.append(f"\nPróxima página: /buscar {query} pagina {page + 1}")
+        await update.message.reply_text("\n".join(lines))
+    
+    except Exception as e:
+        logger.error(f"Erro no comando buscar: {e}")
+        await update.message.reply_text("❌ Erro interno. Tente novamente mais tarde.")
+
+@instrument_handler('previsao')
+@traced_handler('previsao')
+async def previsao(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    try:
+        sheets_manager = GoogleSheetsManager(chat_id=update.effective_chat.id)
+        cube = await cubes.loaded(sheets_manager, stale_ok=True)
+        text = cube.forecast().render()
+        if text is None:
+            await update.message.reply_text("🔮 Ainda não há lançamentos suficientes para uma previsão.")
+            return
+        await update.message.reply_text(text)
+    
+    except Exception as e:
+        logger.error(f"Erro no comando previsao: {e}")
+        await update.message.reply_text("❌ Erro interno. Tente novamente mais tarde.")
+
+@instrument_handler('comparar')
+@traced_handler('comparar')
+async def comparar(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    try:
+        args = context.args or []
+        month = parse_month(args[0]) if args else None
+        if args and month is None:
+            await update.message.reply_text(
+                "Uso:\n"
+                "`/comparar` - mês atual\n"
+                "`/comparar 09/2024` - outro mês",
+                parse_mode='Markdown'
+            )
+            return
+        
+        sheets_manager = GoogleSheetsManager(chat_id=update.effective_chat.id)
+        cube = await cubes.loaded(sheets_manager, stale_ok=True)
+        comparison = Comparison.build(cube, month)
+        text = comparison.render()
+        if text is None:
+            await update.message.reply_text(f"📊 Nenhum lançamento em {comparison.month[1]:02d}/{comparison.month[0]}.")
+            return
+        await update.message.reply_text(text)
+    
+    except Exception as e:
+        logger.error(f"Erro no comando comparar: {e}")
+        await update.message.reply_text("❌ Erro interno. Tente novamente mais tarde.")
+
+@instrument_handler('desfazer')
+@traced_handler('desfazer')
+async def desfazer(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    try:
+        sheets_manager = GoogleSheetsManager(chat_id=update.effective_chat.id)
+        with span('storage'):
+            row = await write_scheduler.submit(
+                sheets_manager.tenant, sheets_manager.undo_last, quota_key=update.effective_chat.id
+            )
+        
+        if row is None:
+            await update.message.reply_text("🤷 Nenhuma transação recente deste chat para desfazer.")
+        elif row is False:
+            await update.message.reply_text("❌ Erro ao desfazer a transação. Tente novamente.")
+        else:
+            await update.message.reply_text(f"↩️ Transação removida:\n\n{row[0]} · {describe_row(row)}")
+    
+    except QuotaExceeded:
+        await update.message.reply_text(QUOTA_MESSAGE)
+    except Exception as e:
+        logger.error(f"Erro no comando desfazer: {e}")
+        await update.message.reply_text("❌ Erro interno. Tente novamente mais tarde.")
+
+EDIT_FIELDS = {'valor', 'categoria', 'pagamento', 'descricao'}
+
+@instrument_handler('editar')
+@traced_handler('editar')
+async def editar(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    usage_message = (
+        "Uso (corrige a última transação registrada neste chat):\n"
+        "`/editar valor 45.90`\n"
+        "`/editar categoria Transporte`\n"
+        "`/editar pagamento Pix`\n"
+        "`/editar descricao uber`\n"
+        "`/editar 45.90 - Pix - Transporte (uber)` - troca a transação inteira"
+    )
+    try:
+        args = context.args or []
+        bot_manager = PersonalFinanceBotManager(update.effective_chat.id)
+        sheets_manager = bot_manager.sheets_manager
+        
+        field = args[0].lower() if args else ''
+        if field in EDIT_FIELDS and len(args) >= 2:
+            value = ' '.join(args[1:])
+            if field == 'valor':
+                try:
+                    value = float(value.replace(',', '.'))
+                except ValueError:
+                    value = 0
+                if value <= 0:
+                    await update.message.reply_text(usage_message, parse_mode='Markdown')
+                    return
+        else:
+            field = 'transacao'
+            value = bot_manager.parse_transaction(' '.join(args))
+            if not value:
+                await update.message.reply_text(usage_message, parse_mode='Markdown')
+                return
+        
+        try:
+            with span('storage'):
+                result = await write_scheduler.submit(
+                    sheets_manager.tenant, sheets_manager.edit_last, field, value,
+                    quota_key=update.effective_chat.id
+                )
+        except ValueError:
+            await update.message.reply_text(f"❌ A última transação não tem o campo {field}.")
+            return
+        
+        if result is None:
+            await update.message.reply_text("🤷 Nenhuma transação recente deste chat para editar.")
+        elif result is False:
+            await update.message.reply_text("❌ Erro ao editar a transação. Tente novamente.")
+        else:
+            old, new = result
+            await update.message.reply_text(
+                f"✏️ Transação corrigida:\n\n"
+                f"Antes: {describe_row(old)}\n"
+                f"Agora: {describe_row(new)}"
+            )
+    
+    except QuotaExceeded:
+        await update.message.reply_text(QUOTA_MESSAGE)
+    except Exception as e:
+        logger.error(f"Erro no comando editar: {e}")
+        await update.message.reply_text("❌ Erro interno. Tente novamente mais tarde.")
+
+@instrument_handler('profile')
+@traced_handler('profile')
+async def profile(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if not is_admin(update.effective_chat.id):
+        await handle_unknown(update, context)
+        return
+    
+    try:
+        count = int(context.args[0]) if context.args else 1
+    except ValueError:
+        await update.message.reply_text("Uso: `/profile N` (N = próximas chamadas de /statistics)", parse_mode='Markdown')
+        return
+    
+    profiler.arm(count, update.effective_chat.id)
+    if count > 0:
+        await update.message.reply_text(f"🔬 Profiling ativado para as próximas {count} chamadas de /statistics.")
+    else:
+        await update.message.reply_text("🔬 Profiling desativado.")
+
+@instrument_handler('handle_unknown')
+@traced_handler('handle_unknown')
 async def handle_unknown(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await update.message.reply_text(
         "❓ Comando não reconhecido.\n\n"
@@ -297,11 +759,30 @@ def create_application():
         logger.error("TELEGRAM_BOT_TOKEN não encontrado no .env")
         return None
     
-    application = Application.builder().token(token).build()
+    builder = Application.builder().token(token)
+    api_url = os.getenv('TELEGRAM_API_URL')
+    if api_url:
+        builder = builder.base_url(api_url)
+    application = builder.build()
+    add_handlers(application)
     
+    return application
+
+def add_handlers(application):
+    """Registra os handlers e jobs do bot (compartilhado entre polling e webhook)"""
     application.add_handler(CommandHandler("start", start))
     application.add_handler(CommandHandler("clearTable", clear_table))
+    application.add_handler(CommandHandler("restaurar", restaurar))
     application.add_handler(CommandHandler("statistics", statistics))
+    application.add_handler(CommandHandler("formato", formato))
+    application.add_handler(CommandHandler("budget", budget))
+    application.add_handler(CommandHandler("previsao", previsao))
+    application.add_handler(CommandHandler("comparar", comparar))
+    application.add_handler(CommandHandler("recorrente", recorrente))
+    application.add_handler(CommandHandler("buscar", buscar))
+    application.add_handler(CommandHandler("desfazer", desfazer))
+    application.add_handler(CommandHandler("editar", editar))
+    application.add_handler(CommandHandler("profile", profile))
     
     application.add_handler(MessageHandler(
         filters.TEXT & ~filters.COMMAND, 
@@ -310,10 +791,14 @@ def create_application():
     
     application.add_handler(MessageHandler(filters.COMMAND, handle_unknown))
     
-    return application
+    schedule_report_refresh(application)
+    schedule_recurring(application)
+    schedule_snapshots(application)
+    schedule_renormalization(application)
 
 def main():
     os.makedirs('logs', exist_ok=True)
+    setup_logging('logs/bot.log')
     
     application = create_application()
     if not application:
@@ -0,0 +1,85 @@
+"""
+Orçamentos mensais por categoria.
+
+Os limites ficam em DATA_DIR/budgets.json ({tenant: {categoria: valor}}). Os
+totais do mês por categoria vêm do índice mensal do cubo de agregados
+(src/rollup.py), atualizado a cada linha gravada. Assim a checagem após cada
+despesa é O(1) e não lê a planilha: enquanto o cubo do tenant não foi
+carregado, ele é lido em segundo plano e a checagem não gera alerta.
+"""
+
+from datetime import datetime
+
+import pytz
+
+from .local_store import JsonStore
+from .rollup import cubes as default_cubes
+
+THRESHOLDS = (0.5, 0.8, 1.0)
+
+TZ = pytz.timezone('America/Sao_Paulo')
+
+
+def current_month():
+    return datetime.now(TZ).strftime('%m/%Y')
+
+
+class BudgetManager:
+    def __init__(self, store=None, cubes=None):
+        self.store = store or JsonStore('budgets')
+        self.cubes = cubes or default_cubes
+
+    def budgets(self, tenant):
+        return self.store.get(tenant, {})
+
+    def set_budget(self, tenant, categoria, limite):
+        def update(current):
+            current = dict(current or {})
+            current[categoria] = limite
+            return current
+        self.store.update(tenant, update)
+
+    def remove_budget(self, tenant, categoria):
+        current = dict(self.budgets(tenant))
+        if current.pop(categoria, None) is None:
+            return False
+        if current:
+            self.store.set(tenant, current)
+        else:
+            self.store.delete(tenant)
+        return True
+
+    async def check(self, sheets_manager, categoria, valor):
+        """Mensagem de alerta se a despesa recém-gravada cruzou 50/80/100% do orçamento"""
+        limite = self.budgets(sheets_manager.tenant).get(categoria)
+        if not limite:
+            return None
+
+        cube = await self.cubes.ready(sheets_manager)
+        if cube is None:
+            return None
+        after = cube.month_total('despesa', categoria, current_month())
+        before = after - valor
+        crossed = [t for t in THRESHOLDS if before < t * limite <= after]
+        if not crossed:
+            return None
+
+        percent = after / limite * 100
+        if crossed[-1] >= 1.0:
+            return (f"🚨 Orçamento de {categoria} estourado! "
+                    f"R$ {after:.2f} de R$ {limite:.2f} ({percent:.0f}%)")
+        return (f"⚠️ Você já usou {percent:.0f}% do orçamento de {categoria}: "
+                f"R$ {after:.2f} de R$ {limite:.2f}")
+
+    async def usage(self, sheets_manager):
+        """Lista (categoria, gasto no mês, limite) dos orçamentos do tenant"""
+        budgets = self.budgets(sheets_manager.tenant)
+        if not budgets:
+            return []
+        cube = await self.cubes.loaded(sheets_manager, stale_ok=True)
+        month = current_month()
+        return [(categoria, cube.month_total('despesa', categoria, month), limite)
+                for categoria, limite in sorted(budgets.items())]
+
+
+budget_manager = BudgetManager()
@@ -0,0 +1,227 @@
+"""
+Nomes canônicos de categorias e formas de pagamento.
+
+"Alimentação", "alimentacao" e "Alimentaçao" têm a mesma chave de busca
+(minúsculas, sem acento e sem espaços/pontuação: "alimentacao") e são gravados
+com o primeiro nome visto para ela, como o usuário digitou ("Alimentação").
+
+Com NAME_FUZZY_MATCH=1, chaves novas com 5 letras ou mais que estejam a 1
+edição de um nome já conhecido (letra a mais, a menos, trocada ou duas
+vizinhas invertidas) também são resolvidas para esse nome e ficam gravadas como
+alias. Fica desligado por padrão: nomes curtos e diferentes a 1 letra de
+distância ("carro" e "barro") seriam unidos sem aviso. A busca aproximada usa
+um índice de deleções (cada chave indexada por todas as variantes com uma
+letra a menos), então cada resolução custa O(tamanho do nome), independente de
+quantos nomes existem.
+
+Os vocabulários ficam em DATA_DIR/categories.json, por tenant e campo
+(categoria, pagamento, investimento). Backends em memória usam um vocabulário
+só em memória. Um job (RENORMALIZE_INTERVAL, padrão 86400s, a primeira vez
+um intervalo após a subida) reescreve as linhas antigas com os nomes
+canônicos.
+"""
+
+import logging
+import os
+import re
+import threading
+import weakref
+from collections import Counter, defaultdict
+
+from .local_store import JsonStore
+from .metrics import registry as metrics_registry
+from .search import fold, within_distance
+from .tenants import write_scheduler
+
+logger = logging.getLogger(__name__)
+
+FIELDS = ('categoria', 'pagamento', 'investimento')
+
+# Colunas da linha de cada campo (ver storage.HEADERS)
+COLUMNS = {'pagamento': 2, 'categoria': 3, 'investimento': 7}
+
+FUZZY_MIN_LENGTH = 5
+
+NAMES_RENORMALIZED = metrics_registry.counter(
+    'names_renormalized_total', 'Linhas antigas reescritas com nomes canônicos')
+
+_NON_ALNUM = re.compile(r'[\W_]+')
+
+
+def canonical_key(text):
+    return _NON_ALNUM.sub('', fold(text))
+
+
+def display_name(text):
+    """Nome como o usuário digitou, sem espaços sobrando"""
+    return ' '.join(str(text).split())
+
+
+def deletes(key):
+    return {key[:i] + key[i + 1:] for i in range(len(key))}
+
+
+def transposed(a, b):
+    """b é a com duas letras vizinhas trocadas"""
+    if len(a) != len(b):
+        return False
+    diff = [i for i, (ca, cb) in enumerate(zip(a, b)) if ca != cb]
+    return len(diff) == 2 and diff[1] == diff[0] + 1 and a[diff[0]] == b[diff[1]] and a[diff[1]] == b[diff[0]]
+
+
+class Vocabulary:
+    """Nomes conhecidos (chave -> nome gravado) e aliases de um campo"""
+
+    def __init__(self, names=(), aliases=None, fuzzy=False):
+        self.names = {}
+        self.aliases = dict(aliases or {})
+        self.fuzzy = fuzzy
+        self._deletes = defaultdict(set)
+        # Vocabulários antigos guardavam só as chaves
+        for key, name in (names.items() if isinstance(names, dict) else ((key, key) for key in names)):
+            self.add(key, name)
+
+    def add(self, key, name):
+        self.names[key] = name
+        if len(key) >= FUZZY_MIN_LENGTH:
+            for variant in deletes(key):
+                self._deletes[variant].add(key)
+
+    def _fuzzy(self, key):
+        if len(key) < FUZZY_MIN_LENGTH:
+            return None
+        # Deleção na chave (letra a mais), no nome (letra a menos) ou em ambos
+        # (letra trocada ou duas letras vizinhas invertidas)
+        candidates = set(self._deletes.get(key, ()))
+        for variant in deletes(key):
+            if variant in self.names:
+                candidates.add(variant)
+            candidates.update(self._deletes.get(variant, ()))
+        candidates = sorted(name for name in candidates if within_distance(key, name, 1) or transposed(key, name))
+        return candidates[0] if candidates else None
+
+    def resolve(self, key, name):
+        """
+        Retorna (nome canônico, mudou) para uma chave já normalizada; name é
+        o nome gravado se a chave for nova
+        """
+        if key in self.names:
+            return self.names[key], False
+        if key in self.aliases:
+            return self.names[self.aliases[key]], False
+        known = self._fuzzy(key) if self.fuzzy else None
+        if known is not None:
+            self.aliases[key] = known
+            return self.names[known], True
+        self.add(key, name)
+        return name, True
+
+    def dump(self):
+        return {'names': dict(sorted(self.names.items())), 'aliases': dict(sorted(self.aliases.items()))}
+
+
+class NameResolver:
+    def __init__(self, store=None, fuzzy=None):
+        self.store = store or JsonStore('categories')
+        self.fuzzy = fuzzy if fuzzy is not None else os.getenv('NAME_FUZZY_MATCH', '0') == '1'
+        self._vocabularies = {}
+        # Backends sem persistência: vocabulário só em memória, junto com o backend
+        self._memory = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    def _vocabulary(self, sheets_manager, field):
+        persistent = sheets_manager.storage.identity() is not None
+        if persistent:
+            vocabularies = self._vocabularies.setdefault(sheets_manager.tenant, {})
+        else:
+            vocabularies = self._memory.setdefault(sheets_manager.storage, {})
+        if field not in vocabularies:
+            state = (self.store.get(sheets_manager.tenant) or {}).get(field, {}) if persistent else {}
+            vocabularies[field] = Vocabulary(state.get('names', ()), state.get('aliases'), fuzzy=self.fuzzy)
+        return vocabularies[field]
+
+    def _save(self, sheets_manager, field, vocabulary):
+        if sheets_manager.storage.identity() is None:
+            return
+        def update(current):
+            current = dict(current or {})
+            current[field] = vocabulary.dump()
+            return current
+        self.store.update(sheets_manager.tenant, update)
+
+    def resolve(self, sheets_manager, field, text):
+        key = canonical_key(text)
+        if not key:
+            return str(text).lower().replace(' ', '')
+        with self._lock:
+            vocabulary = self._vocabulary(sheets_manager, field)
+            name, changed = vocabulary.resolve(key, display_name(text))
+            if changed:
+                self._save(sheets_manager, field, vocabulary)
+        return name
+
+    def renormalize(self, sheets_manager):
+        """Reescreve as linhas com nomes fora do padrão; retorna quantas mudaram"""
+        rows = sheets_manager.storage.get_rows()
+
+        # Os nomes mais usados entram primeiro: as variantes raras viram alias
+        # deles. Cada chave nova é gravada com a primeira grafia da planilha
+        counts = {field: Counter() for field in FIELDS}
+        first = {field: {} for field in FIELDS}
+        for row in rows:
+            for field, column in COLUMNS.items():
+                key = canonical_key(row[column])
+                if key:
+                    counts[field][key] += 1
+                    first[field].setdefault(key, row[column])
+        for field in FIELDS:
+            for key, _ in counts[field].most_common():
+                self.resolve(sheets_manager, field, first[field][key])
+
+        updates = {}
+        for index, row in enumerate(rows):
+            fixed = list(row)
+            for field, column in COLUMNS.items():
+                if canonical_key(row[column]):
+                    fixed[column] = self.resolve(sheets_manager, field, row[column])
+            if fixed != row:
+                updates[index] = fixed
+
+        if updates:
+            # Só as células de nomes: valores e edições feitas na planilha ficam intactos
+            sheets_manager.storage.update_rows(updates, previous={index: rows[index] for index in updates},
+                                               columns=set(COLUMNS.values()))
+            NAMES_RENORMALIZED.inc(len(updates))
+        return len(updates)
+
+    async def renormalize_all(self):
+        from .google_sheets import GoogleSheetsManager
+
+        total = 0
+        for tenant, _ in self.store.items():
+            try:
+                sheets_manager = GoogleSheetsManager(tenant=tenant)
+                total += await write_scheduler.run_exclusive(tenant, self.renormalize, sheets_manager)
+            except Exception as e:
+                logger.error(f"Erro ao normalizar nomes do tenant {tenant}: {e}")
+        if total:
+            logger.info(f"{total} linhas reescritas com nomes canônicos")
+        return total
+
+
+name_resolver = NameResolver()
+
+
+async def renormalize_job(context):
+    await name_resolver.renormalize_all()
+
+
+def schedule_renormalization(application):
+    """Agenda a normalização das linhas antigas"""
+    if application.job_queue is None:
+        logger.warning("JobQueue indisponível (instale python-telegram-bot[job-queue]); nomes antigos não serão normalizados")
+        return None
+    interval = float(os.getenv('RENORMALIZE_INTERVAL', 86400))
+    return application.job_queue.run_repeating(
+        renormalize_job, interval=interval, first=interval, name='renormalize_names'
+    )
@@ -0,0 +1,135 @@
+"""
+Comparativo de um mês com o mês anterior e o mesmo mês do ano passado
+(/comparar).
+
+Os totais vêm do índice mensal do cubo de agregados (src/rollup.py), o mesmo
+dos orçamentos: por tipo e, para despesas, por categoria e forma de
+pagamento. Só os três meses comparados são lidos, então o custo depende do
+número de categorias e formas de pagamento, não do número de transações.
+"""
+
+import re
+from collections import defaultdict
+
+from .forecast import month_label, today
+
+MAX_ROWS = 8
+MAX_HIGHLIGHTS = 3
+
+MONTH_RE = re.compile(r'^(\d{1,2})/(\d{4})$')
+
+KIND_LABELS = (('💸 Gastos', 'despesa'), ('💰 Créditos', 'credito'), ('📈 Investimentos', 'investimento'))
+
+
+def parse_month(text):
+    """'09/2024' -> (2024, 9); None se não for um mês válido"""
+    match = MONTH_RE.match(str(text).strip())
+    if not match or not 1 <= int(match.group(1)) <= 12:
+        return None
+    return int(match.group(2)), int(match.group(1))
+
+
+def previous_month(year, month):
+    return (year - 1, 12) if month == 1 else (year, month - 1)
+
+
+def percent(current, base):
+    if base <= 0:
+        return 'novo' if current > 0 else '0%'
+    return f'{(current - base) / base * 100:+.0f}%'
+
+
+def money_delta(value):
+    return f'+R$ {value:.2f}' if value >= 0 else f'-R$ {-value:.2f}'
+
+
+def by_dimension(index):
+    """Índice mensal do cubo -> {(dimensão, nome): total}"""
+    totals = defaultdict(float)
+    for (tipo, name), total in index.items():
+        if tipo == 'pagamento':
+            totals[('pagamento', name)] += total
+            continue
+        totals[('tipo', tipo)] += total
+        if tipo == 'despesa':
+            totals[('categoria', name)] += total
+    return dict(totals)
+
+
+class Comparison:
+    def __init__(self, month, totals):
+        self.month = month
+        self.previous = previous_month(*month)
+        self.last_year = (month[0] - 1, month[1])
+        # (ano, mês) -> {(dimensão, nome): total}
+        self.totals = totals
+
+    @classmethod
+    def build(cls, cube, month=None):
+        month = month or (today().year, today().month)
+        months = [month, previous_month(*month), (month[0] - 1, month[1])]
+        summary = cube.month_summary([month_label(*m) for m in months])
+        totals = {}
+        for m in months:
+            index = summary.get(month_label(*m))
+            if index:
+                totals[m] = by_dimension(index)
+        return cls(month, totals)
+
+    @property
+    def empty(self):
+        return not any(round(total, 2) for total in self.totals.get(self.month, {}).values())
+
+    def value(self, month, dimension, name):
+        # Arredonda os resíduos de ponto flutuante deixados por remoções
+        return round(self.totals.get(month, {}).get((dimension, name), 0.0), 2)
+
+    def rows(self, dimension):
+        """(nome, mês, mês anterior, ano passado) da dimensão, do maior gasto no mês ao menor"""
+        names = {name for month in (self.month, self.previous, self.last_year)
+                 for (d, name), total in self.totals.get(month, {}).items() if d == dimension and round(total, 2)}
+        rows = [(name, self.value(self.month, dimension, name), self.value(self.previous, dimension, name),
+                 self.value(self.last_year, dimension, name)) for name in names]
+        return sorted(rows, key=lambda row: (-row[1], -row[2], row[0]))
+
+    def highlights(self, count=MAX_HIGHLIGHTS):
+        """Categorias e formas de pagamento que mais mudaram em relação ao mês anterior"""
+        deltas = [(dimension, name, current - previous, current, previous)
+                  for dimension in ('categoria', 'pagamento')
+                  for name, current, previous, _ in self.rows(dimension) if current != previous]
+        return sorted(deltas, key=lambda item: abs(item[2]), reverse=True)[:count]
+
+    def _table(self, title, dimension):
+        rows = self.rows(dimension)
+        if not rows:
+            return []
+        lines = ["", title]
+        for name, current, previous, last_year in rows[:MAX_ROWS]:
+            lines.append(f"• {name or f'sem {dimension}'}: R$ {current:.2f} | R$ {previous:.2f} | R$ {last_year:.2f}")
+        if len(rows) > MAX_ROWS:
+            lines.append(f"… e mais {len(rows) - MAX_ROWS}")
+        return lines
+
+    def render(self):
+        if self.empty:
+            return None
+        current, previous, last_year = (month_label(*m) for m in (self.month, self.previous, self.last_year))
+        lines = [f"📊 Comparativo de {current}", f"(vs {previous} e {last_year})", ""]
+        for label, tipo in KIND_LABELS:
+            now = self.value(self.month, 'tipo', tipo)
+            before = self.value(self.previous, 'tipo', tipo)
+            year_ago = self.value(self.last_year, 'tipo', tipo)
+            if now or before or year_ago:
+                lines.append(f"{label}: R$ {now:.2f} ({percent(now, before)} no mês, "
+                             f"{percent(now, year_ago)} no ano)")
+
+        highlights = self.highlights()
+        if highlights:
+            lines += ["", "🔺 Maiores variações no mês:"]
+            for dimension, name, delta, now, before in highlights:
+                lines.append(f"• {name or f'sem {dimension}'} ({dimension}): R$ {before:.2f} → R$ {now:.2f} "
+                             f"({money_delta(delta)}, {percent(now, before)})")
+
+        lines += self._table(f"🏷️ Por categoria ({current} | {previous} | {last_year}):", 'categoria')
+        lines += self._table(f"💳 Por forma de pagamento ({current} | {previous} | {last_year}):", 'pagamento')
+        return "\n".join(lines)
@@ -0,0 +1,100 @@
+"""
+Redução de séries temporais antes de plotar.
+
+Com anos de histórico, plotar um ponto por linha/dia deixa os gráficos lentos
+e ilegíveis. As séries são primeiro reamostradas (diária, semanal ou mensal,
+conforme o período coberto) e, se ainda passarem do orçamento de pontos
+(CHART_MAX_POINTS), reduzidas preservando o formato: LTTB
+(Largest-Triangle-Three-Buckets) ou mínimo/máximo por balde.
+"""
+
+import os
+
+import numpy as np
+
+DAILY_MAX_DAYS = 180
+WEEKLY_MAX_DAYS = 3 * 365
+
+FREQUENCY_LABELS = {'D': 'diário', 'W': 'semanal', 'M': 'mensal'}
+
+
+def max_points():
+    return int(os.getenv('CHART_MAX_POINTS', 500))
+
+
+def choose_frequency(start, end):
+    """'D', 'W' ou 'M' conforme o número de dias entre start e end"""
+    days = (end - start).days
+    if days <= DAILY_MAX_DAYS:
+        return 'D'
+    if days <= WEEKLY_MAX_DAYS:
+        return 'W'
+    return 'M'
+
+
+def lttb(x, y, threshold):
+    """Índices dos pontos escolhidos pelo Largest-Triangle-Three-Buckets"""
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    every = (n - 2) / (threshold - 2)
+    indices = np.empty(threshold, dtype=int)
+    indices[0] = 0
+    a = 0
+    for i in range(threshold - 2):
+        start = int(i * every) + 1
+        end = int((i + 1) * every) + 1
+        next_end = min(int((i + 2) * every) + 1, n)
+
+        avg_x = x[end:next_end].mean() if next_end > end else x[-1]
+        avg_y = y[end:next_end].mean() if next_end > end else y[-1]
+
+        area = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(np.argmax(area))
+        indices[i + 1] = a
+    indices[-1] = n - 1
+    return indices
+
+
+def minmax_buckets(y, threshold):
+    """Índices do mínimo e do máximo de cada balde (preserva picos e vales)"""
+    y = np.asarray(y, dtype=float)
+    n = len(y)
+    if threshold >= n or threshold < 4:
+        return np.arange(n)
+
+    buckets = np.array_split(np.arange(1, n - 1), (threshold - 2) // 2)
+    indices = [0, n - 1]
+    for bucket in buckets:
+        if len(bucket):
+            values = y[bucket]
+            indices.append(bucket[int(np.argmin(values))])
+            indices.append(bucket[int(np.argmax(values))])
+    return np.unique(indices)
+
+
+def downsample(series, threshold=None, method='lttb'):
+    """Reduz uma pd.Series com índice de datas a no máximo `threshold` pontos"""
+    threshold = threshold or max_points()
+    if len(series) <= threshold:
+        return series
+    if method == 'minmax':
+        indices = minmax_buckets(series.values, threshold)
+    else:
+        indices = lttb(series.index.asi8, series.values, threshold)
+    return series.iloc[indices]
+
+
+def resample_sum(series, frequency):
+    """Soma por período; no diário mantém só os dias com lançamentos"""
+    if frequency == 'D':
+        return series.groupby(series.index.normalize()).sum()
+    return series.resample(frequency).sum()
+
+
+def resample_last(series, frequency):
+    """Último valor de cada período (para séries acumuladas)"""
+    return series.resample(frequency).last().dropna()
@@ -0,0 +1,124 @@
+"""
+Previsão de gastos e saldo no fim do mês (/previsao e linha do resumo).
+
+Para cada (tipo, categoria) a previsão é o total do mês até hoje mais o que,
+em média, ainda entrou depois do mesmo ponto do mês nos FORECAST_MONTHS
+(padrão 6) meses anteriores com lançamentos. O ponto é proporcional ao
+tamanho do mês: dia 15 de 30 corresponde ao dia 15,5 de um mês de 31. Sem
+meses anteriores, o ritmo do mês atual é estendido até o fim.
+
+Os totais por dia do mês vêm de um índice do cubo de agregados
+(src/rollup.py), atualizado a cada lançamento, então a previsão lê só os
+meses usados e responde em milissegundos independentemente do histórico.
+"""
+
+import calendar
+import os
+from datetime import datetime
+
+import pytz
+
+TZ = pytz.timezone('America/Sao_Paulo')
+
+MAX_CATEGORIES = 10
+
+
+def today():
+    return datetime.now(TZ).date()
+
+
+def month_label(year, month):
+    return f'{month:02d}/{year}'
+
+
+def forecast_months(day, count=None):
+    """Mês de day e os count meses anteriores, do mais recente ao mais antigo"""
+    count = count if count is not None else int(os.getenv('FORECAST_MONTHS', 6))
+    year, month = day.year, day.month
+    months = []
+    for _ in range(count + 1):
+        months.append((year, month))
+        month -= 1
+        if month == 0:
+            year, month = year - 1, 12
+    return months
+
+
+def remaining(days, fraction, length):
+    """Total dos dias de um mês anterior depois da mesma fração do mês"""
+    return sum(days[int(round(fraction * length)):length])
+
+
+class Forecast:
+    def __init__(self, day, projections):
+        self.day = day
+        self.length = calendar.monthrange(day.year, day.month)[1]
+        # (tipo, categoria) -> (total até hoje, previsto para o fim do mês)
+        self.projections = projections
+
+    @classmethod
+    def build(cls, day, month_days):
+        """month_days: {(ano, mês): {(tipo, categoria): [total de cada dia do mês]}}"""
+        length = calendar.monthrange(day.year, day.month)[1]
+        fraction = day.day / length
+        current = month_days.get((day.year, day.month), {})
+        past = [(calendar.monthrange(year, month)[1], month_days[(year, month)])
+                for year, month in forecast_months(day)[1:] if month_days.get((year, month))]
+
+        projections = {}
+        for key in set(current).union(*(keys for _, keys in past)):
+            spent = sum(current.get(key, ()))
+            if past:
+                rest = sum(remaining(keys[key], fraction, size) if key in keys else 0.0
+                           for size, keys in past) / len(past)
+            else:
+                rest = spent / day.day * (length - day.day)
+            if spent > 0 or rest > 0:
+                projections[key] = (spent, spent + rest)
+        return cls(day, projections)
+
+    @property
+    def month(self):
+        return month_label(self.day.year, self.day.month)
+
+    def total(self, tipo):
+        """(total até hoje, previsto) somando as categorias do tipo"""
+        spent = sum(values[0] for (t, _), values in self.projections.items() if t == tipo)
+        projected = sum(values[1] for (t, _), values in self.projections.items() if t == tipo)
+        return spent, projected
+
+    @property
+    def saldo(self):
+        return self.total('credito')[1] - self.total('despesa')[1] - self.total('investimento')[1]
+
+    def categories(self, tipo='despesa'):
+        """(categoria, total até hoje, previsto), do maior previsto ao menor"""
+        found = [(categoria, spent, projected) for (t, categoria), (spent, projected) in self.projections.items()
+                 if t == tipo]
+        return sorted(found, key=lambda item: item[2], reverse=True)
+
+    @property
+    def empty(self):
+        return not self.projections
+
+    def summary_line(self):
+        return (f"🔮 **Previsão para {self.month}**: R$ {self.total('despesa')[1]:.2f} em gastos, "
+                f"saldo do mês de R$ {self.saldo:.2f}")
+
+    def render(self):
+        if self.empty:
+            return None
+        lines = [f"🔮 Previsão para {self.month} (dia {self.day.day} de {self.length})", ""]
+        for label, tipo in (('💸 Gastos', 'despesa'), ('💰 Créditos', 'credito'), ('📈 Investimentos', 'investimento')):
+            spent, projected = self.total(tipo)
+            if projected > 0:
+                lines.append(f"{label}: R$ {spent:.2f} até hoje → R$ {projected:.2f}")
+        lines.append(f"💳 Saldo do mês previsto: R$ {self.saldo:.2f}")
+        categories = self.categories()
+        if categories:
+            lines += ["", "🏷️ Gastos por categoria:"]
+            for categoria, spent, projected in categories[:MAX_CATEGORIES]:
+                lines.append(f"• {categoria or 'sem categoria'}: R$ {spent:.2f} → R$ {projected:.2f}")
+            if len(categories) > MAX_CATEGORIES:
+                lines.append(f"… e mais {len(categories) - MAX_CATEGORIES} categorias")
+        return "\n".join(lines)
@@ -1,58 +1,130 @@
 import os
-import gspread
-from google.oauth2.service_account import Credentials
 from datetime import datetime
 import pytz
+from .backups import backups
+from .categories import name_resolver
+from .history import recent_transactions, same_transaction
+from .schema import iso_timestamp
+from .storage import row_kind
+from .tenants import tenant_for_chat, storage_for_tenant
+
+# Coluna do valor de cada tipo de transação (ver storage.HEADERS)
+VALUE_COLUMNS = {'despesa': 1, 'credito': 5, 'investimento': 6}
 
 class GoogleSheetsManager:
-    def __init__(self):
-        scope = [
-            "https://spreadsheets.google.com/feeds",
-            "https://www.googleapis.com/auth/drive"
-        ]
+    def __init__(self, storage=None, chat_id=None, tenant=None, resolver=None):
+        self.chat_id = chat_id
+        self.tenant = tenant or tenant_for_chat(chat_id)
+        self.storage = storage or storage_for_tenant(self.tenant)
+        self.resolver = resolver or name_resolver
+        self.tz = pytz.timezone('America/Sao_Paulo')
 
-        credentials_path = os.getenv("GOOGLE_SERVICE_ACCOUNT_FILE")
-        credentials = Credentials.from_service_account_file(credentials_path, scopes=scope)
-        self.client = gspread.authorize(credentials)
+    def resolve_name(self, field, text):
+        """Nome canônico de uma categoria, forma de pagamento ou categoria de investimento"""
+        return self.resolver.resolve(self, field, text)
 
-        self.sheet_id = os.getenv('GOOGLE_SHEET_ID')
-        self.sheet_name = os.getenv('GOOGLE_SHEET_NAME')
-        self.spreadsheet = self.client.open_by_key(self.sheet_id)
-        self.worksheet = self.spreadsheet.worksheet(self.sheet_name)
+    def _now(self):
+        return datetime.now(self.tz).strftime('%d/%m/%Y %H:%M:%S')
 
-        self.tz = pytz.timezone('America/Sao_Paulo')
-        self._initialize_headers()
+    def expense_row(self, data_hora, valor, tipo_pagamento, categoria, descricao):
+        tipo_pagamento = self.resolve_name('pagamento', tipo_pagamento)
+        categoria = self.resolve_name('categoria', categoria)
+        return [data_hora, valor, tipo_pagamento, categoria, descricao, '', '', '', iso_timestamp(data_hora)]
+
+    def credit_row(self, data_hora, valor):
+        return [data_hora, '', '', '', '', valor, '', '', iso_timestamp(data_hora)]
+
+    def investment_row(self, data_hora, valor, categoria_investimento):
+        categoria_investimento = self.resolve_name('investimento', categoria_investimento)
+        return [data_hora, '', '', '', '', '', valor, categoria_investimento, iso_timestamp(data_hora)]
+
+    def transaction_row(self, transaction_data, data_hora):
+        """Linha da planilha a partir do resultado de parse_transaction"""
+        if transaction_data['tipo'] == 'credito':
+            return self.credit_row(data_hora, transaction_data['valor'])
+        if transaction_data['tipo'] == 'investimento':
+            return self.investment_row(data_hora, transaction_data['valor'],
+                                       transaction_data['categoria_investimento'])
+        return self.expense_row(data_hora, transaction_data['valor'], transaction_data['tipo_pagamento'],
+                                transaction_data['categoria'], transaction_data['descricao'])
 
-    def _initialize_headers(self):
+    def _append(self, row):
+        row_number = self.storage.append_row(row)
+        if self.chat_id is not None and row_number is not None:
+            recent_transactions.record(self, row_number, row)
+
+    def edited_row(self, row, field, value):
+        """Linha com um campo trocado (valor, categoria, pagamento ou descricao)"""
+        row = list(row)
+        kind = row_kind(row)
+        if field == 'valor':
+            row[VALUE_COLUMNS[kind]] = value
+        elif field == 'categoria' and kind == 'investimento':
+            row[7] = self.resolve_name('investimento', value)
+        elif field == 'categoria' and kind == 'despesa':
+            row[3] = self.resolve_name('categoria', value)
+        elif field == 'pagamento' and kind == 'despesa':
+            row[2] = self.resolve_name('pagamento', value)
+        elif field == 'descricao' and kind == 'despesa':
+            row[4] = value
+        else:
+            raise ValueError(f"{field} não se aplica a {kind}")
+        return row
+
+    def last_transaction(self):
+        """(índice, linha) da última transação do chat, conferida no backend, ou None"""
+        last = recent_transactions.last(self)
+        if last is None:
+            return None
+        row_number, row = last
+        index = row_number - 2
+        current = self.storage.get_rows(index, index + 1)
+        if not current or not same_transaction(current[0], row):
+            # A planilha foi alterada por fora: a posição guardada não vale mais
+            recent_transactions.discard(self, row_number)
+            return None
+        return index, row
+
+    def undo_last(self):
+        """Remove a última transação do chat; retorna a linha removida, None se não houver"""
         try:
-            headers = self.worksheet.row_values(1)
-            if not headers:
-                self.worksheet.append_row([
-                    'Data e Hora', 'Valor (R$)', 'Tipo de pagamento', 
-                    'Categoria', 'Descrição', 'Créditos', 'Investimento', 'Categoria Investimento'
-                ])
-            elif len(headers) < 8:
-                expected_headers = [
-                    'Data e Hora', 'Valor (R$)', 'Tipo de pagamento', 
-                    'Categoria', 'Descrição', 'Créditos', 'Investimento', 'Categoria Investimento'
-                ]
-                for i, header in enumerate(expected_headers, 1):
-                    if i > len(headers):
-                        self.worksheet.update_cell(1, i, header)
+            last = self.last_transaction()
+            if last is None:
+                return None
+            index, row = last
+            self.storage.delete_row(index, previous=row)
+            return row
         except Exception as e:
-            print(f"Erro ao inicializar cabeçalhos: {e}")
+            print(f"Erro ao desfazer transação: {e}")
+            return False
 
-    def _normalize_text(self, text):
-        return text.lower().replace(' ', '')
+    def edit_last(self, field, value):
+        """
+        Corrige um campo da última transação do chat (field='transacao' troca a
+        transação inteira por value, resultado do parse_transaction, mantendo a
+        data). Retorna (linha antiga, linha nova), None se não houver transação.
+        """
+        try:
+            last = self.last_transaction()
+            if last is None:
+                return None
+            index, row = last
+            if field == 'transacao':
+                new_row = self.transaction_row(value, row[0])
+            else:
+                new_row = self.edited_row(row, field, value)
+            self.storage.update_rows({index: new_row}, previous={index: row})
+            return row, new_row
+        except ValueError:
+            raise
+        except Exception as e:
+            print(f"Erro ao editar transação: {e}")
+            return False
 
     def add_expense(self, valor, tipo_pagamento, categoria, descricao):
         try:
-            now = datetime.now(self.tz)
-            data_hora = now.strftime('%d/%m/%Y %H:%M:%S')
-            tipo_pagamento = self._normalize_text(tipo_pagamento)
-            categoria = self._normalize_text(categoria)
-            row = [data_hora, valor, tipo_pagamento, categoria, descricao, '', '', '']
-            self.worksheet.append_row(row)
+            row = self.expense_row(self._now(), valor, tipo_pagamento, categoria, descricao)
+            self._append(row)
             return True
         except Exception as e:
             print(f"Erro ao adicionar despesa: {e}")
@@ -60,10 +132,8 @@ class GoogleSheetsManager:
 
     def add_credit(self, valor):
         try:
-            now = datetime.now(self.tz)
-            data_hora = now.strftime('%d/%m/%Y %H:%M:%S')
-            row = [data_hora, '', '', '', '', valor, '', '']
-            self.worksheet.append_row(row)
+            row = self.credit_row(self._now(), valor)
+            self._append(row)
             return True
         except Exception as e:
             print(f"Erro ao adicionar crédito: {e}")
@@ -71,30 +141,56 @@ class GoogleSheetsManager:
 
     def add_investment(self, valor, categoria_investimento):
         try:
-            now = datetime.now(self.tz)
-            data_hora = now.strftime('%d/%m/%Y %H:%M:%S')
-            categoria_investimento = self._normalize_text(categoria_investimento)
-            row = [data_hora, '', '', '', '', '', valor, categoria_investimento]
-            self.worksheet.append_row(row)
+            row = self.investment_row(self._now(), valor, categoria_investimento)
+            self._append(row)
             return True
         except Exception as e:
             print(f"Erro ao adicionar investimento: {e}")
             return False
 
+    def add_rows(self, rows):
+        """Grava várias linhas em uma única chamada ao backend"""
+        try:
+            if rows:
+                self.storage.append_rows(rows)
+            return True
+        except Exception as e:
+            print(f"Erro ao adicionar linhas: {e}")
+            return False
+
     def clear_table(self):
+        """Limpa a tabela depois de gravar uma cópia local das linhas (sem cópia, não limpa)"""
         try:
-            all_values = self.worksheet.get_all_values()
-            if len(all_values) > 1:
-                self.worksheet.delete_rows(2, len(all_values))
+            rows = self.storage.get_rows()
+            if rows:
+                backups.save(self.tenant, rows)
+            self.storage.clear()
             return True
         except Exception as e:
             print(f"Erro ao limpar tabela: {e}")
             return False
 
+    def restore_backup(self, backup):
+        """
+        Recarrega uma cópia do /clearTable numa tabela vazia. Retorna quantas
+        linhas voltaram, None se a tabela não está vazia.
+        """
+        try:
+            if not self.storage.is_empty():
+                return None
+            rows = backups.load(backup['path'])
+            batch = int(os.getenv('RESTORE_BATCH_ROWS', 5000))
+            for start in range(0, len(rows), batch):
+                self.storage.append_rows(rows[start:start + batch])
+            return len(rows)
+        except Exception as e:
+            print(f"Erro ao restaurar cópia: {e}")
+            return False
+
     def get_all_data(self):
         try:
-            records = self.worksheet.get_all_records()
+            records = self.storage.get_records()
             return records
         except Exception as e:
             print(f"Erro ao obter dados: {e}")
-            return [] 
\ No newline at end of file
+            return []
\ No newline at end of file
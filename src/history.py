@@ -0,0 +1,114 @@
+"""
+Últimas transações de cada chat, para o /desfazer e o /editar.
+
+Cada lançamento guarda o número da linha devolvido pelo append e a linha como
+foi gravada, então desfazer ou corrigir é uma única chamada ao backend (mais a
+leitura daquela linha, para conferir que ela não mudou na planilha), sem
+baixar a planilha inteira. Quando uma linha é removida, as posições das linhas
+seguintes são ajustadas; limpar a tabela esquece tudo do tenant.
+
+O índice entra no snapshot de estado (só backends persistentes) e guarda as
+UNDO_HISTORY (padrão 20) transações mais recentes de cada chat.
+"""
+
+import os
+import threading
+import weakref
+
+from .storage import parse_amount, row_kind
+
+
+def same_transaction(current, row):
+    """A linha lida do backend ainda é a transação guardada no índice"""
+    return (str(current[0]) == str(row[0]) and str(current[4]) == str(row[4])
+            and row_kind(current) == row_kind(row))
+
+
+def describe_row(row):
+    kind = row_kind(row)
+    if kind == 'credito':
+        return f"R$ {parse_amount(row[5]):.2f} - crédito"
+    if kind == 'investimento':
+        return f"R$ {parse_amount(row[6]):.2f} - investimento - {row[7]}"
+    return f"R$ {parse_amount(row[1]):.2f} - {row[2]} - {row[3]} ({row[4]})"
+
+
+class RecentTransactions:
+    def __init__(self, size=None):
+        self.size = size or int(os.getenv('UNDO_HISTORY', 20))
+        # tenant -> {'identity', 'storage' (ref fraca), 'chats': {chat_id: [[número da linha, linha], ...]}}
+        self._tenants = {}
+        self._storages = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    def _tenant(self, sheets_manager):
+        """Entradas do tenant (descartadas se o backend não é mais o mesmo)"""
+        storage = sheets_manager.storage
+        if storage not in self._storages:
+            self._storages[storage] = sheets_manager.tenant
+            storage.add_listener(self._on_change)
+        entry = self._tenants.get(sheets_manager.tenant)
+        if entry is None or not self._same_storage(entry, storage):
+            entry = self._tenants[sheets_manager.tenant] = {
+                'identity': storage.identity(), 'storage': weakref.ref(storage), 'chats': {}}
+        return entry['chats']
+
+    def _same_storage(self, entry, storage):
+        # Backends em memória não têm identidade: vale o próprio objeto
+        if entry['identity'] is None:
+            return entry['storage']() is storage
+        return entry['identity'] == storage.identity()
+
+    def record(self, sheets_manager, row_number, row):
+        with self._lock:
+            recent = self._tenant(sheets_manager).setdefault(str(sheets_manager.chat_id), [])
+            recent.append([row_number, list(row)])
+            del recent[:-self.size]
+
+    def last(self, sheets_manager):
+        """(número da linha, linha) da última transação do chat, ou None"""
+        with self._lock:
+            recent = self._tenant(sheets_manager).get(str(sheets_manager.chat_id))
+            if not recent:
+                return None
+            row_number, row = recent[-1]
+            return row_number, list(row)
+
+    def discard(self, sheets_manager, row_number):
+        with self._lock:
+            recent = self._tenant(sheets_manager).get(str(sheets_manager.chat_id), [])
+            recent[:] = [entry for entry in recent if entry[0] != row_number]
+
+    def _on_change(self, storage, appended, cleared, edited):
+        with self._lock:
+            tenant = self._storages.get(storage)
+            entry = self._tenants.get(tenant)
+            if entry is None or not self._same_storage(entry, storage):
+                return
+            if cleared:
+                entry['chats'] = {}
+                return
+            for index, _, new in edited or ():
+                row_number = index + 2
+                for recent in entry['chats'].values():
+                    if new is not None:
+                        for item in recent:
+                            if item[0] == row_number:
+                                item[1] = list(new)
+                        continue
+                    recent[:] = [[number - 1 if number > row_number else number, row]
+                                 for number, row in recent if number != row_number]
+
+    def dump(self):
+        with self._lock:
+            return {tenant: {'identity': entry['identity'],
+                             'chats': {chat: [list(item) for item in recent] for chat, recent in entry['chats'].items()}}
+                    for tenant, entry in self._tenants.items() if entry['identity'] is not None}
+
+    def restore(self, state):
+        with self._lock:
+            for tenant, entry in state.items():
+                self._tenants.setdefault(tenant, dict(entry, storage=None))
+
+
+recent_transactions = RecentTransactions()
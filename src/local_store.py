@@ -0,0 +1,69 @@
+"""
+Armazenamento local de configurações do bot (orçamentos, preferências etc.).
+
+Cada store é um arquivo JSON em DATA_DIR (padrão "data/"), carregado uma vez
+e regravado de forma atômica a cada alteração. Não guarda transações: elas
+continuam no backend de armazenamento.
+"""
+
+import json
+import os
+import threading
+
+
+def data_dir():
+    return os.getenv('DATA_DIR', 'data')
+
+
+class JsonStore:
+    def __init__(self, name, path=None):
+        self.path = path or os.path.join(data_dir(), f'{name}.json')
+        self._lock = threading.RLock()
+        self._data = None
+
+    def _load(self):
+        if self._data is None:
+            try:
+                with open(self.path, encoding='utf-8') as f:
+                    self._data = json.load(f)
+            except FileNotFoundError:
+                self._data = {}
+            except (OSError, ValueError) as e:
+                print(f"Erro ao ler {self.path}: {e}")
+                self._data = {}
+        return self._data
+
+    def _save(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temp_path = f'{self.path}.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(self._data, f, ensure_ascii=False, indent=2)
+        os.replace(temp_path, self.path)
+
+    def get(self, key, default=None):
+        with self._lock:
+            return self._load().get(str(key), default)
+
+    def set(self, key, value):
+        with self._lock:
+            self._load()[str(key)] = value
+            self._save()
+
+    def update(self, key, func, default=None):
+        """Aplica func ao valor atual da chave e grava o resultado"""
+        with self._lock:
+            data = self._load()
+            data[str(key)] = func(data.get(str(key), default))
+            self._save()
+            return data[str(key)]
+
+    def delete(self, key):
+        with self._lock:
+            if self._load().pop(str(key), None) is not None:
+                self._save()
+
+    def items(self):
+        with self._lock:
+            return list(self._load().items())
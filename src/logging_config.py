@@ -0,0 +1,142 @@
+"""
+Configuração de logging do bot.
+
+Os handlers do caminho de requisição só enfileiram o registro (QueueHandler);
+a formatação em JSON e a escrita em disco/console acontecem em uma thread de
+fundo (QueueListener). Payloads grandes são resumidos ou amostrados e os
+níveis podem ser ajustados por subsistema:
+
+    LOG_LEVEL=INFO
+    LOG_LEVELS=src.webhook_server=WARNING,src.tracing=INFO,httpx=WARNING
+    LOG_PAYLOAD_SAMPLE_RATE=0.01
+"""
+
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import time
+
+DEFAULT_LEVELS = {
+    # Bibliotecas muito verbosas em INFO (uma linha por requisição HTTP)
+    'httpx': logging.WARNING,
+    'telegram.ext.Application': logging.WARNING,
+    'werkzeug': logging.WARNING,
+}
+
+MAX_MESSAGE_LENGTH = int(os.getenv('LOG_MAX_MESSAGE_LENGTH', 2000))
+
+_RESERVED_ATTRS = set(vars(logging.makeLogRecord({}))) | {'message', 'asctime'}
+
+_listener = None
+
+
+class JsonFormatter(logging.Formatter):
+    """Formata cada registro como uma linha JSON"""
+
+    def format(self, record):
+        entry = {
+            'ts': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(record.created)) + f'.{int(record.msecs):03d}',
+            'level': record.levelname,
+            'logger': record.name,
+            'message': truncate(record.getMessage()),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED_ATTRS and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_text:
+            entry['exc_info'] = record.exc_text
+        elif record.exc_info:
+            entry['exc_info'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class BackgroundQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler que não formata no thread de quem loga: apenas resolve a
+    mensagem e o traceback (que não podem atravessar a fila) e enfileira.
+    """
+
+    def prepare(self, record):
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def truncate(text, limit=None):
+    limit = limit or MAX_MESSAGE_LENGTH
+    if len(text) <= limit:
+        return text
+    return f"{text[:limit]}... [{len(text) - limit} caracteres omitidos]"
+
+
+def summarize_update(update_data):
+    """Resumo de um update sem dados financeiros (só tamanhos e identificadores)"""
+    message = (update_data or {}).get('message') or (update_data or {}).get('edited_message') or {}
+    text = message.get('text') or ''
+    summary = {
+        'update_id': (update_data or {}).get('update_id'),
+        'chat_id': (message.get('chat') or {}).get('id'),
+        'text_length': len(text),
+    }
+    if text.startswith('/'):
+        summary['command'] = text.split()[0]
+    return summary
+
+
+def should_sample(rate=None):
+    """Decide se um payload completo deve ser logado (LOG_PAYLOAD_SAMPLE_RATE)"""
+    if rate is None:
+        rate = float(os.getenv('LOG_PAYLOAD_SAMPLE_RATE', 0))
+    return rate > 0 and random.random() < rate
+
+
+def parse_levels(spec):
+    levels = {}
+    for item in (spec or '').split(','):
+        name, _, level = item.partition('=')
+        if name.strip() and level.strip():
+            levels[name.strip()] = logging.getLevelName(level.strip().upper())
+    return levels
+
+
+def setup_logging(log_file=None):
+    """Instala o logging em fila com saída JSON; pode ser chamada mais de uma vez"""
+    global _listener
+
+    root = logging.getLogger()
+    root.setLevel(logging.getLevelName(os.getenv('LOG_LEVEL', 'INFO').upper()))
+
+    levels = dict(DEFAULT_LEVELS)
+    levels.update(parse_levels(os.getenv('LOG_LEVELS')))
+    for name, level in levels.items():
+        logging.getLogger(name).setLevel(level)
+
+    if _listener is not None:
+        return _listener
+
+    formatter = JsonFormatter()
+    handlers = [logging.StreamHandler()]
+    if log_file:
+        directory = os.path.dirname(log_file)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        handlers.append(logging.FileHandler(log_file))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    log_queue = queue.SimpleQueue()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(BackgroundQueueHandler(log_queue))
+
+    _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
+    return _listener
@@ -0,0 +1,263 @@
+"""
+Métricas no formato de exposição do Prometheus.
+
+Implementação mínima de contadores, gauges e histogramas com labels, sem
+dependências externas. O registry é renderizado pelo endpoint /metrics do
+servidor webhook.
+"""
+
+import functools
+import math
+import threading
+import time
+from contextlib import contextmanager
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+BYTES_BUCKETS = (10_000, 50_000, 100_000, 250_000, 500_000, 1_000_000, 2_500_000, 5_000_000)
+
+
+def _format_value(value):
+    if value == math.inf:
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _format_labels(names, values, extra=None):
+    pairs = list(zip(names, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ''
+    escaped = (str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, v in pairs)
+    return '{' + ','.join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + '}'
+
+
+class _Metric:
+    type = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} espera os labels {self.labelnames}, recebeu {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def samples(self):
+        raise NotImplementedError
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.type}']
+        for suffix, labelvalues, extra, value in self.samples():
+            labels = _format_labels(self.labelnames, labelvalues, extra)
+            lines.append(f'{self.name}{suffix}{labels} {_format_value(value)}')
+        return '\n'.join(lines)
+
+
+class Counter(_Metric):
+    type = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(self._key(labels), 0)
+
+    def samples(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        return [('', key, None, value) for key, value in items]
+
+
+class Gauge(_Metric):
+    type = 'gauge'
+
+    def __init__(self, name, documentation, labelnames=(), callback=None):
+        super().__init__(name, documentation, labelnames)
+        self.callback = callback
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def set_function(self, callback):
+        """Lê o valor sob demanda na hora da coleta (gauge sem labels)"""
+        self.callback = callback
+
+    def value(self, **labels):
+        return self._values.get(self._key(labels), 0)
+
+    def samples(self):
+        if self.callback is not None:
+            try:
+                return [('', (), None, self.callback())]
+            except Exception:
+                return []
+        with self._lock:
+            items = sorted(self._values.items())
+        return [('', key, None, value) for key, value in items]
+
+
+class Histogram(_Metric):
+    type = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[0][i] += 1
+                    break
+            state[1] += value
+            state[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def count(self, **labels):
+        state = self._values.get(self._key(labels))
+        return state[2] if state else 0
+
+    def samples(self):
+        with self._lock:
+            items = sorted((key, (list(s[0]), s[1], s[2])) for key, s in self._values.items())
+        samples = []
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                samples.append(('_bucket', key, ('le', _format_value(bound)), cumulative))
+            samples.append(('_sum', key, None, total))
+            samples.append(('_count', key, None, count))
+        return samples
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            if metric.name in self._metrics:
+                return self._metrics[metric.name]
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=(), callback=None):
+        return self.register(Gauge(name, documentation, labelnames, callback))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self):
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return '\n'.join(metric.render() for metric in metrics) + '\n'
+
+
+registry = Registry()
+
+HANDLER_LATENCY = registry.histogram(
+    'bot_handler_latency_seconds', 'Tempo de execução dos handlers do bot', ['handler'])
+HANDLER_ERRORS = registry.counter(
+    'bot_handler_errors_total', 'Exceções não tratadas nos handlers do bot', ['handler'])
+
+SHEETS_REQUESTS = registry.counter(
+    'sheets_api_requests_total', 'Chamadas à API do Google Sheets', ['operation'])
+SHEETS_ERRORS = registry.counter(
+    'sheets_api_errors_total', 'Chamadas à API do Google Sheets que falharam', ['operation'])
+SHEETS_LATENCY = registry.histogram(
+    'sheets_api_latency_seconds', 'Latência das chamadas à API do Google Sheets', ['operation'])
+
+CHART_RENDER_SECONDS = registry.histogram(
+    'chart_render_seconds', 'Tempo para renderizar cada gráfico', ['chart'])
+CHART_RENDER_BYTES = registry.histogram(
+    'chart_render_bytes', 'Tamanho do PNG de cada gráfico', ['chart'], buckets=BYTES_BUCKETS)
+
+WEBHOOK_IN_FLIGHT = registry.gauge(
+    'webhook_requests_in_flight', 'Requisições do webhook em processamento')
+WEBHOOK_DUPLICATES = registry.counter(
+    'webhook_duplicate_updates_total', 'Updates reenviados pelo Telegram e descartados')
+UPDATE_QUEUE_DEPTH = registry.gauge(
+    'telegram_update_queue_depth', 'Updates aguardando na fila da aplicação do Telegram')
+EVENT_LOOP_LAG = registry.gauge(
+    'event_loop_lag_seconds', 'Atraso da última medição do loop asyncio')
+EVENT_LOOP_LAG_HISTOGRAM = registry.histogram(
+    'event_loop_lag_distribution_seconds', 'Distribuição do atraso do loop asyncio',
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 5))
+
+
+def instrument_handler(name):
+    """Decorator que mede a latência e as exceções de um handler assíncrono"""
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            except Exception:
+                HANDLER_ERRORS.inc(handler=name)
+                raise
+            finally:
+                HANDLER_LATENCY.observe(time.perf_counter() - started, handler=name)
+        return wrapper
+    return decorator
+
+
+def track_sheets_call(operation, func, *args, **kwargs):
+    """Executa uma chamada ao gspread registrando contagem, latência e erros"""
+    SHEETS_REQUESTS.inc(operation=operation)
+    started = time.perf_counter()
+    try:
+        return func(*args, **kwargs)
+    except Exception:
+        SHEETS_ERRORS.inc(operation=operation)
+        raise
+    finally:
+        SHEETS_LATENCY.observe(time.perf_counter() - started, operation=operation)
+
+
+async def monitor_event_loop(interval=0.5):
+    """Mede continuamente quanto o loop atrasa para acordar um sleep"""
+    import asyncio
+
+    loop = asyncio.get_running_loop()
+    while True:
+        expected = loop.time() + interval
+        await asyncio.sleep(interval)
+        lag = max(loop.time() - expected, 0.0)
+        EVENT_LOOP_LAG.set(lag)
+        EVENT_LOOP_LAG_HISTOGRAM.observe(lag)
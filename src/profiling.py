@@ -0,0 +1,163 @@
+"""
+Profiling sob demanda do /statistics.
+
+Um administrador (ADMIN_CHAT_IDS) usa /profile N para que as próximas N
+chamadas de /statistics rodem sob o cProfile. Ao final de cada chamada o bot
+envia ao administrador o arquivo .prof (abre no snakeviz ou em ferramentas de
+flamegraph como o flameprof) e um resumo em texto das funções mais caras.
+
+Só o trabalho síncrono é medido: as funções envolvidas com profile_in_thread
+(a geração do relatório em asyncio.to_thread), cada uma com seu próprio
+profile na thread de trabalho. O handler em si não roda sob o cProfile, porque
+enquanto ele espera um await outras corrotinas rodam no event loop e
+entrariam no profile; assim chamadas profiladas simultâneas não interferem
+entre si. Um /statistics que não gerou o relatório (servido do cache ou do
+snapshot, unido a um cálculo já em andamento ou recusado pelo cooldown) não
+tem o que medir, e o administrador recebe o motivo.
+"""
+
+import cProfile
+import contextvars
+import functools
+import io
+import logging
+import marshal
+import os
+import pstats
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Profiles extras criados em threads de trabalho durante um handler profilado
+_worker_profiles = contextvars.ContextVar('worker_profiles', default=None)
+# Por que o handler profilado não gerou o relatório (ver OUTCOMES)
+_outcome = contextvars.ContextVar('profile_outcome', default=None)
+
+OUTCOMES = {
+    'cache': 'veio do cache',
+    'snapshot': 'veio do snapshot de estado',
+    'coalesced': 'foi unido a um cálculo já em andamento (o profile vai para o pedido que o iniciou)',
+    'cooldown': 'foi recusado pelo cooldown do chat',
+}
+
+
+def admin_chat_ids():
+    raw = os.getenv('ADMIN_CHAT_IDS', '')
+    return {int(item) for item in raw.replace(';', ',').split(',') if item.strip().lstrip('-').isdigit()}
+
+
+def is_admin(chat_id):
+    return chat_id in admin_chat_ids()
+
+
+class StatisticsProfiler:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.remaining = 0
+        self.requested_by = None
+
+    def arm(self, count, chat_id):
+        with self._lock:
+            self.remaining = max(count, 0)
+            self.requested_by = chat_id if count > 0 else None
+
+    def take(self):
+        """Consome uma das N execuções agendadas; retorna o chat que pediu"""
+        with self._lock:
+            if self.remaining <= 0:
+                return None
+            self.remaining -= 1
+            return self.requested_by
+
+
+profiler = StatisticsProfiler()
+
+
+def mark_outcome(outcome):
+    """Registra, se o handler atual está sendo profilado, por que ele não gerou o relatório"""
+    found = _outcome.get()
+    if found is not None and not found:
+        found.append(outcome)
+
+
+def _summary(stats, limit=40):
+    output = io.StringIO()
+    stats.stream = output
+    stats.strip_dirs().sort_stats('cumulative').print_stats(limit)
+    return output.getvalue()
+
+
+def profiled(name):
+    """Decorator que roda o handler sob o cProfile quando o profiler está armado"""
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(update, context, *args, **kwargs):
+            admin_chat = profiler.take()
+            if admin_chat is None:
+                return await func(update, context, *args, **kwargs)
+
+            workers = []
+            outcome = []
+            token = _worker_profiles.set(workers)
+            outcome_token = _outcome.set(outcome)
+            try:
+                return await func(update, context, *args, **kwargs)
+            finally:
+                _worker_profiles.reset(token)
+                _outcome.reset(outcome_token)
+                await _send_profile(context.bot, admin_chat, name, *workers,
+                                    outcome=outcome[0] if outcome else None)
+        return wrapper
+    return decorator
+
+
+def profile_in_thread(func):
+    """
+    Envolve uma função que roda em outra thread (asyncio.to_thread) para que
+    ela seja medida quando o handler que a chamou está sendo profilado.
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        workers = _worker_profiles.get()
+        if workers is None:
+            return func(*args, **kwargs)
+        profile = cProfile.Profile()
+        profile.enable()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            profile.disable()
+            workers.append(profile)
+    return wrapper
+
+
+async def _send_profile(bot, chat_id, name, *profiles, outcome=None):
+    from telegram import InputFile
+
+    try:
+        if not profiles:
+            reason = OUTCOMES.get(outcome, 'não gerou o relatório')
+            await bot.send_message(
+                chat_id=chat_id,
+                text=f"🔬 /{name} {reason}; nada para profilar (restam {profiler.remaining})"
+            )
+            return
+        stamp = time.strftime('%Y%m%d-%H%M%S')
+        stats = pstats.Stats(*profiles)
+        raw = io.BytesIO()
+        raw.write(marshal.dumps(stats.stats))
+        raw.seek(0)
+
+        await bot.send_document(
+            chat_id=chat_id,
+            document=InputFile(raw, filename=f'{name}-{stamp}.prof'),
+            caption=f"🔬 Profile de /{name} (restam {profiler.remaining})"
+        )
+        summary = io.BytesIO(_summary(stats).encode('utf-8'))
+        await bot.send_document(
+            chat_id=chat_id,
+            document=InputFile(summary, filename=f'{name}-{stamp}.txt')
+        )
+    except Exception as e:
+        logger.error(f"Erro ao enviar profile: {e}")
@@ -0,0 +1,172 @@
+"""
+Transações recorrentes (salário, aluguel, assinaturas).
+
+As regras ficam em DATA_DIR/recurring.json, por tenant, cada uma com o dia do
+mês, a transação já interpretada por parse_transaction e a data da próxima
+ocorrência. Um job do JobQueue (RECURRING_INTERVAL, em segundos) lança as
+ocorrências vencidas de todos os tenants: todas as linhas de um tenant vão em
+uma única chamada append_rows e só então a próxima data de cada regra avança.
+Depois de um período fora do ar o job lança os meses atrasados, e rodar de
+novo não duplica nada porque as datas já avançaram.
+"""
+
+import calendar
+import logging
+import os
+from datetime import date, datetime, timedelta
+
+import pytz
+
+from .google_sheets import GoogleSheetsManager
+from .local_store import JsonStore
+from .metrics import registry as metrics_registry
+from .tenants import write_scheduler
+
+logger = logging.getLogger(__name__)
+
+TZ = pytz.timezone('America/Sao_Paulo')
+
+# Limite de meses atrasados lançados por regra em uma execução
+MAX_CATCH_UP = 24
+
+RECURRING_MATERIALIZED = metrics_registry.counter(
+    'recurring_materialized_total', 'Ocorrências de transações recorrentes lançadas')
+
+
+def today():
+    return datetime.now(TZ).date()
+
+
+def occurrence(year, month, dia):
+    """Data do dia `dia` no mês, limitada ao último dia (ex.: 31 em fevereiro)"""
+    return date(year, month, min(dia, calendar.monthrange(year, month)[1]))
+
+
+def next_occurrence(dia, after):
+    """Primeira ocorrência em ou depois de `after`"""
+    candidate = occurrence(after.year, after.month, dia)
+    if candidate >= after:
+        return candidate
+    return following_occurrence(dia, candidate)
+
+
+def following_occurrence(dia, current):
+    year, month = (current.year + 1, 1) if current.month == 12 else (current.year, current.month + 1)
+    return occurrence(year, month, dia)
+
+
+def describe(transaction_data):
+    if transaction_data['tipo'] == 'credito':
+        return f"{transaction_data['valor']:.2f} - credito"
+    if transaction_data['tipo'] == 'investimento':
+        return f"{transaction_data['valor']:.2f} - investimento - {transaction_data['categoria_investimento']}"
+    return (f"{transaction_data['valor']:.2f} - {transaction_data['tipo_pagamento']} - "
+            f"{transaction_data['categoria']} ({transaction_data['descricao']})")
+
+
+class RecurringManager:
+    def __init__(self, store=None):
+        self.store = store or JsonStore('recurring')
+
+    def rules(self, tenant):
+        return self.store.get(tenant, [])
+
+    def add_rule(self, tenant, dia, transaction_data, start=None):
+        start = start or today()
+        rule = {
+            'dia': dia,
+            'transacao': transaction_data,
+            'proxima': next_occurrence(dia, start).isoformat(),
+        }
+
+        def update(rules):
+            rules = list(rules or [])
+            rule['id'] = max((r['id'] for r in rules), default=0) + 1
+            rules.append(rule)
+            return rules
+
+        self.store.update(tenant, update)
+        return rule
+
+    def remove_rule(self, tenant, rule_id):
+        rules = self.rules(tenant)
+        remaining = [r for r in rules if r['id'] != rule_id]
+        if len(remaining) == len(rules):
+            return False
+        if remaining:
+            self.store.set(tenant, remaining)
+        else:
+            self.store.delete(tenant)
+        return True
+
+    def due_rows(self, sheets_manager, rules, until):
+        """Linhas vencidas até `until` e as regras com a próxima data já avançada"""
+        rows = []
+        updated = []
+        for rule in rules:
+            rule = dict(rule)
+            proxima = date.fromisoformat(rule['proxima'])
+            for _ in range(MAX_CATCH_UP):
+                if proxima > until:
+                    break
+                data_hora = proxima.strftime('%d/%m/%Y 00:00:00')
+                rows.append(sheets_manager.transaction_row(rule['transacao'], data_hora))
+                proxima = following_occurrence(rule['dia'], proxima)
+            if proxima <= until:
+                # Atraso maior que o limite: pula direto para a primeira data depois de until
+                proxima = next_occurrence(rule['dia'], until + timedelta(days=1))
+            rule['proxima'] = proxima.isoformat()
+            updated.append(rule)
+        return rows, updated
+
+    def materialize(self, tenant, until=None, sheets_manager=None):
+        """Lança as ocorrências vencidas do tenant; retorna quantas linhas foram gravadas"""
+        until = until or today()
+        rules = self.rules(tenant)
+        if not rules:
+            return 0
+
+        sheets_manager = sheets_manager or GoogleSheetsManager(tenant=tenant)
+        rows, updated = self.due_rows(sheets_manager, rules, until)
+        if not rows:
+            return 0
+        if not sheets_manager.add_rows(rows):
+            return 0
+
+        # Só avança as datas depois da escrita: se ela falhar, a próxima execução tenta de novo
+        by_id = {rule['id']: rule for rule in updated}
+        self.store.update(tenant, lambda current: [by_id.get(r['id'], r) for r in (current or [])])
+        RECURRING_MATERIALIZED.inc(len(rows))
+        return len(rows)
+
+    async def materialize_async(self, tenant, until=None):
+        return await write_scheduler.run_exclusive(tenant, self.materialize, tenant, until)
+
+    async def run_due(self):
+        total = 0
+        for tenant, _ in self.store.items():
+            try:
+                total += await self.materialize_async(tenant)
+            except Exception as e:
+                logger.error(f"Erro ao lançar recorrentes do tenant {tenant}: {e}")
+        if total:
+            logger.info(f"{total} transações recorrentes lançadas")
+        return total
+
+
+recurring_manager = RecurringManager()
+
+
+async def materialize_recurring_job(context):
+    await recurring_manager.run_due()
+
+
+def schedule_recurring(application):
+    """Agenda o lançamento das recorrentes; a primeira execução recupera o atraso"""
+    if application.job_queue is None:
+        logger.warning("JobQueue indisponível (instale python-telegram-bot[job-queue]); recorrentes não serão lançadas")
+        return None
+    interval = float(os.getenv('RECURRING_INTERVAL', 3600))
+    return application.job_queue.run_repeating(
+        materialize_recurring_job, interval=interval, first=10, name='materialize_recurring'
+    )
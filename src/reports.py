@@ -0,0 +1,310 @@
+"""
+Geração dos relatórios do /statistics.
+
+O relatório (resumo + gráficos) é calculado fora do loop asyncio. Pedidos
+idênticos em andamento, com a mesma fonte de dados (tenant) e os mesmos
+parâmetros, são unidos em um único cálculo (single-flight) e o resultado é
+entregue a todos que estão esperando. Um cooldown por chat
+(STATISTICS_COOLDOWN, em segundos) faz com que toques repetidos no
+/statistics custem um relatório em vez de N.
+
+Resumo, gráficos e texto são derivados do cubo de agregados do tenant
+(src/rollup.py), não das linhas da planilha. Os relatórios ficam em cache
+junto com a versão dos dados (incrementada a cada escrita no backend). Um job
+do JobQueue recalcula em segundo plano os relatórios desatualizados dos
+tenants que já pediram /statistics, pulando os que não mudaram e os que ainda
+estão recebendo escritas:
+
+    REPORT_REFRESH_INTERVAL=300   # segundos entre execuções do job
+    REPORT_QUIET_SECONDS=15       # espera esse tempo sem escritas antes de recalcular
+    REPORT_MAX_AGE=3600           # recalcula mesmo sem escritas (edições feitas direto na planilha)
+
+Os relatórios em cache entram no snapshot de estado (src/snapshots.py). Após
+um restart, um relatório restaurado é servido se o cubo reconciliado do tenant
+tiver as mesmas linhas de quando ele foi gerado.
+"""
+
+import asyncio
+import base64
+import io
+import logging
+import os
+import threading
+import time
+
+from .local_store import JsonStore
+from .metrics import registry as metrics_registry
+from .profiling import mark_outcome, profile_in_thread
+from .rollup import cubes
+from .text_report import TextReport
+from .tracing import span
+
+logger = logging.getLogger(__name__)
+
+STATISTICS_COALESCED = metrics_registry.counter(
+    'statistics_coalesced_total', 'Pedidos de relatório atendidos por um cálculo já em andamento')
+STATISTICS_COOLDOWN_HITS = metrics_registry.counter(
+    'statistics_cooldown_hits_total', 'Pedidos de relatório recusados pelo cooldown do chat')
+STATISTICS_CACHE = metrics_registry.counter(
+    'statistics_cache_total', 'Pedidos de relatório por resultado do cache (hit ou miss)', ['result'])
+REPORT_REFRESHES = metrics_registry.counter(
+    'report_refreshes_total', 'Execuções do job de pré-cálculo por tenant e resultado', ['result'])
+
+# O pyplot mantém estado global: um relatório renderiza por vez
+_render_lock = threading.Lock()
+
+
+class Report:
+    def __init__(self, summary, charts, rows, version=None, encoded=None):
+        self.summary = summary
+        self.charts = charts
+        self.rows = rows
+        self.version = version
+        self.created = time.monotonic()
+        # Gráficos em base64 para o snapshot, codificados uma vez aqui (na
+        # thread que gera o relatório) e não a cada coleta do snapshot no loop
+        self.encoded = encoded or {name: base64.b64encode(png).decode('ascii') for name, png in charts.items()}
+
+    def age(self):
+        return time.monotonic() - self.created
+
+    def chart_files(self):
+        """Um buffer novo por envio, já que o relatório é compartilhado"""
+        for name, png in self.charts.items():
+            yield name, io.BytesIO(png)
+
+    def dump(self):
+        return {
+            'summary': self.summary,
+            'charts': self.encoded,
+            'rows': self.rows,
+        }
+
+    @classmethod
+    def restore(cls, state):
+        charts = {name: base64.b64decode(png) for name, png in state['charts'].items()}
+        return cls(state['summary'], charts, state['rows'], encoded=state['charts'])
+
+
+FORMATS = ('graficos', 'texto')
+DEFAULT_FORMAT = 'graficos'
+
+# Formato padrão do /statistics escolhido por cada chat com /formato
+preferences = JsonStore('preferences')
+
+
+def parse_format(text):
+    text = (text or '').strip().lower().replace('á', 'a')
+    return text if text in FORMATS else None
+
+
+def preferred_format(chat_id):
+    return (preferences.get(chat_id) or {}).get('formato', DEFAULT_FORMAT)
+
+
+def set_preferred_format(chat_id, formato):
+    preferences.update(chat_id, lambda current: dict(current or {}, formato=formato))
+
+
+def cube_snapshot(sheets_manager):
+    """Snapshot do cubo do tenant, relendo o backend se o cubo estiver velho"""
+    cube = cubes.cube_for(sheets_manager)
+    if not cubes.is_fresh(cube):
+        with span('storage'):
+            cube.load()
+    return cube.snapshot()
+
+
+def build_report(sheets_manager, snapshot=None):
+    """Gera resumo e gráficos a partir do cubo; retorna None se não houver dados"""
+    # Importado aqui: o modo texto não deve carregar o matplotlib
+    from .statistics import StatisticsGenerator
+
+    if snapshot is None:
+        snapshot = cube_snapshot(sheets_manager)
+    if snapshot.empty:
+        return None
+
+    with span('aggregation'):
+        stats_gen = StatisticsGenerator.from_cube(snapshot)
+        summary = stats_gen.get_summary_text()
+
+    with span('render'):
+        with _render_lock:
+            charts = stats_gen.generate_all_statistics()
+
+    return Report(summary, {name: buffer.getvalue() for name, buffer in charts.items()}, snapshot.rows, snapshot.version)
+
+
+def build_text_report(sheets_manager, snapshot=None):
+    """Relatório em texto, sem gráficos; retorna None se não houver dados"""
+    if snapshot is None:
+        snapshot = cube_snapshot(sheets_manager)
+
+    with span('aggregation'):
+        text = TextReport(snapshot=snapshot).render()
+
+    if text is None:
+        return None
+    return Report(text, {}, snapshot.rows, snapshot.version)
+
+
+class SingleFlight:
+    """Une chamadas concorrentes com a mesma chave em uma única execução"""
+
+    def __init__(self):
+        self._calls = {}
+
+    def in_flight(self, key):
+        return key in self._calls
+
+    async def do(self, key, func, *args):
+        task = self._calls.get(key)
+        if task is not None:
+            STATISTICS_COALESCED.inc()
+            mark_outcome('coalesced')
+        else:
+            task = asyncio.ensure_future(func(*args))
+            self._calls[key] = task
+            task.add_done_callback(lambda _: self._calls.pop(key, None))
+        # shield: se quem iniciou o cálculo for cancelado, os outros continuam esperando
+        return await asyncio.shield(task)
+
+
+class Cooldown:
+    def __init__(self, seconds):
+        self.seconds = seconds
+        self._last = {}
+
+    def hit(self, key):
+        """Registra um pedido; retorna quantos segundos faltam se ainda estiver no cooldown"""
+        now = time.monotonic()
+        last = self._last.get(key)
+        if last is not None and now - last < self.seconds:
+            STATISTICS_COOLDOWN_HITS.inc()
+            mark_outcome('cooldown')
+            return self.seconds - (now - last)
+        self._last[key] = now
+        return 0
+
+    def reset(self, key):
+        self._last.pop(key, None)
+
+
+class ReportService:
+    def __init__(self, cooldown=None, max_age=None, quiet_seconds=None):
+        if cooldown is None:
+            cooldown = float(os.getenv('STATISTICS_COOLDOWN', 30))
+        self.max_age = max_age if max_age is not None else float(os.getenv('REPORT_MAX_AGE', 3600))
+        self.quiet_seconds = quiet_seconds if quiet_seconds is not None else float(os.getenv('REPORT_QUIET_SECONDS', 15))
+        self.flights = SingleFlight()
+        self.cooldown = Cooldown(cooldown)
+        self.cache = {}
+        # Relatórios do snapshot, ainda não confirmados contra o cubo reconciliado
+        self.restored = {}
+        # (tenant, formato) já pedidos: são os que o job mantém aquecidos
+        self.tenants = {}
+
+    def cached(self, sheets_manager, formato=DEFAULT_FORMAT):
+        """Relatório em cache se ainda corresponder à versão atual dos dados"""
+        report = self.cache.get((sheets_manager.tenant, formato))
+        if report is None or report.version != sheets_manager.storage.version:
+            return None
+        if report.age() > self.max_age:
+            return None
+        return report
+
+    async def get(self, sheets_manager, formato=DEFAULT_FORMAT):
+        self.tenants[(sheets_manager.tenant, formato)] = sheets_manager
+        report = self.cached(sheets_manager, formato)
+        if report is not None:
+            STATISTICS_CACHE.inc(result='hit')
+            mark_outcome('cache')
+            return report
+        report = await self._from_snapshot(sheets_manager, formato)
+        if report is not None:
+            STATISTICS_CACHE.inc(result='snapshot')
+            mark_outcome('snapshot')
+            return report
+        STATISTICS_CACHE.inc(result='miss')
+        return await self._refresh(sheets_manager, formato)
+
+    async def _from_snapshot(self, sheets_manager, formato):
+        key = (sheets_manager.tenant, formato)
+        report = self.restored.pop(key, None)
+        if report is None:
+            return None
+        cube = await cubes.loaded(sheets_manager)
+        if not (cube.restored_rows == cube.rows == report.rows and cube.version == sheets_manager.storage.version):
+            return None
+        report.version = cube.version
+        self.cache[key] = report
+        return report
+
+    async def _refresh(self, sheets_manager, formato=DEFAULT_FORMAT):
+        key = (sheets_manager.tenant, formato)
+        return await self.flights.do(key, self._compute, sheets_manager, key)
+
+    async def _compute(self, sheets_manager, key):
+        builder = build_text_report if key[1] == 'texto' else build_report
+        # O cubo é (re)carregado na fila de escrita do tenant; o relatório sai do snapshot
+        with span('storage'):
+            cube = await cubes.loaded(sheets_manager)
+        report = await asyncio.to_thread(profile_in_thread(builder), sheets_manager, cube.snapshot())
+        if report is not None:
+            self.cache[key] = report
+        else:
+            self.cache.pop(key, None)
+        return report
+
+    def needs_refresh(self, sheets_manager, formato=DEFAULT_FORMAT):
+        if self.cached(sheets_manager, formato) is not None:
+            return False
+        changed_at = sheets_manager.storage.changed_at
+        # Ainda recebendo escritas: deixa para a próxima execução do job
+        return changed_at is None or time.monotonic() - changed_at >= self.quiet_seconds
+
+    def dump(self):
+        """Relatórios em cache (e os restaurados ainda não usados), para o snapshot"""
+        reports = dict(self.restored)
+        reports.update(self.cache)
+        return {f'{tenant}\t{formato}': report.dump() for (tenant, formato), report in reports.items()}
+
+    def restore(self, states):
+        for key, state in states.items():
+            tenant, formato = key.split('\t', 1)
+            self.restored[(tenant, formato)] = Report.restore(state)
+
+    async def refresh_stale(self):
+        """Recalcula os relatórios desatualizados dos tenants conhecidos"""
+        refreshed = 0
+        for (tenant, formato), sheets_manager in list(self.tenants.items()):
+            if not self.needs_refresh(sheets_manager, formato):
+                REPORT_REFRESHES.inc(result='skipped')
+                continue
+            try:
+                await self._refresh(sheets_manager, formato)
+                REPORT_REFRESHES.inc(result='refreshed')
+                refreshed += 1
+            except Exception as e:
+                REPORT_REFRESHES.inc(result='error')
+                logger.error(f"Erro ao pré-calcular relatório do tenant {tenant}: {e}")
+        return refreshed
+
+
+report_service = ReportService()
+
+
+async def refresh_reports_job(context):
+    await report_service.refresh_stale()
+
+
+def schedule_report_refresh(application):
+    """Agenda o pré-cálculo dos relatórios no JobQueue da aplicação"""
+    if application.job_queue is None:
+        logger.warning("JobQueue indisponível (instale python-telegram-bot[job-queue]); relatórios não serão pré-calculados")
+        return None
+    interval = float(os.getenv('REPORT_REFRESH_INTERVAL', 300))
+    return application.job_queue.run_repeating(
+        refresh_reports_job, interval=interval, first=interval, name='refresh_reports'
+    )
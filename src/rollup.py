@@ -0,0 +1,403 @@
+"""
+Cubo de agregados das transações.
+
+Cada célula do cubo guarda total e quantidade por (dia, tipo, categoria, tipo
+de pagamento), onde tipo é despesa, crédito ou investimento (para
+investimentos a categoria é a categoria do investimento). Um índice mensal
+(mês -> (tipo, categoria), mais as despesas por forma de pagamento) responde
+em O(1) às consultas dos orçamentos e ao comparativo entre meses
+(src/comparison.py), e os totais por dia do mês de cada (tipo, categoria)
+alimentam a previsão do fim do mês (src/forecast.py).
+
+O cubo de cada tenant é carregado uma vez do backend (na fila de escrita do
+tenant) e depois atualizado a cada escrita via listener do backend. Gráficos,
+resumos e o relatório em texto são derivados do cubo, então o custo de um
+relatório depende do número de chaves distintas, não do número de transações.
+ROLLUP_MAX_AGE (segundos, padrão 3600) força uma releitura periódica para
+incorporar edições feitas direto na planilha.
+
+O cubo pode ser salvo e restaurado pelo snapshot de estado (src/snapshots.py):
+um cubo restaurado lê só as linhas adicionadas depois do snapshot.
+"""
+
+import asyncio
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+from datetime import date, datetime
+from functools import lru_cache
+
+from .forecast import Forecast, forecast_months, today
+from .schema import ISO_COLUMN
+from .storage import HEADERS, parse_amount
+from .tenants import write_scheduler
+
+logger = logging.getLogger(__name__)
+
+KINDS = ('despesa', 'credito', 'investimento')
+
+
+@lru_cache(maxsize=8192)
+def parse_day(text):
+    try:
+        return datetime.strptime(text, '%d/%m/%Y').date()
+    except ValueError:
+        return None
+
+
+@lru_cache(maxsize=8192)
+def iso_day(text):
+    try:
+        return date(int(text[:4]), int(text[5:7]), int(text[8:10]))
+    except ValueError:
+        return None
+
+
+def row_day(row):
+    """Dia da transação, pela Data ISO quando a linha tem uma"""
+    if len(row) > ISO_COLUMN and row[ISO_COLUMN]:
+        day = iso_day(str(row[ISO_COLUMN])[:10])
+        if day is not None:
+            return day
+    return parse_day(str(row[0])[:10])
+
+
+def month_key(day):
+    return f'{day.month:02d}/{day.year}'
+
+
+def most_frequent(counts):
+    """
+    Nome com a maior quantidade; no empate, o primeiro em ordem alfabética,
+    como o Series.mode()[0] do resumo calculado a partir das linhas
+    """
+    if not counts:
+        return 'N/A'
+    return min(counts.items(), key=lambda item: (-item[1], item[0]))[0]
+
+
+def row_cells(row):
+    """(tipo, categoria, pagamento, valor) de cada coluna de valor preenchida na linha"""
+    valor = parse_amount(row[1])
+    credito = parse_amount(row[5])
+    investimento = parse_amount(row[6])
+    if valor > 0:
+        yield 'despesa', str(row[3]), str(row[2]), valor
+    if credito > 0:
+        yield 'credito', '', '', credito
+    if investimento > 0:
+        yield 'investimento', str(row[7]), '', investimento
+
+
+class CubeSnapshot:
+    """Cópia imutável das células do cubo, usada para gerar relatórios fora do lock"""
+
+    def __init__(self, cells, rows, version=None, forecast=None):
+        # cells: lista de (dia, tipo, categoria, pagamento, total, quantidade)
+        self.cells = cells
+        self.rows = rows
+        self.version = version
+        # Previsão do fim do mês (src/forecast.py) no momento da cópia
+        self.forecast = forecast
+
+    @property
+    def empty(self):
+        return self.rows == 0
+
+
+class IncrementalView:
+    """
+    Visão em memória das linhas de um backend: carregada uma vez e mantida via
+    listener a cada escrita, com suporte a snapshot. Subclasses implementam
+    _clear, _add_row e _remove_row (retornam True se a linha está na visão),
+    _dump e _restore; _shift renumera os índices quando uma linha é removida.
+    """
+
+    def __init__(self, storage=None):
+        self.storage = storage
+        self.rows = 0
+        # Linhas do backend já consumidas (inclusive as ignoradas pela visão)
+        self.seen = 0
+        self.version = 0
+        self.loaded = False
+        self.loaded_at = None
+        # Restaurada de um snapshot e ainda não reconciliada com o backend
+        self.restored = False
+        self.restored_rows = None
+        self._lock = threading.Lock()
+        self._clear()
+        if storage is not None:
+            storage.add_listener(self._on_change)
+
+    def _reset(self):
+        self._clear()
+        self.rows = 0
+        self.seen = 0
+
+    def _add(self, rows):
+        for row in rows:
+            self.seen += 1
+            row = list(row) + [''] * (len(HEADERS) - len(row))
+            if self._add_row(self.seen - 1, row):
+                self.rows += 1
+
+    def add_rows(self, rows):
+        with self._lock:
+            self._add(rows)
+
+    def _edit(self, edited):
+        for index, old, new in edited:
+            if self._remove_row(index, old):
+                self.rows -= 1
+            if new is None:
+                self.seen -= 1
+                if index < self.seen:
+                    self._shift(index)
+            elif self._add_row(index, new):
+                self.rows += 1
+
+    def _shift(self, index):
+        pass
+
+    def load(self):
+        """
+        Lê o backend (rodar na fila de escrita do tenant). Uma visão restaurada
+        de snapshot lê só as linhas adicionadas depois dele; se o backend tiver
+        menos linhas do que o snapshot, relê tudo.
+        """
+        start = self.seen if self.restored else 0
+        if start:
+            total = self.storage.count()
+            if total < start:
+                start = 0
+            rows = self.storage.get_rows(start) if total > start else []
+        else:
+            rows = self.storage.get_rows()
+        with self._lock:
+            if start == 0:
+                self._reset()
+            self._add(rows)
+            self.version = self.storage.version
+            self.loaded = True
+            self.loaded_at = time.monotonic()
+            self.restored = False
+
+    def dump(self):
+        """Estado serializável em JSON"""
+        with self._lock:
+            return dict(self._dump(), rows=self.rows, seen=self.seen)
+
+    def restore(self, state):
+        with self._lock:
+            self._reset()
+            self._restore(state)
+            self.rows = state['rows']
+            self.seen = state['seen']
+            self.loaded = False
+            self.restored = True
+            self.restored_rows = self.rows
+
+    def _on_change(self, storage, appended, cleared, edited=None):
+        with self._lock:
+            if cleared:
+                self._reset()
+                self.restored = False
+            elif edited is not None:
+                if not self.loaded:
+                    # O snapshot não vale mais como base para a leitura incremental
+                    self.restored = False
+                    return
+                self._edit(edited)
+            elif appended is None:
+                # Alteração sem as linhas (edição/remoção): recarrega na próxima consulta
+                self.loaded = False
+                self.restored = False
+                return
+            elif self.loaded:
+                self._add(appended)
+            else:
+                return
+            self.version = storage.version
+
+
+class RollupCube(IncrementalView):
+    @classmethod
+    def from_records(cls, records):
+        cube = cls()
+        cube.add_rows([[record.get(header, '') for header in HEADERS] for record in records])
+        return cube
+
+    def _clear(self):
+        self.cells = {}
+        # 'MM/AAAA' -> {(tipo, categoria): total, ('pagamento', forma): total das despesas}
+        self.months = defaultdict(lambda: defaultdict(float))
+        # (ano, mês) -> {(tipo, categoria): total de cada dia do mês}, para a previsão
+        self.month_days = defaultdict(dict)
+
+    def _add_to_months(self, day, tipo, categoria, pagamento, valor):
+        totals = self.months[month_key(day)]
+        totals[(tipo, categoria)] += valor
+        if tipo == 'despesa':
+            totals[('pagamento', pagamento)] += valor
+        days = self.month_days[(day.year, day.month)].get((tipo, categoria))
+        if days is None:
+            days = self.month_days[(day.year, day.month)][(tipo, categoria)] = [0.0] * 31
+        days[day.day - 1] += valor
+
+    def _add_row(self, index, row):
+        day = row_day(row)
+        if day is None:
+            return False
+        for tipo, categoria, pagamento, valor in row_cells(row):
+            cell = self.cells.get((day, tipo, categoria, pagamento))
+            if cell is None:
+                cell = self.cells[(day, tipo, categoria, pagamento)] = [0.0, 0]
+            cell[0] += valor
+            cell[1] += 1
+            self._add_to_months(day, tipo, categoria, pagamento, valor)
+        return True
+
+    def _remove_row(self, index, row):
+        day = row_day(row)
+        if day is None:
+            return False
+        for tipo, categoria, pagamento, valor in row_cells(row):
+            key = (day, tipo, categoria, pagamento)
+            cell = self.cells.get(key)
+            if cell is None:
+                continue
+            cell[0] -= valor
+            cell[1] -= 1
+            if cell[1] <= 0:
+                del self.cells[key]
+            self._add_to_months(day, tipo, categoria, pagamento, -valor)
+        return True
+
+    def _dump(self):
+        # Dias como ordinais
+        return {'cells': [[day.toordinal(), tipo, categoria, pagamento, cell[0], cell[1]]
+                          for (day, tipo, categoria, pagamento), cell in self.cells.items()]}
+
+    def _restore(self, state):
+        for ordinal, tipo, categoria, pagamento, total, quantidade in state['cells']:
+            day = date.fromordinal(ordinal)
+            self.cells[(day, tipo, categoria, pagamento)] = [total, quantidade]
+            self._add_to_months(day, tipo, categoria, pagamento, total)
+
+    def month_total(self, tipo, categoria, month):
+        totals = self.months.get(month)
+        return totals.get((tipo, categoria), 0.0) if totals else 0.0
+
+    def _forecast(self, day):
+        # Só os meses usados pela previsão, sem percorrer o histórico
+        month_days = {month: self.month_days[month] for month in forecast_months(day) if month in self.month_days}
+        return Forecast.build(day, month_days)
+
+    def forecast(self, day=None):
+        with self._lock:
+            return self._forecast(day or today())
+
+    def month_summary(self, months):
+        """Cópia do índice mensal dos meses pedidos ('MM/AAAA')"""
+        with self._lock:
+            return {month: dict(self.months[month]) for month in months if month in self.months}
+
+    def snapshot(self):
+        with self._lock:
+            cells = [key + (cell[0], cell[1]) for key, cell in self.cells.items()]
+            return CubeSnapshot(cells, self.rows, self.version, self._forecast(today()))
+
+
+class ViewRegistry:
+    """Uma visão por tenant, ligada ao backend atual do tenant"""
+
+    def __init__(self, factory, max_age=None, max_age_env='ROLLUP_MAX_AGE'):
+        self.factory = factory
+        self.max_age = max_age if max_age is not None else float(os.getenv(max_age_env, 3600))
+        self._views = {}
+        # Estados vindos do snapshot, aplicados quando o tenant for usado
+        self._restored = {}
+        self._reloading = set()
+        self._lock = threading.Lock()
+
+    def view_for(self, sheets_manager):
+        with self._lock:
+            view = self._views.get(sheets_manager.tenant)
+            # O backend pode ter sido recriado (registro LRU de tenants)
+            if view is None or view.storage is not sheets_manager.storage:
+                view = self.factory(sheets_manager.storage)
+                state = self._restored.pop(sheets_manager.tenant, None)
+                if state is not None and state['identity'] == sheets_manager.storage.identity():
+                    view.restore(state)
+                self._views[sheets_manager.tenant] = view
+            return view
+
+    def dump(self):
+        """Visões carregadas de backends persistentes, por tenant"""
+        with self._lock:
+            views = list(self._views.items())
+            states = dict(self._restored)
+        for tenant, view in views:
+            identity = view.storage.identity()
+            if identity is not None and (view.loaded or view.restored):
+                states[tenant] = dict(view.dump(), identity=identity)
+        return states
+
+    def restore(self, states):
+        with self._lock:
+            self._restored.update(states)
+
+    def is_fresh(self, view):
+        return view.loaded and time.monotonic() - view.loaded_at <= self.max_age
+
+    def _reloaded(self, tenant, view, task):
+        self._reloading.discard(view)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"Erro ao reler a visão do tenant {tenant}: {task.exception()}")
+
+    def _load_in_background(self, sheets_manager, view):
+        if view not in self._reloading:
+            self._reloading.add(view)
+            task = asyncio.ensure_future(write_scheduler.run_exclusive(sheets_manager.tenant, view.load))
+            task.add_done_callback(lambda task: self._reloaded(sheets_manager.tenant, view, task))
+
+    async def loaded(self, sheets_manager, stale_ok=False):
+        """
+        Visão carregada do tenant. Com stale_ok, uma visão vencida (max_age) é
+        devolvida na hora e relida em segundo plano; só espera a leitura se a
+        visão nunca foi carregada.
+        """
+        view = self.view_for(sheets_manager)
+        if self.is_fresh(view):
+            return view
+        if stale_ok and view.loaded:
+            self._load_in_background(sheets_manager, view)
+            return view
+        await write_scheduler.run_exclusive(sheets_manager.tenant, view.load)
+        return view
+
+    async def ready(self, sheets_manager):
+        """
+        Visão do tenant sem nunca esperar uma leitura do backend: vencida, é
+        devolvida e relida em segundo plano; ainda não carregada, a leitura vai
+        para segundo plano e o retorno é None.
+        """
+        view = self.view_for(sheets_manager)
+        if not self.is_fresh(view):
+            self._load_in_background(sheets_manager, view)
+        return view if view.loaded else None
+
+
+class CubeRegistry(ViewRegistry):
+    """Um cubo por tenant"""
+
+    def __init__(self, max_age=None):
+        super().__init__(RollupCube, max_age, 'ROLLUP_MAX_AGE')
+
+    def cube_for(self, sheets_manager):
+        return self.view_for(sheets_manager)
+
+
+cubes = CubeRegistry()
@@ -0,0 +1,124 @@
+"""
+Esquema das linhas de transação e migrações das planilhas existentes.
+
+A versão 1 são as 8 colunas originais. Cada migração acrescenta colunas no
+fim, com uma função que calcula o valor delas a partir da linha antiga, então
+planilhas e tabelas criadas por versões anteriores do bot são atualizadas em
+lote: no Sheets, um único batch_update grava o cabeçalho novo e as colunas
+preenchidas de todas as linhas. Cada backend confere o esquema uma vez por
+processo (ver StorageBackend.ensure_headers).
+
+Versões:
+2. "Data ISO": a data/hora em ISO-8601 com fuso ("2024-01-15T10:30:00-03:00"),
+   para ordenar e agrupar sem interpretar o formato brasileiro de Data e Hora.
+"""
+
+from datetime import datetime
+from functools import lru_cache
+
+import pytz
+
+DATE_FORMAT = '%d/%m/%Y %H:%M:%S'
+
+TIMEZONE = pytz.timezone('America/Sao_Paulo')
+
+BASE_HEADERS = [
+    'Data e Hora', 'Valor (R$)', 'Tipo de pagamento',
+    'Categoria', 'Descrição', 'Créditos', 'Investimento', 'Categoria Investimento'
+]
+
+# Nomes das mesmas colunas no SQLite
+BASE_COLUMNS = [
+    'data_hora', 'valor', 'tipo_pagamento', 'categoria',
+    'descricao', 'creditos', 'investimento', 'categoria_investimento'
+]
+
+
+class Migration:
+    def __init__(self, version, headers, columns, backfill=None):
+        self.version = version
+        self.headers = list(headers)
+        self.columns = list(columns)
+        # backfill(linha antiga) -> valores das colunas novas; None deixa em branco
+        self.backfill = backfill
+
+    def values(self, row):
+        if self.backfill is None:
+            return [''] * len(self.headers)
+        return list(self.backfill(row))
+
+
+class Schema:
+    def __init__(self, migrations=()):
+        self.migrations = sorted(migrations, key=lambda migration: migration.version)
+        for expected, migration in enumerate(self.migrations, 2):
+            if migration.version != expected:
+                raise ValueError(f'migração {migration.version} fora de ordem (esperada {expected})')
+
+    @property
+    def version(self):
+        return 1 + len(self.migrations)
+
+    def headers_at(self, version):
+        headers = list(BASE_HEADERS)
+        for migration in self.migrations[:version - 1]:
+            headers += migration.headers
+        return headers
+
+    @property
+    def headers(self):
+        return self.headers_at(self.version)
+
+    @property
+    def columns(self):
+        columns = list(BASE_COLUMNS)
+        for migration in self.migrations:
+            columns += migration.columns
+        return columns
+
+    def version_of(self, headers):
+        """Versão de uma linha de cabeçalho; None se ela não é do bot"""
+        headers = list(headers)
+        while headers and headers[-1] == '':
+            headers.pop()
+        # Colunas extras depois das do bot são do usuário e ficam como estão
+        if headers[:len(self.headers)] == self.headers:
+            return self.version
+        for version in range(self.version - 1, 0, -1):
+            if headers == self.headers_at(version):
+                return version
+        # Cabeçalho original incompleto
+        if len(headers) < len(BASE_HEADERS) and BASE_HEADERS[:len(headers)] == headers:
+            return 1
+        return None
+
+    def pending(self, version):
+        return self.migrations[version - 1:]
+
+    def upgrade_row(self, row, version):
+        """Linha de uma versão antiga com as colunas novas preenchidas"""
+        row = list(row)[:len(self.headers_at(version))]
+        row += [''] * (len(self.headers_at(version)) - len(row))
+        for migration in self.pending(version):
+            row += migration.values(row)
+        return row
+
+
+@lru_cache(maxsize=8192)
+def iso_timestamp(data_hora):
+    """'15/01/2024 10:30:00' -> '2024-01-15T10:30:00-03:00' ('' se não for uma data)"""
+    try:
+        moment = datetime.strptime(str(data_hora), DATE_FORMAT)
+    except ValueError:
+        return ''
+    return TIMEZONE.localize(moment).isoformat()
+
+
+MIGRATIONS = [
+    Migration(2, ['Data ISO'], ['data_iso'], backfill=lambda row: [iso_timestamp(row[0])]),
+]
+
+# Posição da Data ISO nas linhas
+ISO_COLUMN = 8
+
+SCHEMA = Schema(MIGRATIONS)
@@ -0,0 +1,172 @@
+"""
+Busca textual nas transações (/buscar).
+
+Índice invertido por tenant sobre Descrição, Categoria, Tipo de pagamento e
+Categoria Investimento. É uma visão incremental como o cubo de agregados
+(src/rollup.py): carregado uma vez, atualizado a cada escrita e salvo no
+snapshot de estado, então as consultas não leem a planilha.
+
+Os termos são comparados sem acento e sem diferenciar maiúsculas. Cada termo
+casa com as palavras que começam por ele; se nenhuma começar, aceita palavras
+a até 1 edição de distância (2 para termos com 8 letras ou mais). Com vários
+termos, a transação precisa casar com todos.
+"""
+
+import re
+import unicodedata
+from bisect import bisect_left, insort
+from collections import defaultdict
+
+from .rollup import IncrementalView, ViewRegistry, row_cells
+
+PAGE_SIZE = 10
+
+TOKEN_RE = re.compile(r'\w+')
+
+
+def fold(text):
+    """Minúsculas e sem acentos"""
+    text = unicodedata.normalize('NFKD', str(text))
+    return ''.join(c for c in text if not unicodedata.combining(c)).lower()
+
+
+def tokenize(text):
+    return TOKEN_RE.findall(fold(text))
+
+
+def fuzzy_limit(term):
+    if len(term) >= 8:
+        return 2
+    if len(term) >= 4:
+        return 1
+    return 0
+
+
+def within_distance(a, b, limit):
+    """Distância de edição entre a e b é no máximo limit (Levenshtein com corte)"""
+    if abs(len(a) - len(b)) > limit:
+        return False
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb)))
+        if min(current) > limit:
+            return False
+        previous = current
+    return previous[-1] <= limit
+
+
+class SearchResult:
+    def __init__(self, docs):
+        # docs: lista de (índice da linha, data_hora, descrição, categoria, pagamento, [(tipo, valor)])
+        self.docs = docs
+        self.totals = defaultdict(float)
+        self.counts = defaultdict(int)
+        for doc in docs:
+            for tipo, valor in doc[5]:
+                self.totals[tipo] += valor
+                self.counts[tipo] += 1
+
+    def __len__(self):
+        return len(self.docs)
+
+    @property
+    def pages(self):
+        return max((len(self.docs) + PAGE_SIZE - 1) // PAGE_SIZE, 1)
+
+    def page(self, number):
+        start = (number - 1) * PAGE_SIZE
+        return self.docs[start:start + PAGE_SIZE]
+
+
+class SearchIndex(IncrementalView):
+    def _clear(self):
+        self.docs = {}
+        self.postings = defaultdict(list)
+        self.vocab = []
+
+    def _index(self, index, doc):
+        self.docs[index] = doc
+        for token in set(tokenize(' '.join(doc[1:4]))):
+            if token not in self.postings:
+                insort(self.vocab, token)
+            self.postings[token].append(index)
+
+    def _add_row(self, index, row):
+        cells = [(tipo, valor) for tipo, _, _, valor in row_cells(row)]
+        if not cells:
+            return False
+        categoria = str(row[3] or row[7])
+        self._index(index, (str(row[0]), str(row[4]), categoria, str(row[2]), cells))
+        return True
+
+    def _remove_row(self, index, row):
+        doc = self.docs.pop(index, None)
+        if doc is None:
+            return False
+        for token in set(tokenize(' '.join(doc[1:4]))):
+            postings = self.postings[token]
+            postings.remove(index)
+            if not postings:
+                del self.postings[token]
+                del self.vocab[bisect_left(self.vocab, token)]
+        return True
+
+    def _shift(self, index):
+        def shifted(i):
+            return i - 1 if i > index else i
+        self.docs = {shifted(i): doc for i, doc in self.docs.items()}
+        for token, postings in self.postings.items():
+            postings[:] = [shifted(i) for i in postings]
+
+    def _dump(self):
+        return {'docs': [[index, *doc[:4], [list(cell) for cell in doc[4]]] for index, doc in self.docs.items()]}
+
+    def _restore(self, state):
+        for index, data_hora, descricao, categoria, pagamento, cells in state['docs']:
+            self._index(index, (data_hora, descricao, categoria, pagamento, [tuple(cell) for cell in cells]))
+
+    def _words(self, term):
+        """Palavras do vocabulário que casam com o termo (prefixo, senão aproximadas)"""
+        words = []
+        position = bisect_left(self.vocab, term)
+        while position < len(self.vocab) and self.vocab[position].startswith(term):
+            words.append(self.vocab[position])
+            position += 1
+        if words:
+            return words
+        limit = fuzzy_limit(term)
+        if not limit:
+            return []
+        return [word for word in self.vocab if within_distance(term, word, limit)]
+
+    def search(self, query):
+        terms = tokenize(query)
+        if not terms:
+            return SearchResult([])
+        with self._lock:
+            matches = None
+            for term in terms:
+                found = set()
+                for word in self._words(term):
+                    found.update(self.postings[word])
+                matches = found if matches is None else matches & found
+                if not matches:
+                    break
+            # Mais recentes primeiro (ordem de inserção na planilha)
+            docs = [(index, *self.docs[index]) for index in sorted(matches or (), reverse=True)]
+        return SearchResult(docs)
+
+
+indexes = ViewRegistry(SearchIndex, max_age_env='SEARCH_MAX_AGE')
+
+
+def parse_query(args):
+    """Separa '... pagina N' do final dos argumentos do /buscar"""
+    args = list(args or [])
+    page = 1
+    if len(args) >= 3 and fold(args[-2]) == 'pagina' and args[-1].isdigit():
+        page = max(int(args[-1]), 1)
+        args = args[:-2]
+    return ' '.join(args), page
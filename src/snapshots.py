@@ -0,0 +1,158 @@
+"""
+Snapshot do estado em memória, para sobreviver a restarts do container.
+
+Periodicamente (SNAPSHOT_INTERVAL, em segundos, padrão 60) o bot grava em
+DATA_DIR/warm_state.json.gz os cubos de agregados, os índices de busca, as
+estatísticas de gasto por categoria (src/anomalies.py), os relatórios em
+cache, as últimas transações de cada chat (/desfazer) e a janela de
+update_ids já processados. Na subida o
+arquivo é lido de volta: cada cubo ou índice restaurado é reconciliado na
+primeira consulta lendo só as linhas adicionadas depois do snapshot, em vez
+de baixar a planilha inteira.
+
+O arquivo só é regravado quando o conteúdo muda. Snapshots de outro backend
+ou de outra versão do formato são ignorados.
+"""
+
+import asyncio
+import gzip
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+
+from .anomalies import anomaly_detector
+from .history import recent_transactions
+from .local_store import data_dir
+from .metrics import registry as metrics_registry
+from .reports import report_service
+from .rollup import cubes
+from .search import indexes
+from .storage import backend_name
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_FORMAT = 1
+
+SNAPSHOT_BYTES = metrics_registry.gauge(
+    'snapshot_bytes', 'Tamanho do último snapshot de estado gravado')
+SNAPSHOT_SAVES = metrics_registry.counter(
+    'snapshot_saves_total', 'Gravações do snapshot de estado por resultado', ['result'])
+
+
+def snapshot_path():
+    return os.getenv('SNAPSHOT_PATH') or os.path.join(data_dir(), 'warm_state.json.gz')
+
+
+class WarmState:
+    """Reúne as seções do estado (dump/restore) e grava/lê o snapshot"""
+
+    def __init__(self, path=None):
+        self.path = path
+        self.sections = {}
+        self._digest = None
+        self._lock = threading.Lock()
+
+    def register(self, name, dump, restore):
+        self.sections[name] = (dump, restore)
+
+    def _path(self):
+        return self.path or snapshot_path()
+
+    def collect(self):
+        state = {}
+        for name, (dump, _) in self.sections.items():
+            try:
+                state[name] = dump()
+            except Exception as e:
+                logger.error(f"Erro ao coletar a seção {name} do snapshot: {e}")
+        return state
+
+    def save(self, sections=None):
+        """Grava o snapshot se o estado mudou; retorna True se gravou"""
+        if sections is None:
+            sections = self.collect()
+        payload = json.dumps({
+            'format': SNAPSHOT_FORMAT,
+            'backend': backend_name(),
+            'sections': sections,
+        }, ensure_ascii=False, sort_keys=True).encode('utf-8')
+        digest = hashlib.sha1(payload).hexdigest()
+
+        with self._lock:
+            if digest == self._digest:
+                SNAPSHOT_SAVES.inc(result='unchanged')
+                return False
+            path = self._path()
+            try:
+                directory = os.path.dirname(path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                data = gzip.compress(payload)
+                temp_path = f'{path}.tmp'
+                with open(temp_path, 'wb') as f:
+                    f.write(data)
+                os.replace(temp_path, path)
+            except OSError as e:
+                SNAPSHOT_SAVES.inc(result='error')
+                print(f"Erro ao gravar snapshot: {e}")
+                return False
+            self._digest = digest
+        SNAPSHOT_BYTES.set(len(data))
+        SNAPSHOT_SAVES.inc(result='saved')
+        return True
+
+    def restore(self):
+        """Lê o snapshot e entrega cada seção ao seu dono; retorna True se restaurou"""
+        path = self._path()
+        started = time.perf_counter()
+        try:
+            with gzip.open(path, 'rb') as f:
+                state = json.loads(f.read().decode('utf-8'))
+        except FileNotFoundError:
+            return False
+        except (OSError, ValueError) as e:
+            print(f"Erro ao ler snapshot {path}: {e}")
+            return False
+
+        if state.get('format') != SNAPSHOT_FORMAT or state.get('backend') != backend_name():
+            logger.info("Snapshot de estado ignorado (formato ou backend diferente)")
+            return False
+
+        for name, section in state.get('sections', {}).items():
+            if name not in self.sections:
+                continue
+            try:
+                self.sections[name][1](section)
+            except Exception as e:
+                logger.error(f"Erro ao restaurar a seção {name} do snapshot: {e}")
+        logger.info(f"Snapshot de estado restaurado em {time.perf_counter() - started:.3f}s")
+        return True
+
+
+warm_state = WarmState()
+warm_state.register('cubes', cubes.dump, cubes.restore)
+warm_state.register('reports', report_service.dump, report_service.restore)
+warm_state.register('search', indexes.dump, indexes.restore)
+warm_state.register('recent', recent_transactions.dump, recent_transactions.restore)
+warm_state.register('anomalies', anomaly_detector.dump, anomaly_detector.restore)
+
+
+async def save_snapshot_job(context):
+    # Coleta no loop (onde o estado é alterado); serializa e grava fora dele
+    sections = warm_state.collect()
+    await asyncio.to_thread(warm_state.save, sections)
+
+
+def schedule_snapshots(application):
+    """Restaura o snapshot e agenda as gravações periódicas"""
+    warm_state.restore()
+    if application.job_queue is None:
+        logger.warning("JobQueue indisponível (instale python-telegram-bot[job-queue]); snapshots não serão gravados")
+        return None
+    interval = float(os.getenv('SNAPSHOT_INTERVAL', 60))
+    return application.job_queue.run_repeating(
+        save_snapshot_job, interval=interval, first=interval, name='save_snapshot'
+    )
@@ -5,18 +5,65 @@ from datetime import datetime, timedelta
 import pytz
 import io
 import os
+import time
+from .metrics import CHART_RENDER_SECONDS, CHART_RENDER_BYTES
+from .rollup import most_frequent
+from .schema import DATE_FORMAT
+from .tracing import span
+from .downsampling import (
+    choose_frequency, downsample, max_points, resample_sum, resample_last, FREQUENCY_LABELS
+)
 
 plt.switch_backend('Agg')
 plt.style.use('seaborn-v0_8')
 sns.set_palette("husl")
 
+# Células do cubo de agregados (ver src/rollup.py)
+CUBE_KEYS = ['data', 'tipo', 'categoria', 'pagamento']
+CUBE_COLUMNS = CUBE_KEYS + ['total', 'quantidade']
+
+# tipo -> (coluna de valor, coluna de categoria, coluna de pagamento)
+CUBE_SOURCES = {
+    'despesa': ('Valor (R$)', 'Categoria', 'Tipo de pagamento'),
+    'credito': ('Créditos', None, None),
+    'investimento': ('Investimento', 'Categoria Investimento', None),
+}
+
+ISO_FORMAT = '%Y-%m-%dT%H:%M:%S'
+
+
+def parse_dates(df):
+    """
+    Data e hora locais de cada registro. Usa a coluna Data ISO quando existe
+    (o fuso é descartado, como no formato brasileiro); as linhas sem ela são
+    lidas de Data e Hora, interpretando cada valor distinto uma vez só.
+    """
+    if 'Data ISO' in df.columns:
+        dates = pd.to_datetime(df['Data ISO'].astype(str).str[:19], format=ISO_FORMAT, errors='coerce')
+    else:
+        dates = pd.Series(pd.NaT, index=df.index, dtype='datetime64[ns]')
+    missing = dates.isna()
+    if missing.any():
+        legacy = df.loc[missing, 'Data e Hora'].astype(str)
+        unique = legacy.unique()
+        parsed = pd.Series(pd.to_datetime(unique, format=DATE_FORMAT), index=unique)
+        dates[missing] = legacy.map(parsed)
+    return dates
+
+
 class StatisticsGenerator:
-    def __init__(self, data):
-        self.df = pd.DataFrame(data)
+    """
+    Gera gráficos e resumo a partir do cubo de agregados. Pode ser criado com
+    os registros da planilha (o cubo é montado aqui) ou direto de um
+    CubeSnapshot com from_cube, sem passar pelas linhas.
+    """
+    
+    def __init__(self, data=None, cube=None):
+        self.df = pd.DataFrame(data if data is not None else [])
         self.tz = pytz.timezone('America/Sao_Paulo')
         
         if not self.df.empty:
-            self.df['Data e Hora'] = pd.to_datetime(self.df['Data e Hora'], format='%d/%m/%Y %H:%M:%S')
+            self.df['Data e Hora'] = parse_dates(self.df)
             
             self.df['Valor (R$)'] = self.df['Valor (R$)'].astype(str).str.replace(',', '.')
             self.df['Valor (R$)'] = pd.to_numeric(self.df['Valor (R$)'], errors='coerce').fillna(0)
@@ -42,6 +89,57 @@ class StatisticsGenerator:
             self.debitos = pd.DataFrame()
             self.creditos = pd.DataFrame()
             self.investimentos = pd.DataFrame()
+        
+        if cube is not None:
+            self.cube = pd.DataFrame(cube.cells, columns=CUBE_COLUMNS)
+            self.cube['data'] = pd.to_datetime(self.cube['data'])
+            self.rows = cube.rows
+            self.forecast = cube.forecast
+        else:
+            self.cube = self._cube_from_df()
+            self.rows = len(self.df)
+            self.forecast = None
+        
+        self.cube_despesas = self.cube[self.cube['tipo'] == 'despesa']
+        self.cube_investimentos = self.cube[self.cube['tipo'] == 'investimento']
+    
+    @classmethod
+    def from_cube(cls, snapshot):
+        return cls(cube=snapshot)
+    
+    def _cube_from_df(self):
+        if self.df.empty:
+            return pd.DataFrame(columns=CUBE_COLUMNS).astype({'total': 'float64', 'quantidade': 'int64'})
+        
+        dia = self.df['Data e Hora'].dt.normalize()
+        parts = []
+        for tipo, (valor_col, categoria_col, pagamento_col) in CUBE_SOURCES.items():
+            mask = self.df[valor_col] > 0
+            if not mask.any():
+                continue
+            selected = self.df[mask]
+            parts.append(pd.DataFrame({
+                'data': dia[mask],
+                'tipo': tipo,
+                'categoria': selected[categoria_col].astype(str) if categoria_col in selected else '',
+                'pagamento': selected[pagamento_col].astype(str) if pagamento_col in selected else '',
+                'total': selected[valor_col],
+            }))
+        
+        if not parts:
+            return pd.DataFrame(columns=CUBE_COLUMNS).astype({'total': 'float64', 'quantidade': 'int64'})
+        
+        cells = pd.concat(parts, ignore_index=True)
+        return cells.groupby(CUBE_KEYS, as_index=False, sort=False).agg(
+            total=('total', 'sum'), quantidade=('total', 'size')
+        )
+    
+    def _totals_by_kind(self):
+        grouped = self.cube.groupby('tipo')[['total', 'quantidade']].sum()
+        totals = {tipo: (0.0, 0) for tipo in CUBE_SOURCES}
+        for tipo, row in grouped.iterrows():
+            totals[tipo] = (float(row['total']), int(row['quantidade']))
+        return totals
     
     def _save_plot(self, fig, filename):
         buffer = io.BytesIO()
@@ -51,10 +149,10 @@ class StatisticsGenerator:
         return buffer
     
     def gastos_por_categoria(self):
-        if self.debitos.empty:
+        if self.cube_despesas.empty:
             return None
             
-        gastos_categoria = self.debitos.groupby('Categoria')['Valor (R$)'].sum().sort_values(ascending=True)
+        gastos_categoria = self.cube_despesas.groupby('categoria')['total'].sum().sort_values(ascending=True)
         
         fig, ax = plt.subplots(figsize=(10, 6))
         gastos_categoria.plot(kind='barh', ax=ax, color='skyblue')
@@ -71,10 +169,10 @@ class StatisticsGenerator:
         return self._save_plot(fig, 'gastos_por_categoria.png')
     
     def tipo_pagamento_mais_usado(self):
-        if self.debitos.empty:
+        if self.cube_despesas.empty:
             return None
             
-        pagamentos = self.debitos['Tipo de pagamento'].value_counts()
+        pagamentos = self.cube_despesas.groupby('pagamento')['quantidade'].sum().sort_values(ascending=False)
         
         fig, ax = plt.subplots(figsize=(10, 8))
         colors = plt.cm.Set3(range(len(pagamentos)))
@@ -92,10 +190,10 @@ class StatisticsGenerator:
         return self._save_plot(fig, 'tipo_pagamento.png')
     
     def investimentos_por_categoria(self):
-        if self.investimentos.empty:
+        if self.cube_investimentos.empty:
             return None
             
-        invest_categoria = self.investimentos.groupby('Categoria Investimento')['Investimento'].sum().sort_values(ascending=True)
+        invest_categoria = self.cube_investimentos.groupby('categoria')['total'].sum().sort_values(ascending=True)
         
         fig, ax = plt.subplots(figsize=(10, 6))
         invest_categoria.plot(kind='barh', ax=ax, color='lightgreen')
@@ -112,11 +210,11 @@ class StatisticsGenerator:
         return self._save_plot(fig, 'investimentos_por_categoria.png')
     
     def total_gasto_mes(self):
-        if self.debitos.empty:
+        if self.cube_despesas.empty:
             return None
             
-        self.debitos['Mes_Ano'] = self.debitos['Data e Hora'].dt.to_period('M')
-        gastos_mes = self.debitos.groupby('Mes_Ano')['Valor (R$)'].sum()
+        mes_ano = self.cube_despesas['data'].dt.to_period('M').rename('Mes_Ano')
+        gastos_mes = self.cube_despesas.groupby(mes_ano)['total'].sum()
         
         fig, ax = plt.subplots(figsize=(12, 6))
         gastos_mes.plot(kind='bar', ax=ax, color='lightcoral')
@@ -134,15 +232,19 @@ class StatisticsGenerator:
         return self._save_plot(fig, 'total_gasto_mes.png')
     
     def gastos_por_dia(self):
-        if self.debitos.empty:
+        if self.cube_despesas.empty:
             return None
             
-        gastos_dia = self.debitos.groupby('Data')['Valor (R$)'].sum().sort_index()
+        gastos = self.cube_despesas.groupby('data')['total'].sum().sort_index()
+        frequency = choose_frequency(gastos.index[0], gastos.index[-1])
+        gastos_dia = downsample(resample_sum(gastos, frequency))
         
         fig, ax = plt.subplots(figsize=(12, 6))
-        gastos_dia.plot(kind='line', ax=ax, marker='o', linewidth=2, markersize=6, color='purple')
+        marker = 'o' if len(gastos_dia) <= 60 else None
+        ax.plot(gastos_dia.index, gastos_dia.values, marker=marker, linewidth=2, markersize=6, color='purple')
         
-        ax.set_title('Gastos por Dia', fontsize=16, fontweight='bold')
+        title = 'Gastos por Dia' if frequency == 'D' else f'Gastos por Dia (agregado {FREQUENCY_LABELS[frequency]})'
+        ax.set_title(title, fontsize=16, fontweight='bold')
         ax.set_xlabel('Data', fontsize=12)
         ax.set_ylabel('Valor (R$)', fontsize=12)
         ax.grid(True, alpha=0.3)
@@ -153,9 +255,10 @@ class StatisticsGenerator:
         return self._save_plot(fig, 'gastos_por_dia.png')
     
     def fluxo_financeiro(self):
-        total_creditos = self.df['Créditos'].sum()
-        total_debitos = self.df['Valor (R$)'].sum()
-        total_investimentos = self.df['Investimento'].sum()
+        totals = self._totals_by_kind()
+        total_creditos = totals['credito'][0]
+        total_debitos = totals['despesa'][0]
+        total_investimentos = totals['investimento'][0]
         
         if total_creditos == 0 and total_debitos == 0 and total_investimentos == 0:
             return None
@@ -186,22 +289,31 @@ class StatisticsGenerator:
         return self._save_plot(fig, 'fluxo_financeiro.png')
     
     def evolucao_patrimonio(self):
-        if self.df.empty:
+        if self.cube.empty:
             return None
         
-        df_sorted = self.df.sort_values('Data e Hora')
-        
-        df_sorted['Creditos_Acum'] = df_sorted['Créditos'].cumsum()
-        df_sorted['Debitos_Acum'] = df_sorted['Valor (R$)'].cumsum()
-        df_sorted['Investimentos_Acum'] = df_sorted['Investimento'].cumsum()
-        df_sorted['Patrimonio'] = df_sorted['Creditos_Acum'] - df_sorted['Debitos_Acum'] - df_sorted['Investimentos_Acum']
+        # Saldo ao fim de cada dia: créditos entram, despesas e investimentos saem
+        sinal = self.cube['tipo'].map({'credito': 1, 'despesa': -1, 'investimento': -1})
+        por_dia = pd.DataFrame({
+            'data': self.cube['data'],
+            'Patrimonio': self.cube['total'] * sinal,
+            'Investimentos_Acum': self.cube['total'].where(self.cube['tipo'] == 'investimento', 0.0),
+        }).groupby('data').sum().sort_index()
+        series = por_dia.cumsum()
+        
+        frequency = choose_frequency(series.index[0], series.index[-1])
+        if frequency != 'D' or len(series) > max_points():
+            series = resample_last(series, frequency)
+        patrimonio = downsample(series['Patrimonio'], method='minmax')
+        investimentos = downsample(series['Investimentos_Acum'], method='minmax')
+        show_markers = len(patrimonio) <= 60
         
         fig, ax = plt.subplots(figsize=(12, 6))
         
-        ax.plot(df_sorted['Data e Hora'], df_sorted['Patrimonio'], 
-               marker='o', linewidth=2, markersize=4, color='blue', label='Patrimônio Líquido')
-        ax.plot(df_sorted['Data e Hora'], df_sorted['Investimentos_Acum'], 
-               marker='s', linewidth=2, markersize=4, color='green', label='Investimentos Acumulados')
+        ax.plot(patrimonio.index, patrimonio.values, 
+               marker='o' if show_markers else None, linewidth=2, markersize=4, color='blue', label='Patrimônio Líquido')
+        ax.plot(investimentos.index, investimentos.values, 
+               marker='s' if show_markers else None, linewidth=2, markersize=4, color='green', label='Investimentos Acumulados')
         
         ax.set_title('Evolução do Patrimônio ao Longo do Tempo', fontsize=16, fontweight='bold')
         ax.set_xlabel('Data', fontsize=12)
@@ -219,42 +331,46 @@ class StatisticsGenerator:
     def generate_all_statistics(self):
         stats = {}
         
-        stats['gastos_por_categoria'] = self.gastos_por_categoria()
-        stats['tipo_pagamento'] = self.tipo_pagamento_mais_usado()
-        stats['investimentos_por_categoria'] = self.investimentos_por_categoria()
-        stats['total_gasto_mes'] = self.total_gasto_mes()
-        stats['gastos_por_dia'] = self.gastos_por_dia()
-        stats['fluxo_financeiro'] = self.fluxo_financeiro()
-        stats['evolucao_patrimonio'] = self.evolucao_patrimonio()
+        charts = {
+            'gastos_por_categoria': self.gastos_por_categoria,
+            'tipo_pagamento': self.tipo_pagamento_mais_usado,
+            'investimentos_por_categoria': self.investimentos_por_categoria,
+            'total_gasto_mes': self.total_gasto_mes,
+            'gastos_por_dia': self.gastos_por_dia,
+            'fluxo_financeiro': self.fluxo_financeiro,
+            'evolucao_patrimonio': self.evolucao_patrimonio
+        }
+        
+        for name, render in charts.items():
+            started = time.perf_counter()
+            with span('render.chart', chart=name):
+                stats[name] = render()
+            CHART_RENDER_SECONDS.observe(time.perf_counter() - started, chart=name)
+            if stats[name] is not None:
+                CHART_RENDER_BYTES.observe(stats[name].getbuffer().nbytes, chart=name)
         
         return {k: v for k, v in stats.items() if v is not None}
     
     def get_summary_text(self):
-        if self.df.empty:
+        if self.rows == 0:
             return "Nenhum dado encontrado para gerar estatísticas."
         
-        total_creditos = self.df['Créditos'].sum()
-        total_debitos = self.df['Valor (R$)'].sum()
-        total_investimentos = self.df['Investimento'].sum()
+        totals = self._totals_by_kind()
+        total_creditos, num_creditos = totals['credito']
+        total_debitos, num_debitos = totals['despesa']
+        total_investimentos, num_investimentos = totals['investimento']
         saldo_liquido = total_creditos - total_debitos - total_investimentos
         
-        total_transacoes = len(self.df)
-        num_creditos = len(self.creditos)
-        num_debitos = len(self.debitos)
-        num_investimentos = len(self.investimentos)
+        total_transacoes = self.rows
         
-        data_inicio = self.df['Data e Hora'].min().strftime('%d/%m/%Y')
-        data_fim = self.df['Data e Hora'].max().strftime('%d/%m/%Y')
-        
-        if not self.debitos.empty:
-            categoria_freq = self.debitos['Categoria'].mode()[0] if len(self.debitos['Categoria'].mode()) > 0 else "N/A"
+        if not self.cube.empty:
+            data_inicio = self.cube['data'].min().strftime('%d/%m/%Y')
+            data_fim = self.cube['data'].max().strftime('%d/%m/%Y')
         else:
-            categoria_freq = "N/A"
+            data_inicio = data_fim = "N/A"
         
-        if not self.investimentos.empty:
-            invest_categoria_freq = self.investimentos['Categoria Investimento'].mode()[0] if len(self.investimentos['Categoria Investimento'].mode()) > 0 else "N/A"
-        else:
-            invest_categoria_freq = "N/A"
+        categoria_freq = most_frequent(self.cube_despesas.groupby('categoria')['quantidade'].sum().to_dict())
+        invest_categoria_freq = most_frequent(self.cube_investimentos.groupby('categoria')['quantidade'].sum().to_dict())
         
         summary = f"""📊 **RESUMO FINANCEIRO PESSOAL**
         
@@ -268,5 +384,7 @@ class StatisticsGenerator:
 🏷️ **Categoria de gasto mais frequente**: {categoria_freq}
 📊 **Categoria de investimento mais frequente**: {invest_categoria_freq}
 """
+        if self.forecast is not None and not self.forecast.empty:
+            summary += f"\n{self.forecast.summary_line()}\n"
         
         return summary 
\ No newline at end of file
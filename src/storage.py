@@ -0,0 +1,609 @@
+"""
+Backends de armazenamento das transações.
+
+Todos os backends expõem a mesma interface (append, append em lote, leitura
+por intervalo, limpeza e contagem), então o bot pode rodar sobre o Google
+Sheets em produção, SQLite localmente ou em memória nos testes e benchmarks.
+As linhas são listas na ordem de HEADERS; os índices de leitura são relativos
+às linhas de dados (a linha de cabeçalho não conta).
+"""
+
+import os
+import re
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from .metrics import track_sheets_call
+from .schema import DATE_FORMAT, SCHEMA
+
+HEADERS = SCHEMA.headers
+
+
+def row_kind(row):
+    """Classifica uma linha como despesa, crédito ou investimento"""
+    if len(row) > 5 and row[5] not in ('', None):
+        return 'credito'
+    if len(row) > 6 and row[6] not in ('', None):
+        return 'investimento'
+    return 'despesa'
+
+
+def parse_amount(value):
+    """Converte um valor da planilha (número ou texto com vírgula) em float"""
+    if value in ('', None):
+        return 0.0
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        return float(str(value).replace(',', '.'))
+    except ValueError:
+        return 0.0
+
+
+# Colunas de valores (Valor, Créditos, Investimento)
+AMOUNT_COLUMNS = (1, 5, 6)
+
+
+def numeric_row(row):
+    """Linha com os valores preenchidos convertidos em número (o Sheets devolve texto formatado)"""
+    row = list(row)
+    for column in AMOUNT_COLUMNS:
+        if column < len(row) and isinstance(row[column], str) and row[column]:
+            try:
+                row[column] = float(row[column].replace(',', '.'))
+            except ValueError:
+                pass
+    return row
+
+
+# Planilhas/tabelas com o esquema já conferido neste processo
+_schema_checked = set()
+_schema_lock = threading.Lock()
+
+
+class StorageBackend:
+    """Interface comum dos backends de armazenamento"""
+
+    schema = SCHEMA
+    headers = HEADERS
+
+    # Incrementada a cada escrita; permite invalidar relatórios em cache
+    version = 0
+    changed_at = None
+    _listeners = ()
+
+    def ensure_headers(self):
+        """Confere o esquema e aplica as migrações pendentes, uma vez por processo para cada planilha/tabela"""
+        key = self.identity() and (self.identity(), self.schema.version)
+        with _schema_lock:
+            if key is not None and key in _schema_checked:
+                return
+        try:
+            self._migrate()
+        except Exception as e:
+            print(f"Erro ao inicializar cabeçalhos: {e}")
+            return
+        if key is not None:
+            with _schema_lock:
+                _schema_checked.add(key)
+
+    def _migrate(self):
+        pass
+
+    def identity(self):
+        """Identifica os dados persistidos (para snapshots); None se não sobrevivem a um restart"""
+        return None
+
+    def add_listener(self, listener):
+        """
+        Registra listener(storage, appended, cleared, edited), chamado após cada
+        escrita. appended traz as linhas adicionadas e edited as linhas alteradas,
+        como (índice, linha antiga, linha nova ou None se removida) em ordem
+        decrescente de índice. Sem nenhum dos dois, a alteração é desconhecida.
+        """
+        self._listeners = self._listeners + (listener,)
+
+    def mark_changed(self, appended=None, cleared=False, edited=None):
+        self.version += 1
+        self.changed_at = time.monotonic()
+        for listener in self._listeners:
+            try:
+                listener(self, appended, cleared, edited)
+            except Exception as e:
+                print(f"Erro ao notificar alteração: {e}")
+
+    def append_row(self, row):
+        """Adiciona uma linha e retorna o número dela na planilha (cabeçalho = 1)"""
+        raise NotImplementedError
+
+    def append_rows(self, rows):
+        """Adiciona várias linhas em uma única operação e retorna o número da primeira"""
+        raise NotImplementedError
+
+    def get_rows(self, start=0, end=None):
+        """Retorna as linhas de dados no intervalo [start, end)"""
+        raise NotImplementedError
+
+    def update_rows(self, updates, previous=None, columns=None):
+        """
+        Substitui linhas existentes ({índice da linha de dados: linha}) e
+        retorna quantas. previous ({índice: linha antiga}) permite que as
+        visões em memória se atualizem sem reler o backend. Com columns
+        (índices), só essas colunas são gravadas e as demais células ficam
+        como estão no backend.
+        """
+        raise NotImplementedError
+
+    def delete_row(self, index, previous=None):
+        """Remove a linha de dados index; as seguintes sobem uma posição"""
+        raise NotImplementedError
+
+    def clear(self):
+        """Remove todas as linhas de dados, preservando o cabeçalho"""
+        raise NotImplementedError
+
+    def count(self):
+        """Número de linhas de dados"""
+        raise NotImplementedError
+
+    def is_empty(self):
+        """Se não há linhas de dados"""
+        return self.count() == 0
+
+    def get_records(self, start=0, end=None):
+        return [self._to_record(row) for row in self.get_rows(start, end)]
+
+    def _to_record(self, row):
+        row = list(row) + [''] * (len(self.headers) - len(row))
+        return dict(zip(self.headers, row))
+
+    def _pad(self, row):
+        row = list(row)
+        return row + [''] * (len(self.headers) - len(row))
+
+    def _edits(self, updates, previous):
+        if previous is None or any(index not in previous for index in updates):
+            return None
+        return [(index, self._pad(previous[index]), None if updates[index] is None else self._pad(updates[index]))
+                for index in sorted(updates, reverse=True)]
+
+
+class InMemoryStorage(StorageBackend):
+    """Backend em memória, usado em testes e benchmarks"""
+
+    def __init__(self):
+        self._rows = []
+        self._lock = threading.Lock()
+
+    def append_row(self, row):
+        with self._lock:
+            self._rows.append(self._pad(row))
+            self.mark_changed([self._rows[-1]])
+            return len(self._rows) + 1
+
+    def append_rows(self, rows):
+        with self._lock:
+            first = len(self._rows) + 2
+            added = [self._pad(row) for row in rows]
+            self._rows.extend(added)
+            self.mark_changed(added)
+            return first
+
+    def get_rows(self, start=0, end=None):
+        with self._lock:
+            return [list(row) for row in self._rows[start:end]]
+
+    def update_rows(self, updates, previous=None, columns=None):
+        with self._lock:
+            previous = {index: self._rows[index] for index in updates}
+            for index, row in updates.items():
+                if columns is not None:
+                    row = [row[i] if i in columns else value for i, value in enumerate(previous[index])]
+                self._rows[index] = self._pad(row)
+            updates = {index: self._rows[index] for index in updates}
+        self.mark_changed(edited=self._edits(updates, previous))
+        return len(updates)
+
+    def delete_row(self, index, previous=None):
+        with self._lock:
+            previous = self._rows.pop(index)
+        self.mark_changed(edited=self._edits({index: None}, {index: previous}))
+
+    def clear(self):
+        with self._lock:
+            self._rows = []
+            self.mark_changed(cleared=True)
+
+    def count(self):
+        return len(self._rows)
+
+
+class SQLiteStorage(StorageBackend):
+    """Backend SQLite para rodar o bot localmente sem depender do Google"""
+
+    columns = SCHEMA.columns
+
+    def __init__(self, path, table='transacoes', schema=None):
+        if schema is not None:
+            self.schema = schema
+            self.headers = schema.headers
+            self.columns = schema.columns
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.path = path
+        self.table = table
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._create_schema()
+        self.ensure_headers()
+
+    def _create_schema(self):
+        with self._lock, self._conn:
+            self._conn.execute(f"""
+                CREATE TABLE IF NOT EXISTS {self.table} (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    data_hora TEXT,
+                    valor,
+                    tipo_pagamento TEXT,
+                    categoria TEXT,
+                    descricao TEXT,
+                    creditos,
+                    investimento,
+                    categoria_investimento TEXT,
+                    timestamp TEXT,
+                    tipo TEXT
+                )
+            """)
+            self._conn.execute(f'CREATE INDEX IF NOT EXISTS idx_{self.table}_timestamp ON {self.table} (timestamp)')
+            self._conn.execute(f'CREATE INDEX IF NOT EXISTS idx_{self.table}_tipo ON {self.table} (tipo)')
+            self._conn.execute(f'CREATE INDEX IF NOT EXISTS idx_{self.table}_categoria ON {self.table} (categoria)')
+
+    def _migrate(self):
+        with self._lock, self._conn:
+            existing = {row[1] for row in self._conn.execute(f'PRAGMA table_info({self.table})')}
+            pending = [migration for migration in self.schema.migrations
+                       if not set(migration.columns) <= existing]
+            if not pending:
+                return
+            for migration in pending:
+                for column in migration.columns:
+                    if column not in existing:
+                        self._conn.execute(f'ALTER TABLE {self.table} ADD COLUMN {column}')
+            if not any(migration.backfill for migration in pending):
+                return
+
+            version = pending[0].version - 1
+            old = len(self.schema.headers_at(version))
+            new_columns = self.columns[old:]
+            rows = self._conn.execute(
+                f"SELECT id, {', '.join(self.columns[:old])} FROM {self.table} ORDER BY id").fetchall()
+            assignments = ', '.join(f'{column} = ?' for column in new_columns)
+            self._conn.executemany(
+                f'UPDATE {self.table} SET {assignments} WHERE id = ?',
+                [self.schema.upgrade_row(['' if value is None else value for value in row[1:]], version)[old:] + [row[0]]
+                 for row in rows])
+
+    def identity(self):
+        return f'sqlite:{os.path.abspath(self.path)}:{self.table}'
+
+    def _to_params(self, row):
+        row = self._pad(row)[:len(self.columns)]
+        try:
+            timestamp = datetime.strptime(str(row[0]), DATE_FORMAT).strftime('%Y-%m-%d %H:%M:%S')
+        except ValueError:
+            timestamp = None
+        return row + [timestamp, row_kind(row)]
+
+    def _insert(self, rows):
+        placeholders = ', '.join('?' * (len(self.columns) + 2))
+        sql = f"INSERT INTO {self.table} ({', '.join(self.columns)}, timestamp, tipo) VALUES ({placeholders})"
+        with self._lock, self._conn:
+            first = self._conn.execute(f'SELECT COUNT(*) FROM {self.table}').fetchone()[0] + 2
+            self._conn.executemany(sql, [self._to_params(row) for row in rows])
+        self.mark_changed([self._pad(row) for row in rows])
+        return first
+
+    def append_row(self, row):
+        return self._insert([row])
+
+    def append_rows(self, rows):
+        return self._insert(rows)
+
+    def get_rows(self, start=0, end=None):
+        limit = -1 if end is None else max(end - start, 0)
+        sql = f"SELECT {', '.join(self.columns)} FROM {self.table} ORDER BY id LIMIT ? OFFSET ?"
+        with self._lock:
+            cursor = self._conn.execute(sql, (limit, start))
+            return [['' if value is None else value for value in row] for row in cursor.fetchall()]
+
+    def _row_ids(self, indexes):
+        """ids (chave da tabela) das linhas de dados pelos índices"""
+        if len(indexes) == 1:
+            index, = indexes
+            sql = f'SELECT id FROM {self.table} ORDER BY id LIMIT 1 OFFSET ?'
+            found = self._conn.execute(sql, (index,)).fetchone()
+            if found is None:
+                raise IndexError(f'linha {index} não existe')
+            return {index: found[0]}
+        ids = [row[0] for row in self._conn.execute(f'SELECT id FROM {self.table} ORDER BY id')]
+        return {index: ids[index] for index in indexes}
+
+    def update_rows(self, updates, previous=None, columns=None):
+        if not updates:
+            return 0
+        if columns is None:
+            assignments = ', '.join(f'{column} = ?' for column in self.columns + ['timestamp', 'tipo'])
+            params = self._to_params
+        else:
+            assignments = ', '.join(f'{self.columns[i]} = ?' for i in sorted(columns))
+            params = lambda row: [self._pad(row)[i] for i in sorted(columns)]
+        sql = f"UPDATE {self.table} SET {assignments} WHERE id = ?"
+        with self._lock, self._conn:
+            ids = self._row_ids(list(updates))
+            self._conn.executemany(sql, [params(row) + [ids[index]] for index, row in updates.items()])
+        self.mark_changed(edited=self._edits(updates, previous))
+        return len(updates)
+
+    def delete_row(self, index, previous=None):
+        with self._lock, self._conn:
+            row_id = self._row_ids([index])[index]
+            self._conn.execute(f'DELETE FROM {self.table} WHERE id = ?', (row_id,))
+        self.mark_changed(edited=self._edits({index: None}, None if previous is None else {index: previous}))
+
+    def clear(self):
+        with self._lock, self._conn:
+            self._conn.execute(f'DELETE FROM {self.table}')
+        self.mark_changed(cleared=True)
+
+    def count(self):
+        with self._lock:
+            return self._conn.execute(f'SELECT COUNT(*) FROM {self.table}').fetchone()[0]
+
+
+_sheets_client = None
+_sheets_client_lock = threading.Lock()
+
+
+def sheets_client():
+    """Cliente gspread autenticado, compartilhado por todas as planilhas do processo"""
+    global _sheets_client
+    with _sheets_client_lock:
+        if _sheets_client is None:
+            import gspread
+            from google.oauth2.service_account import Credentials
+
+            credentials_path = os.getenv("GOOGLE_SERVICE_ACCOUNT_FILE")
+            credentials = Credentials.from_service_account_file(credentials_path, scopes=GoogleSheetsStorage.scope)
+            _sheets_client = gspread.authorize(credentials)
+        return _sheets_client
+
+
+def open_spreadsheet(sheet_id):
+    return track_sheets_call('open_by_key', sheets_client().open_by_key, sheet_id)
+
+
+class GoogleSheetsStorage(StorageBackend):
+    """Backend que grava na planilha do Google Sheets via gspread"""
+
+    scope = [
+        "https://spreadsheets.google.com/feeds",
+        "https://www.googleapis.com/auth/drive"
+    ]
+
+    def __init__(self, sheet_id=None, sheet_name=None, spreadsheet=None, create=False, schema=None, lazy=False,
+                 opener=None):
+        """
+        Com lazy, a planilha e a aba só são abertas (e a aba criada, com
+        create) no primeiro acesso à aba, que acontece em uma thread de
+        escrita/leitura e não no loop asyncio. opener abre a planilha
+        (padrão: open_spreadsheet(sheet_id)).
+        """
+        if schema is not None:
+            self.schema = schema
+            self.headers = schema.headers
+
+        self.sheet_id = sheet_id or os.getenv('GOOGLE_SHEET_ID')
+        self.sheet_name = sheet_name or os.getenv('GOOGLE_SHEET_NAME')
+        self.spreadsheet = spreadsheet
+        self._opener = opener or (lambda: open_spreadsheet(self.sheet_id))
+        self._create = create
+        self._worksheet = None
+        self._open_lock = threading.RLock()
+        if not lazy:
+            self._open()
+
+    @property
+    def worksheet(self):
+        if self._worksheet is None:
+            self._open()
+        return self._worksheet
+
+    @worksheet.setter
+    def worksheet(self, worksheet):
+        self._worksheet = worksheet
+
+    def _open(self):
+        with self._open_lock:
+            if self._worksheet is not None:
+                return
+            self.client = sheets_client()
+            if self.spreadsheet is None:
+                self.spreadsheet = self._opener()
+            self._worksheet = self._open_worksheet(self._create)
+            self.ensure_headers()
+
+    def identity(self):
+        return f'sheets:{self.sheet_id}:{self.sheet_name}'
+
+    def _open_worksheet(self, create):
+        from gspread.exceptions import WorksheetNotFound
+
+        try:
+            return track_sheets_call('worksheet', self.spreadsheet.worksheet, self.sheet_name)
+        except WorksheetNotFound:
+            if not create:
+                raise
+            return track_sheets_call('add_worksheet', self.spreadsheet.add_worksheet,
+                                     title=self.sheet_name, rows=1000, cols=len(self.headers))
+
+    def _migrate(self):
+        headers = track_sheets_call('row_values', self.worksheet.row_values, 1)
+        version = self.schema.version_of(headers)
+        if version is None:
+            print(f"Cabeçalhos desconhecidos na aba {self.sheet_name}; migração não aplicada")
+            return
+        if headers[:len(self.headers)] == self.headers:
+            return
+
+        # Cabeçalho e colunas novas de todas as linhas em um único batch_update
+        data = [{'range': f'A1:{self._last_column()}1', 'values': [self.headers]}]
+        pending = self.schema.pending(version)
+        if headers and any(migration.backfill for migration in pending):
+            rows = self.get_rows()
+            old = len(self.schema.headers_at(version))
+            if rows:
+                data.append({
+                    'range': f'{self._column(old + 1)}2:{self._last_column()}{len(rows) + 1}',
+                    'values': [self.schema.upgrade_row(row, version)[old:] for row in rows],
+                })
+        if self.worksheet.col_count < len(self.headers):
+            track_sheets_call('add_cols', self.worksheet.add_cols, len(self.headers) - self.worksheet.col_count)
+        track_sheets_call('batch_update', self.worksheet.batch_update, data)
+
+    def _first_row(self, response):
+        updated_range = (response or {}).get('updates', {}).get('updatedRange', '')
+        match = re.search(r'![A-Z]+(\d+)', updated_range)
+        return int(match.group(1)) if match else None
+
+    def append_row(self, row):
+        response = track_sheets_call('append_row', self.worksheet.append_row, row)
+        self.mark_changed([self._pad(row)])
+        return self._first_row(response)
+
+    def append_rows(self, rows):
+        if not rows:
+            return None
+        response = track_sheets_call('append_rows', self.worksheet.append_rows, rows)
+        self.mark_changed([self._pad(row) for row in rows])
+        return self._first_row(response)
+
+    def _column(self, number):
+        from gspread.utils import rowcol_to_a1
+        return re.sub(r'\d+', '', rowcol_to_a1(1, number))
+
+    def _last_column(self):
+        return self._column(len(self.headers))
+
+    def get_rows(self, start=0, end=None):
+        if start == 0 and end is None:
+            values = track_sheets_call('get_all_values', self.worksheet.get_all_values)[1:]
+        else:
+            first = start + 2
+            last = '' if end is None else end + 1
+            if end is not None and end <= start:
+                return []
+            values = track_sheets_call('get_values', self.worksheet.get_values, f'A{first}:{self._last_column()}{last}')
+        return [self._pad(row) for row in values]
+
+    def get_records(self, start=0, end=None):
+        if start == 0 and end is None:
+            return track_sheets_call('get_all_records', self.worksheet.get_all_records)
+
+        from gspread.utils import numericise_all
+        return [self._to_record(numericise_all(row)) for row in self.get_rows(start, end)]
+
+    def update_rows(self, updates, previous=None, columns=None):
+        if not updates:
+            return 0
+        if columns is None:
+            # Linhas lidas do Sheets trazem os valores como texto formatado ("100,5")
+            last_column = self._last_column()
+            data = [
+                {'range': f'A{index + 2}:{last_column}{index + 2}', 'values': [numeric_row(self._pad(row))]}
+                for index, row in sorted(updates.items())
+            ]
+        else:
+            # Uma célula por coluna alterada (sem previous, todas as pedidas)
+            old = previous or {}
+            data = [
+                {'range': f'{self._column(i + 1)}{index + 2}', 'values': [[self._pad(row)[i]]]}
+                for index, row in sorted(updates.items()) for i in sorted(columns)
+                if index not in old or self._pad(old[index])[i] != self._pad(row)[i]
+            ]
+        track_sheets_call('batch_update', self.worksheet.batch_update, data)
+        self.mark_changed(edited=self._edits(updates, previous))
+        return len(updates)
+
+    def delete_row(self, index, previous=None):
+        track_sheets_call('delete_rows', self.worksheet.delete_rows, index + 2)
+        self.mark_changed(edited=self._edits({index: None}, None if previous is None else {index: previous}))
+
+    def clear(self):
+        # Uma chamada, sem ler a planilha: o intervalo aberto cobre todas as linhas de dados
+        track_sheets_call('batch_clear', self.worksheet.batch_clear, [f'A2:{self._last_column()}'])
+        self.mark_changed(cleared=True)
+
+    def count(self):
+        return max(len(track_sheets_call('col_values', self.worksheet.col_values, 1)) - 1, 0)
+
+    def is_empty(self):
+        # Só a primeira linha de dados, em vez da coluna inteira
+        values = track_sheets_call('get_values', self.worksheet.get_values, f'A2:{self._last_column()}2')
+        return not any(cell != '' for row in values for cell in row)
+
+
+BACKENDS = {
+    'sheets': GoogleSheetsStorage,
+    'sqlite': SQLiteStorage,
+    'memory': InMemoryStorage,
+}
+
+_backend_name = None
+_storage = None
+_storage_lock = threading.Lock()
+
+
+def create_storage(backend=None):
+    """Cria um backend a partir do nome (ou da variável STORAGE_BACKEND)"""
+    backend = (backend or os.getenv('STORAGE_BACKEND') or 'sheets').lower()
+    if backend not in BACKENDS:
+        raise ValueError(f"Backend de armazenamento desconhecido: {backend}")
+
+    if backend == 'sqlite':
+        return SQLiteStorage(os.getenv('SQLITE_PATH', 'data/finance.db'))
+    return BACKENDS[backend]()
+
+
+def configure_storage(backend=None):
+    """Define qual backend será usado pelo bot (instanciado sob demanda)"""
+    global _backend_name, _storage
+    with _storage_lock:
+        if isinstance(backend, StorageBackend):
+            _storage = backend
+            _backend_name = type(backend).__name__
+        else:
+            _backend_name = backend
+            _storage = None
+
+
+def backend_name():
+    """Nome do backend configurado (sheets, sqlite ou memory)"""
+    if _storage is not None:
+        for name, cls in BACKENDS.items():
+            if type(_storage) is cls:
+                return name
+    return (_backend_name or os.getenv('STORAGE_BACKEND') or 'sheets').lower()
+
+
+def get_storage():
+    """Retorna o backend configurado, criando-o na primeira chamada"""
+    global _storage
+    with _storage_lock:
+        if _storage is None:
+            _storage = create_storage(_backend_name)
+        return _storage
@@ -0,0 +1,237 @@
+"""
+Roteamento multi-tenant: cada chat grava na sua própria planilha/aba.
+
+TENANT_MODE=single (padrão) mantém o comportamento original: todos os chats
+usam GOOGLE_SHEET_ID/GOOGLE_SHEET_NAME. Com TENANT_MODE=chat cada chat ganha
+uma aba "chat_<id>" na planilha padrão. Criar o backend do tenant não acessa o
+Sheets: a planilha e a aba são abertas (e a aba criada) no primeiro acesso,
+que roda nas filas de escrita, fora do loop asyncio. Um arquivo
+TENANTS_FILE (JSON) agrupa chats de uma mesma casa e permite apontar para
+outra planilha/aba:
+
+    {
+        "familia": {"chats": [123, 456], "sheet_name": "Familia"},
+        "joao": {"chats": [789], "sheet_id": "outra-planilha", "sheet_name": "Gastos"}
+    }
+
+Os handles abertos ficam em um registro LRU limitado (TENANT_CACHE_SIZE) e as
+escritas passam por uma fila por tenant com cota (TENANT_WRITES_PER_MINUTE),
+para que um usuário muito ativo não atrase os demais.
+"""
+
+import asyncio
+import contextvars
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from . import storage
+from .metrics import registry as metrics_registry
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TENANT = 'default'
+
+TENANT_WRITE_QUEUE_DEPTH = metrics_registry.gauge(
+    'tenant_write_queue_depth', 'Escritas aguardando na fila de cada tenant', ['tenant'])
+TENANT_QUOTA_REJECTIONS = metrics_registry.counter(
+    'tenant_quota_rejections_total', 'Escritas recusadas por exceder a cota do tenant', ['tenant'])
+TENANT_HANDLES_CACHED = metrics_registry.gauge(
+    'tenant_handles_cached', 'Handles de planilha/aba abertos no registro LRU')
+
+
+class QuotaExceeded(Exception):
+    pass
+
+
+class TenantRouter:
+    """Resolve qual tenant (planilha/aba) atende cada chat"""
+
+    def __init__(self, mode=None, tenants_file=None):
+        self.mode = (mode or os.getenv('TENANT_MODE') or 'single').lower()
+        self.specs = {}
+        self.chat_to_tenant = {}
+        tenants_file = tenants_file or os.getenv('TENANTS_FILE')
+        if tenants_file and os.path.exists(tenants_file):
+            with open(tenants_file) as f:
+                self.load(json.load(f))
+
+    def load(self, config):
+        for tenant, spec in config.items():
+            self.specs[tenant] = spec
+            for chat_id in spec.get('chats', []):
+                self.chat_to_tenant[int(chat_id)] = tenant
+
+    def resolve(self, chat_id):
+        if chat_id is None:
+            return DEFAULT_TENANT
+        if int(chat_id) in self.chat_to_tenant:
+            return self.chat_to_tenant[int(chat_id)]
+        if self.mode == 'chat':
+            return f'chat_{chat_id}'
+        return DEFAULT_TENANT
+
+    def spec(self, tenant):
+        spec = dict(self.specs.get(tenant, {}))
+        spec.setdefault('sheet_id', os.getenv('GOOGLE_SHEET_ID'))
+        spec.setdefault('sheet_name', tenant)
+        return spec
+
+
+class LRUCache:
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_create(self, key, factory):
+        with self._lock:
+            if key in self._items:
+                self._items.move_to_end(key)
+                return self._items[key]
+        value = factory()
+        with self._lock:
+            value = self._items.setdefault(key, value)
+            self._items.move_to_end(key)
+            while len(self._items) > self.maxsize:
+                evicted, _ = self._items.popitem(last=False)
+                logger.debug(f"Item removido do cache LRU: {evicted}")
+        return value
+
+    def __len__(self):
+        return len(self._items)
+
+    def __contains__(self, key):
+        return key in self._items
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+
+class HandleRegistry:
+    """Registro LRU de backends (e planilhas abertas) por tenant"""
+
+    def __init__(self, router, maxsize=None):
+        self.router = router
+        maxsize = maxsize or int(os.getenv('TENANT_CACHE_SIZE', 32))
+        self.storages = LRUCache(maxsize)
+        self.spreadsheets = LRUCache(maxsize)
+        # Backends em memória não podem ser descartados sem perder os dados
+        self._memory = {}
+        TENANT_HANDLES_CACHED.set_function(lambda: len(self.storages) + len(self.spreadsheets))
+
+    def get(self, tenant):
+        if tenant == DEFAULT_TENANT:
+            return storage.get_storage()
+        return self.storages.get_or_create(tenant, lambda: self._create(tenant))
+
+    def _create(self, tenant):
+        backend = storage.backend_name()
+        if backend == 'memory':
+            return self._memory.setdefault(tenant, storage.InMemoryStorage())
+        if backend == 'sqlite':
+            table = 'transacoes_' + re.sub(r'\W', '_', tenant)
+            return storage.SQLiteStorage(os.getenv('SQLITE_PATH', 'data/finance.db'), table=table)
+
+        # Chamado no loop asyncio (GoogleSheetsManager nos handlers): a planilha
+        # só é aberta no primeiro acesso à aba, já dentro das filas de escrita
+        spec = self.router.spec(tenant)
+        opener = lambda: self.spreadsheets.get_or_create(
+            spec['sheet_id'], lambda: storage.open_spreadsheet(spec['sheet_id']))
+        return storage.GoogleSheetsStorage(spec['sheet_id'], spec['sheet_name'], create=True, lazy=True,
+                                           opener=opener)
+
+
+class _TokenBucket:
+    def __init__(self, rate_per_minute, burst):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def take(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+
+class TenantWriteScheduler:
+    """
+    Executa escritas fora do loop asyncio, no máximo uma por tenant por vez
+    (fila FIFO por tenant) e dentro da cota de escritas por minuto do tenant.
+    """
+
+    def __init__(self, workers=None, rate_per_minute=None, burst=None, max_pending=None, max_buckets=None):
+        self.workers = workers or int(os.getenv('TENANT_WRITE_WORKERS', 4))
+        self.rate_per_minute = rate_per_minute or float(os.getenv('TENANT_WRITES_PER_MINUTE', 60))
+        self.burst = burst or int(os.getenv('TENANT_WRITE_BURST', 10))
+        self.max_pending = max_pending or int(os.getenv('TENANT_MAX_PENDING_WRITES', 20))
+        self._executor = None
+        self._locks = {}
+        # Uma cota por chat, limitada como os handles: o chat menos recente já
+        # recuperou a cota, e descartá-lo equivale a recriá-lo cheio
+        self._buckets = LRUCache(max_buckets or int(os.getenv('TENANT_QUOTA_CACHE_SIZE', 1024)))
+        self._pending = {}
+
+    def _executor_for(self):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='tenant-write')
+        return self._executor
+
+    def pending(self, tenant):
+        return self._pending.get(tenant, 0)
+
+    async def submit(self, tenant, func, *args, quota_key=None, **kwargs):
+        """
+        Enfileira func(*args) na fila do tenant. A cota vale por quota_key
+        (normalmente o chat), então numa planilha compartilhada um usuário
+        não consome a cota dos outros.
+        """
+        quota_key = quota_key if quota_key is not None else tenant
+        bucket = self._buckets.get_or_create(quota_key, lambda: _TokenBucket(self.rate_per_minute, self.burst))
+        if self.pending(tenant) >= self.max_pending or not bucket.take():
+            TENANT_QUOTA_REJECTIONS.inc(tenant=tenant)
+            raise QuotaExceeded(tenant)
+        return await self.run_exclusive(tenant, func, *args, **kwargs)
+
+    async def run_exclusive(self, tenant, func, *args, **kwargs):
+        """Roda func na fila do tenant sem consumir cota (tarefas internas do bot)"""
+        lock = self._locks.setdefault(tenant, asyncio.Lock())
+        self._pending[tenant] = self.pending(tenant) + 1
+        TENANT_WRITE_QUEUE_DEPTH.set(self._pending[tenant], tenant=tenant)
+        try:
+            async with lock:
+                context = contextvars.copy_context()
+                loop = asyncio.get_running_loop()
+                return await loop.run_in_executor(
+                    self._executor_for(), lambda: context.run(func, *args, **kwargs))
+        finally:
+            self._pending[tenant] -= 1
+            TENANT_WRITE_QUEUE_DEPTH.set(self._pending[tenant], tenant=tenant)
+
+
+router = TenantRouter()
+handles = HandleRegistry(router)
+write_scheduler = TenantWriteScheduler()
+
+
+def tenant_for_chat(chat_id):
+    return router.resolve(chat_id)
+
+
+def storage_for_tenant(tenant):
+    return handles.get(tenant)
+
+
+def storage_for_chat(chat_id):
+    return storage_for_tenant(tenant_for_chat(chat_id))
@@ -0,0 +1,226 @@
+"""
+Relatório do /statistics em texto (/statistics texto).
+
+Traz as mesmas informações dos gráficos de generate_all_statistics como
+tabelas monoespaçadas, barras e sparklines Unicode, calculadas em uma única
+passada sobre as células do cubo de agregados (src/rollup.py). Não usa pandas
+nem matplotlib, então sai em uma única mensagem em milissegundos.
+"""
+
+from collections import defaultdict, Counter
+from operator import itemgetter
+
+from .rollup import RollupCube, most_frequent
+
+SPARK_CHARS = '▁▂▃▄▅▆▇█'
+BAR_CHARS = '▏▎▍▌▋▊▉█'
+
+BAR_WIDTH = 12
+SPARK_WIDTH = 30
+MAX_ROWS = 10
+MAX_MONTHS = 12
+LABEL_WIDTH = 14
+
+
+def bar(value, maximum, width=BAR_WIDTH):
+    if maximum <= 0 or value <= 0:
+        return ''
+    eighths = int(round(value / maximum * width * 8))
+    full, rest = divmod(max(eighths, 1), 8)
+    return '█' * full + (BAR_CHARS[rest - 1] if rest else '')
+
+
+def sparkline(values):
+    if not values:
+        return ''
+    low, high = min(values), max(values)
+    if high == low:
+        return SPARK_CHARS[0] * len(values)
+    scale = (len(SPARK_CHARS) - 1) / (high - low)
+    return ''.join(SPARK_CHARS[int(round((v - low) * scale))] for v in values)
+
+
+def bucket(values, width, reducer):
+    """Agrupa a série em no máximo `width` baldes consecutivos"""
+    if len(values) <= width:
+        return list(values)
+    size = len(values) / width
+    return [reducer(values[int(i * size):int((i + 1) * size)]) for i in range(width)]
+
+
+def _label(text):
+    text = str(text) or '-'
+    return text[:LABEL_WIDTH].ljust(LABEL_WIDTH)
+
+
+def _money(value):
+    return f'{value:>10.2f}'
+
+
+class TextReport:
+    """Aceita os registros da planilha ou um CubeSnapshot já pronto"""
+
+    def __init__(self, records=None, snapshot=None):
+        if snapshot is None:
+            snapshot = RollupCube.from_records(records or []).snapshot()
+
+        self.total_creditos = 0.0
+        self.total_debitos = 0.0
+        self.total_investimentos = 0.0
+        self.num_creditos = 0
+        self.num_debitos = 0
+        self.num_investimentos = 0
+        self.total_transacoes = snapshot.rows
+        self.forecast = snapshot.forecast
+
+        self.gastos_categoria = defaultdict(float)
+        self.frequencia_categoria = Counter()
+        self.pagamentos = Counter()
+        self.investimentos_categoria = defaultdict(float)
+        self.frequencia_investimento = Counter()
+        self.gastos_mes = defaultdict(float)
+        self.gastos_dia = defaultdict(float)
+        # dia -> [variação do patrimônio, valor investido]
+        self.movimentos = defaultdict(lambda: [0.0, 0.0])
+
+        for cell in snapshot.cells:
+            self._add(*cell)
+
+    def _add(self, day, tipo, categoria, pagamento, total, quantidade):
+        movimento = self.movimentos[day]
+        if tipo == 'despesa':
+            self.total_debitos += total
+            self.num_debitos += quantidade
+            self.gastos_categoria[categoria] += total
+            self.frequencia_categoria[categoria] += quantidade
+            self.pagamentos[pagamento] += quantidade
+            self.gastos_mes[(day.year, day.month)] += total
+            self.gastos_dia[day] += total
+            movimento[0] -= total
+        elif tipo == 'credito':
+            self.total_creditos += total
+            self.num_creditos += quantidade
+            movimento[0] += total
+        elif tipo == 'investimento':
+            self.total_investimentos += total
+            self.num_investimentos += quantidade
+            self.investimentos_categoria[categoria] += total
+            self.frequencia_investimento[categoria] += quantidade
+            movimento[0] -= total
+            movimento[1] += total
+
+    @property
+    def saldo_liquido(self):
+        return self.total_creditos - self.total_debitos - self.total_investimentos
+
+    def _ranking(self, title, totals):
+        if not totals:
+            return []
+        ordered = sorted(totals.items(), key=lambda item: item[1], reverse=True)
+        maximum = ordered[0][1]
+        lines = [title]
+        for name, value in ordered[:MAX_ROWS]:
+            lines.append(f'{_label(name)} {_money(value)} {bar(value, maximum)}')
+        if len(ordered) > MAX_ROWS:
+            lines.append(f'... mais {len(ordered) - MAX_ROWS}')
+        return lines
+
+    def _pagamentos(self):
+        if not self.pagamentos:
+            return []
+        total = sum(self.pagamentos.values())
+        maximum = self.pagamentos.most_common(1)[0][1]
+        lines = ['TIPOS DE PAGAMENTO']
+        for name, count in self.pagamentos.most_common(MAX_ROWS):
+            lines.append(f'{_label(name)} {count / total:>9.1%}  {bar(count, maximum)}')
+        return lines
+
+    def _meses(self):
+        if not self.gastos_mes:
+            return []
+        months = sorted(self.gastos_mes)[-MAX_MONTHS:]
+        maximum = max(self.gastos_mes[m] for m in months)
+        lines = ['TOTAL GASTO POR MÊS']
+        for year, month in months:
+            value = self.gastos_mes[(year, month)]
+            lines.append(f'{_label(f"{month:02d}/{year}")} {_money(value)} {bar(value, maximum)}')
+        return lines
+
+    def _dias(self):
+        if not self.gastos_dia:
+            return []
+        days = sorted(self.gastos_dia)
+        values = bucket([self.gastos_dia[d] for d in days], SPARK_WIDTH, sum)
+        return [
+            f'GASTOS POR DIA ({days[0]:%d/%m/%Y} a {days[-1]:%d/%m/%Y})',
+            sparkline(values),
+            f'mín {min(values):.2f}  máx {max(values):.2f}',
+        ]
+
+    def _fluxo(self):
+        values = [('Créditos', self.total_creditos), ('Débitos', self.total_debitos),
+                  ('Investimentos', self.total_investimentos)]
+        maximum = max(v for _, v in values)
+        if maximum <= 0:
+            return []
+        lines = ['FLUXO FINANCEIRO']
+        for name, value in values:
+            lines.append(f'{_label(name)} {_money(value)} {bar(value, maximum)}')
+        lines.append(f'{_label("Saldo líquido")} {_money(self.saldo_liquido)}')
+        return lines
+
+    def _patrimonio(self):
+        if not self.movimentos:
+            return []
+        patrimonio = []
+        investido = []
+        saldo = 0.0
+        acumulado = 0.0
+        for _, (delta, investimento) in sorted(self.movimentos.items()):
+            saldo += delta
+            acumulado += investimento
+            patrimonio.append(saldo)
+            investido.append(acumulado)
+        lines = [
+            'EVOLUÇÃO DO PATRIMÔNIO',
+            f'{_label("Patrimônio")} {sparkline(bucket(patrimonio, SPARK_WIDTH, itemgetter(-1)))}',
+        ]
+        if acumulado > 0:
+            lines.append(f'{_label("Investido")} {sparkline(bucket(investido, SPARK_WIDTH, itemgetter(-1)))}')
+        lines.append(f'início {patrimonio[0]:.2f}  atual {patrimonio[-1]:.2f}')
+        return lines
+
+    def summary(self):
+        dates = list(self.movimentos)
+        periodo = f'{min(dates):%d/%m/%Y} a {max(dates):%d/%m/%Y}' if dates else 'N/A'
+        categoria_freq = most_frequent(self.frequencia_categoria)
+        invest_freq = most_frequent(self.frequencia_investimento)
+        summary = (
+            f"📊 **RESUMO FINANCEIRO PESSOAL**\n\n"
+            f"💰 **Total de créditos**: R$ {self.total_creditos:.2f} ({self.num_creditos} transações)\n"
+            f"💸 **Total de débitos**: R$ {self.total_debitos:.2f} ({self.num_debitos} transações)\n"
+            f"📈 **Total investido**: R$ {self.total_investimentos:.2f} ({self.num_investimentos} transações)\n"
+            f"💳 **Saldo líquido**: R$ {self.saldo_liquido:.2f}\n"
+            f"📊 **Total de transações**: {self.total_transacoes}\n"
+            f"📅 **Período**: {periodo}\n\n"
+            f"🏷️ **Categoria de gasto mais frequente**: {categoria_freq}\n"
+            f"📊 **Categoria de investimento mais frequente**: {invest_freq}\n"
+        )
+        if self.forecast is not None and not self.forecast.empty:
+            summary += f"\n{self.forecast.summary_line()}\n"
+        return summary
+
+    def render(self):
+        if not self.total_transacoes:
+            return None
+        sections = [
+            self._ranking('GASTOS POR CATEGORIA', self.gastos_categoria),
+            self._pagamentos(),
+            self._ranking('INVESTIMENTOS POR CATEGORIA', self.investimentos_categoria),
+            self._meses(),
+            self._dias(),
+            self._fluxo(),
+            self._patrimonio(),
+        ]
+        body = '\n\n'.join('\n'.join(section) for section in sections if section)
+        return f"{self.summary()}\n```\n{body}\n```"
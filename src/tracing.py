@@ -0,0 +1,102 @@
+"""
+Tracing leve por update.
+
+Cada update processado por um handler ganha um Trace com spans (parse, I/O de
+armazenamento, agregação, renderização e envio). Ao final o trace é exportado
+como uma linha de log estruturada no logger "src.tracing".
+"""
+
+import contextvars
+import functools
+import logging
+import time
+import uuid
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+_current_trace = contextvars.ContextVar('current_trace', default=None)
+
+
+class Trace:
+    def __init__(self, handler, update_id=None, chat_id=None):
+        self.trace_id = uuid.uuid4().hex[:16]
+        self.handler = handler
+        self.update_id = update_id
+        self.chat_id = chat_id
+        self.started = time.time()
+        self._started_perf = time.perf_counter()
+        self.duration_ms = None
+        self.error = None
+        self.spans = []
+
+    def add_span(self, name, started_perf, ended_perf, **attributes):
+        span = {
+            'name': name,
+            'start_ms': round((started_perf - self._started_perf) * 1000, 3),
+            'duration_ms': round((ended_perf - started_perf) * 1000, 3),
+        }
+        if attributes:
+            span.update(attributes)
+        self.spans.append(span)
+
+    def finish(self, error=None):
+        self.duration_ms = round((time.perf_counter() - self._started_perf) * 1000, 3)
+        self.error = error
+
+    def to_dict(self):
+        return {
+            'trace_id': self.trace_id,
+            'handler': self.handler,
+            'update_id': self.update_id,
+            'chat_id': self.chat_id,
+            'started': self.started,
+            'duration_ms': self.duration_ms,
+            'error': self.error,
+            'spans': self.spans,
+        }
+
+
+def current_trace():
+    return _current_trace.get()
+
+
+@contextmanager
+def span(name, **attributes):
+    """Mede um trecho do processamento do update atual (no-op fora de um trace)"""
+    trace = _current_trace.get()
+    if trace is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        trace.add_span(name, started, time.perf_counter(), **attributes)
+
+
+def export(trace):
+    # A serialização fica para o formatter JSON, fora do caminho da requisição
+    logger.info("trace", extra={'trace': trace.to_dict()})
+
+
+def traced_handler(name):
+    """Decorator que abre um Trace para cada update recebido pelo handler"""
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(update, context, *args, **kwargs):
+            chat = getattr(update, 'effective_chat', None)
+            trace = Trace(name, getattr(update, 'update_id', None), getattr(chat, 'id', None))
+            token = _current_trace.set(trace)
+            error = None
+            try:
+                return await func(update, context, *args, **kwargs)
+            except Exception as e:
+                error = repr(e)
+                raise
+            finally:
+                trace.finish(error)
+                _current_trace.reset(token)
+                export(trace)
+        return wrapper
+    return decorator
@@ -0,0 +1,130 @@
+"""
+Aquecimento na subida do servidor webhook.
+
+As etapas caras que antes ficavam para a primeira requisição (credenciais e
+conexão com o Sheets, checagem dos cabeçalhos, import do matplotlib e cache de
+fontes) rodam em paralelo, cada uma na sua thread, enquanto a aplicação do
+Telegram inicializa no loop asyncio. O /health mostra se o bot está pronto e
+quanto tempo cada etapa levou.
+"""
+
+import io
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+from .metrics import registry as metrics_registry
+
+logger = logging.getLogger(__name__)
+
+WARMUP_STAGE_SECONDS = metrics_registry.gauge(
+    'warmup_stage_seconds', 'Duração de cada etapa do aquecimento na subida', ['stage'])
+
+
+class Warmup:
+    def __init__(self):
+        self.stages = {}
+        self.started = time.monotonic()
+        self._events = {}
+        self._lock = threading.Lock()
+
+    def expect(self, *names):
+        """Declara etapas pendentes: o bot só fica pronto depois delas"""
+        with self._lock:
+            for name in names:
+                self.stages.setdefault(name, {'status': 'pending'})
+                self._events.setdefault(name, threading.Event())
+
+    @contextmanager
+    def stage(self, name):
+        self.expect(name)
+        with self._lock:
+            self.stages[name] = {'status': 'running'}
+        started = time.perf_counter()
+        try:
+            yield
+        except Exception as e:
+            self._finish(name, started, error=e)
+            raise
+        self._finish(name, started)
+
+    def _finish(self, name, started, error=None):
+        seconds = time.perf_counter() - started
+        with self._lock:
+            self.stages[name] = {'status': 'failed' if error else 'ok', 'seconds': round(seconds, 3)}
+            if error:
+                self.stages[name]['error'] = str(error)
+        WARMUP_STAGE_SECONDS.set(seconds, stage=name)
+        if error:
+            logger.error(f"Aquecimento: etapa {name} falhou em {seconds:.2f}s: {error}")
+        else:
+            logger.info(f"Aquecimento: etapa {name} concluída em {seconds:.2f}s")
+        self._events[name].set()
+
+    def start(self, tasks):
+        """Roda cada tarefa ({nome: função}) em uma thread própria"""
+        self.expect(*tasks)
+        for name, func in tasks.items():
+            threading.Thread(target=self._run, args=(name, func), name=f'warmup-{name}', daemon=True).start()
+
+    def _run(self, name, func):
+        try:
+            with self.stage(name):
+                func()
+        except Exception:
+            # Já registrada em _finish; a etapa volta a ser feita sob demanda
+            pass
+
+    def wait(self, name=None, timeout=None):
+        """Espera uma etapa (ou todas); retorna False se o timeout estourar"""
+        names = [name] if name else list(self._events)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for stage in names:
+            remaining = None if deadline is None else max(deadline - time.monotonic(), 0)
+            if not self._events[stage].wait(remaining):
+                return False
+        return True
+
+    @property
+    def ready(self):
+        return self.status()['ready']
+
+    def status(self):
+        with self._lock:
+            stages = {name: dict(stage) for name, stage in self.stages.items()}
+        ready = all(stage['status'] in ('ok', 'failed') for stage in stages.values())
+        return {
+            'ready': ready,
+            'degraded': any(stage['status'] == 'failed' for stage in stages.values()),
+            'uptime_seconds': round(time.monotonic() - self.started, 3),
+            'stages': stages,
+        }
+
+
+def warm_storage():
+    """Credenciais, conexão com a planilha padrão e checagem dos cabeçalhos"""
+    from .tenants import DEFAULT_TENANT, storage_for_tenant
+    storage_for_tenant(DEFAULT_TENANT)
+
+
+def warm_matplotlib():
+    """Import do pyplot/seaborn e renderização de uma figura mínima (cache de fontes)"""
+    from .reports import _render_lock
+    from .statistics import plt
+
+    with _render_lock:
+        fig, ax = plt.subplots(figsize=(1, 1))
+        ax.set_title('R$ 0,00')
+        fig.savefig(io.BytesIO(), format='png')
+        plt.close(fig)
+
+
+def default_tasks():
+    return {
+        'storage': warm_storage,
+        'matplotlib': warm_matplotlib,
+    }
+
+
+warmup = Warmup()
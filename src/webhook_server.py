@@ -7,22 +7,63 @@ Mantém toda a funcionalidade do bot original, apenas muda a forma de receber me
 import os
 import logging
 import asyncio
-from threading import Thread
-from flask import Flask, request, jsonify
+from collections import deque
+from threading import Lock, Thread
+from flask import Flask, Response, request, jsonify
 from telegram import Update
-from telegram.ext import Application, CommandHandler, MessageHandler, filters
-from .bot import PersonalFinanceBotManager, start, clear_table, statistics, handle_transaction, handle_unknown
+from telegram.ext import Application
+from .bot import add_handlers
+from . import metrics
+from .logging_config import setup_logging, summarize_update, should_sample
+from .snapshots import warm_state
+from .warmup import warmup, default_tasks
 
-logging.basicConfig(
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    level=logging.INFO
-)
 logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
 telegram_app = None
 loop = None
 
+
+class RecentUpdates:
+    """Janela dos últimos update_ids processados; o Telegram reenvia updates sem resposta"""
+    
+    def __init__(self, size=None):
+        self.size = size or int(os.getenv('WEBHOOK_DEDUP_WINDOW', 1000))
+        self._order = deque()
+        self._ids = set()
+        self._lock = Lock()
+    
+    def seen(self, update_id):
+        """Registra o update_id; retorna True se ele já estava na janela"""
+        with self._lock:
+            if update_id in self._ids:
+                return True
+            self._order.append(update_id)
+            self._ids.add(update_id)
+            while len(self._order) > self.size:
+                self._ids.discard(self._order.popleft())
+            return False
+    
+    def forget(self, update_id):
+        """Tira o update_id da janela para que a reentrega seja processada"""
+        with self._lock:
+            if update_id in self._ids:
+                self._ids.discard(update_id)
+                self._order.remove(update_id)
+    
+    def dump(self):
+        with self._lock:
+            return list(self._order)
+    
+    def restore(self, update_ids):
+        for update_id in update_ids:
+            self.seen(update_id)
+
+
+recent_updates = RecentUpdates()
+warm_state.register('updates', recent_updates.dump, recent_updates.restore)
+
 def create_telegram_app():
     """Cria a aplicação do Telegram com os mesmos handlers do bot original"""
     token = os.getenv('TELEGRAM_BOT_TOKEN')
@@ -30,18 +71,12 @@ def create_telegram_app():
         logger.error("TELEGRAM_BOT_TOKEN não encontrado")
         return None
     
-    application = Application.builder().token(token).build()
-    
-    application.add_handler(CommandHandler("start", start))
-    application.add_handler(CommandHandler("clearTable", clear_table))
-    application.add_handler(CommandHandler("statistics", statistics))
-    
-    application.add_handler(MessageHandler(
-        filters.TEXT & ~filters.COMMAND, 
-        handle_transaction
-    ))
-    
-    application.add_handler(MessageHandler(filters.COMMAND, handle_unknown))
+    builder = Application.builder().token(token)
+    api_url = os.getenv('TELEGRAM_API_URL')
+    if api_url:
+        builder = builder.base_url(api_url)
+    application = builder.build()
+    add_handlers(application)
     
     return application
 
@@ -60,6 +95,7 @@ def index():
     <p><strong>Endpoints:</strong></p>
     <ul>
         <li><code>/health</code> - Health check</li>
+        <li><code>/metrics</code> - Métricas no formato Prometheus</li>
         <li><code>/webhook</code> - Webhook do Telegram</li>
     </ul>
     <p><em>Bot funcionando em modo webhook para deploy no Render.</em></p>
@@ -67,52 +103,71 @@ def index():
 
 @app.route('/health', methods=['GET'])
 def health_check():
-    """Health check para o Render saber que o serviço está ativo"""
+    """Health check para o Render: 503 enquanto o aquecimento não terminar"""
+    status = warmup.status()
+    if not status['ready']:
+        state = 'starting'
+    elif status['degraded']:
+        state = 'degraded'
+    else:
+        state = 'healthy'
     return jsonify({
-        'status': 'healthy',
+        'status': state,
         'service': 'Personal Finance Controller Bot',
-        'mode': 'webhook'
-    })
+        'mode': 'webhook',
+        **status
+    }), 200 if status['ready'] else 503
+
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    """Métricas de latência, Sheets, gráficos e filas no formato do Prometheus"""
+    return Response(metrics.registry.render(), mimetype='text/plain; version=0.0.4')
 
 @app.route('/webhook', methods=['POST'])
 def webhook():
     """Endpoint que recebe mensagens do Telegram via webhook"""
+    metrics.WEBHOOK_IN_FLIGHT.inc()
+    update_id = None
     try:
-        logger.info("Webhook recebido - processando mensagem...")
-        
         update_data = request.get_json()
-        logger.info(f"Dados recebidos: {update_data}")
         
         if not update_data:
             logger.warning("Webhook chamado sem dados")
             return jsonify({'status': 'no_data'}), 400
         
-        update = Update.de_json(update_data, telegram_app.bot)
-        logger.info(f"Update criado: {update}")
+        update_id = update_data.get('update_id')
+        if update_id is not None and recent_updates.seen(update_id):
+            metrics.WEBHOOK_DUPLICATES.inc()
+            return jsonify({'status': 'duplicate'})
+        
+        if logger.isEnabledFor(logging.DEBUG):
+            # Payload completo só para uma amostra (LOG_PAYLOAD_SAMPLE_RATE)
+            payload = update_data if should_sample() else summarize_update(update_data)
+            logger.debug("Webhook recebido", extra={'update': payload})
         
-        logger.info("Processando update...")
+        update = Update.de_json(update_data, telegram_app.bot)
         run_async_task(telegram_app.process_update(update))
-        logger.info("Update processado com sucesso")
         
         return jsonify({'status': 'ok'})
     
     except Exception as e:
-        logger.error(f"Erro no webhook: {e}", exc_info=True)
+        if update_id is not None:
+            recent_updates.forget(update_id)
+        logger.error(f"Erro no webhook: {e}", exc_info=True, extra={'update': summarize_update(request.get_json(silent=True))})
         return jsonify({'status': 'error', 'message': str(e)}), 500
+    
+    finally:
+        metrics.WEBHOOK_IN_FLIGHT.dec()
 
-def setup_webhook():
+async def setup_webhook():
     """Configura o webhook automaticamente no startup"""
     try:
         render_external_url = os.getenv('RENDER_EXTERNAL_URL')
         if render_external_url:
             webhook_url = f"{render_external_url}/webhook"
             logger.info(f"Configurando webhook para: {webhook_url}")
-            
-            async def set_webhook_async():
-                await telegram_app.bot.set_webhook(webhook_url)
-                logger.info("✅ Webhook configurado com sucesso!")
-            
-            run_async_task(set_webhook_async())
+            await telegram_app.bot.set_webhook(webhook_url)
+            logger.info("✅ Webhook configurado com sucesso!")
         else:
             logger.warning("RENDER_EXTERNAL_URL não encontrada - webhook não configurado")
     
@@ -126,15 +181,20 @@ def run_async_loop():
     asyncio.set_event_loop(loop)
     
     async def init_app():
+        # Roda com o loop já girando: quando a etapa termina, o webhook pode despachar updates
         logger.info("Inicializando aplicação do Telegram...")
-        await telegram_app.initialize()
-        await telegram_app.start()
+        with warmup.stage('telegram'):
+            await telegram_app.initialize()
+            await telegram_app.start()
         logger.info("Aplicação do Telegram inicializada com sucesso!")
+        
+        metrics.UPDATE_QUEUE_DEPTH.set_function(lambda: telegram_app.update_queue.qsize())
+        loop.create_task(metrics.monitor_event_loop())
+        
+        if os.getenv('RENDER'):
+            await setup_webhook()
     
-    loop.run_until_complete(init_app())
-    
-    if os.getenv('RENDER'):
-        setup_webhook()
+    loop.create_task(init_app())
     
     try:
         loop.run_forever()
@@ -149,6 +209,7 @@ def main():
     
     port = int(os.environ.get('PORT', 8080))
     
+    setup_logging('logs/bot.log')
     logger.info(f"Iniciando servidor na porta: {port}")
     logger.info(f"RENDER_EXTERNAL_URL: {os.getenv('RENDER_EXTERNAL_URL')}")
     
@@ -159,13 +220,15 @@ def main():
         logger.error("Falha ao criar aplicação do Telegram")
         return
     
-    # Iniciar loop asyncio em thread separada
+    # Iniciar loop asyncio em thread separada; Sheets e matplotlib aquecem em paralelo
+    warmup.expect('telegram')
     async_thread = Thread(target=run_async_loop, daemon=True)
     async_thread.start()
+    warmup.start(default_tasks())
     
-    # Aguardar um pouco para garantir que a inicialização terminou
-    import time
-    time.sleep(3)
+    # Só os updates dependem da aplicação do Telegram; as demais etapas seguem durante o serviço
+    if not warmup.wait('telegram', timeout=float(os.getenv('WARMUP_TIMEOUT', 30))):
+        logger.warning("Aplicação do Telegram ainda não inicializou; servindo mesmo assim")
     
     logger.info("🚀 Servidor webhook iniciado")
     logger.info("🤖 Bot funcionando em modo webhook")
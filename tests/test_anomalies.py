@@ -0,0 +1,125 @@
+import pytest
+import sys
+import os
+import math
+import asyncio
+import statistics
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.anomalies import AnomalyDetector, SpendingStats, Welford
+from src.storage import InMemoryStorage
+from src.google_sheets import GoogleSheetsManager
+
+
+class TestWelford:
+    def test_matches_batch_statistics_after_removals(self):
+        values = [3.0, 7.5, 1.25, 9.0, 4.0, 6.5]
+        stats = Welford()
+        for x in values:
+            stats.add(x)
+        stats.remove(7.5)
+        stats.remove(3.0)
+
+        rest = [1.25, 9.0, 4.0, 6.5]
+        assert stats.count == 4
+        assert stats.mean == pytest.approx(statistics.mean(rest))
+        assert stats.std == pytest.approx(statistics.stdev(rest))
+
+    def test_without_leaves_original_untouched(self):
+        stats = Welford()
+        for x in (1.0, 2.0, 3.0):
+            stats.add(x)
+
+        assert stats.without(3.0).mean == pytest.approx(1.5)
+        assert stats.count == 3
+
+
+class TestAnomalyDetector:
+    def setup_method(self):
+        self.storage = InMemoryStorage()
+        self.manager = GoogleSheetsManager(storage=self.storage)
+        self.detector = AnomalyDetector()
+        asyncio.run(self.detector.registry.loaded(self.manager))
+
+    def spend(self, valor, categoria='transporte'):
+        self.manager.add_expense(valor, 'pix', categoria, 'uber')
+        return asyncio.run(self.detector.check(self.manager, categoria, valor))
+
+    def test_flags_expense_far_above_typical(self):
+        for valor in (20.0, 25.0, 18.0, 22.0, 30.0, 24.0):
+            assert self.spend(valor) is None
+
+        alert = self.spend(200.0)
+
+        assert 'transporte' in alert and '8.' in alert
+        # Um gasto dentro da faixa habitual não é marcado
+        assert self.spend(28.0) is None
+
+    def test_needs_history_in_the_category(self):
+        for valor in (20.0, 25.0, 18.0):
+            self.spend(valor)
+
+        assert self.spend(500.0) is None
+        assert self.spend(500.0, categoria='lazer') is None
+
+    def test_thresholds_from_environment(self):
+        for valor in (20.0, 25.0, 18.0):
+            self.spend(valor)
+
+        with patch.dict(os.environ, {'ANOMALY_MIN_COUNT': '3'}):
+            assert self.spend(500.0) is not None
+
+    def test_cold_view_is_not_read_in_the_confirmation(self):
+        detector = AnomalyDetector()
+
+        async def check():
+            with patch.object(self.storage, 'get_rows', wraps=self.storage.get_rows) as get_rows:
+                alert = await detector.check(self.manager, 'transporte', 500.0)
+                return alert, get_rows.call_count
+
+        assert asyncio.run(check()) == (None, 0)
+
+    def test_no_rows_read_after_load(self):
+        for valor in (20.0, 25.0, 18.0, 22.0, 30.0):
+            self.spend(valor)
+
+        with patch.object(self.storage, 'get_rows', wraps=self.storage.get_rows) as get_rows:
+            assert self.spend(300.0) is not None
+            assert self.spend(21.0) is None
+        get_rows.assert_not_called()
+
+
+class TestSpendingStats:
+    def setup_method(self):
+        self.storage = InMemoryStorage()
+        self.manager = GoogleSheetsManager(storage=self.storage)
+        for valor in (10.0, 40.0):
+            self.manager.add_expense(valor, 'pix', 'lazer', 'cinema')
+        self.manager.add_credit(1500.0)
+        self.stats = SpendingStats(self.storage)
+        self.stats.load()
+
+    def test_only_expenses_in_log_scale(self):
+        assert list(self.stats.stats) == ['lazer']
+        assert math.exp(self.stats.stats['lazer'].mean) == pytest.approx(20.0)
+
+    def test_follows_edits_and_deletes(self):
+        rows = self.storage.get_rows()
+        self.storage.update_rows({0: rows[0][:1] + [20.0] + rows[0][2:]}, previous={0: rows[0]})
+        self.storage.delete_row(1, previous=rows[1])
+
+        assert self.stats.stats['lazer'].count == 1
+        assert math.exp(self.stats.stats['lazer'].mean) == pytest.approx(20.0)
+
+    def test_dump_and_restore(self):
+        restored = SpendingStats(InMemoryStorage())
+        restored.restore(self.stats.dump())
+
+        assert restored.stats['lazer'].count == 2
+        assert restored.stats['lazer'].mean == self.stats.stats['lazer'].mean
+
+
+if __name__ == '__main__':
+    pytest.main([__file__])
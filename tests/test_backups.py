@@ -0,0 +1,111 @@
+import pytest
+import sys
+import os
+from unittest.mock import MagicMock, patch
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.backups import BackupStore
+from src.google_sheets import GoogleSheetsManager
+from src.storage import GoogleSheetsStorage, InMemoryStorage
+
+
+class TestClearAndRestore:
+    def setup_method(self):
+        self.storage = InMemoryStorage()
+        self.manager = GoogleSheetsManager(storage=self.storage)
+
+    def make_backups(self, tmp_path, keep=None):
+        return patch('src.google_sheets.backups', BackupStore(str(tmp_path), keep=keep))
+
+    def test_clear_saves_backup_and_restore_reloads_it(self, tmp_path):
+        self.manager.add_expense(50.0, 'pix', 'alimentacao', 'mercado')
+        self.manager.add_credit(1500.0)
+        rows = self.storage.get_rows()
+
+        with self.make_backups(tmp_path) as backups:
+            assert self.manager.clear_table()
+            assert self.storage.count() == 0
+
+            saved = backups.list('default')
+            assert [backup['rows'] for backup in saved] == [2]
+            with patch.object(self.storage, 'append_rows', wraps=self.storage.append_rows) as append_rows:
+                assert self.manager.restore_backup(saved[0]) == 2
+
+        assert append_rows.call_count == 1
+        assert self.storage.get_rows() == rows
+
+    def test_restore_needs_empty_table(self, tmp_path):
+        self.manager.add_credit(10.0)
+        with self.make_backups(tmp_path) as backups:
+            self.manager.clear_table()
+            self.manager.add_credit(20.0)
+
+            assert self.manager.restore_backup(backups.list('default')[0]) is None
+        assert self.storage.count() == 1
+
+    def test_failed_backup_keeps_the_data(self, tmp_path):
+        self.manager.add_credit(10.0)
+        with self.make_backups(tmp_path) as backups:
+            with patch.object(backups, 'save', side_effect=OSError('disco cheio')):
+                assert not self.manager.clear_table()
+        assert self.storage.count() == 1
+
+    def test_restore_in_batches(self, tmp_path):
+        self.manager.add_rows([self.manager.credit_row('01/01/2024 00:00:00', i + 1) for i in range(5)])
+        with self.make_backups(tmp_path) as backups, patch.dict(os.environ, {'RESTORE_BATCH_ROWS': '2'}):
+            self.manager.clear_table()
+            with patch.object(self.storage, 'append_rows', wraps=self.storage.append_rows) as append_rows:
+                assert self.manager.restore_backup(backups.list('default')[0]) == 5
+
+        assert append_rows.call_count == 3
+        assert [row[5] for row in self.storage.get_rows()] == [1, 2, 3, 4, 5]
+
+
+class TestBackupStore:
+    def test_keeps_most_recent_per_tenant(self, tmp_path):
+        store = BackupStore(str(tmp_path), keep=2)
+        for i in range(4):
+            store.save('familia', [['01/01/2024 00:00:00', '', '', '', '', i, '', '']])
+        store.save('chat_1', [])
+
+        saved = store.list('familia')
+        assert len(saved) == 2
+        assert [store.load(backup['path'])[0][5] for backup in saved] == [3, 2]
+        assert len(store.list('chat_1')) == 1
+
+    def test_amounts_come_back_as_numbers(self, tmp_path):
+        store = BackupStore(str(tmp_path))
+        path = store.save('default', [['01/01/2024 10:00:00', '50,5', 'pix', 'lazer', 'cinema', '', '', '']])
+        assert store.load(path)[0][1] == 50.5
+
+    def test_missing_directory(self, tmp_path):
+        assert BackupStore(str(tmp_path / 'nada')).list('default') == []
+
+
+class TestSheetsClear:
+    def test_single_call_without_reading_the_sheet(self):
+        storage = GoogleSheetsStorage.__new__(GoogleSheetsStorage)
+        storage.worksheet = MagicMock()
+
+        storage.clear()
+
+        storage.worksheet.batch_clear.assert_called_once_with(['A2:I'])
+        storage.worksheet.get_all_values.assert_not_called()
+        storage.worksheet.delete_rows.assert_not_called()
+
+    def test_empty_check_reads_only_the_first_data_row(self):
+        storage = GoogleSheetsStorage.__new__(GoogleSheetsStorage)
+        storage.worksheet = MagicMock()
+        storage.worksheet.get_values.return_value = []
+
+        assert storage.is_empty()
+        storage.worksheet.get_values.return_value = [['01/01/2024 00:00:00', '10']]
+        assert not storage.is_empty()
+
+        storage.worksheet.get_values.assert_called_with('A2:I2')
+        storage.worksheet.col_values.assert_not_called()
+
+
+if __name__ == '__main__':
+    pytest.main([__file__])
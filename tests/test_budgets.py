@@ -0,0 +1,97 @@
+import pytest
+import sys
+import os
+import asyncio
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.budgets import BudgetManager, current_month
+from src.local_store import JsonStore
+from src.rollup import CubeRegistry
+from src.storage import InMemoryStorage
+from src.google_sheets import GoogleSheetsManager
+
+
+class TestJsonStore:
+    def test_persists_between_instances(self, tmp_path):
+        path = str(tmp_path / 'store.json')
+        JsonStore('teste', path=path).set('default', {'alimentacao': 500})
+
+        assert JsonStore('teste', path=path).get('default') == {'alimentacao': 500}
+
+    def test_delete(self, tmp_path):
+        store = JsonStore('teste', path=str(tmp_path / 'store.json'))
+        store.set(1, 'a')
+        store.delete(1)
+
+        assert store.get(1) is None
+
+
+class TestBudgetManager:
+    def setup_method(self):
+        self.storage = InMemoryStorage()
+        self.manager = GoogleSheetsManager(storage=self.storage)
+
+    def make_budgets(self, tmp_path):
+        budgets = BudgetManager(JsonStore('budgets', path=str(tmp_path / 'budgets.json')), CubeRegistry())
+        budgets.set_budget(self.manager.tenant, 'alimentacao', 100.0)
+        asyncio.run(budgets.cubes.loaded(self.manager))
+        return budgets
+
+    def spend(self, budgets, valor):
+        self.manager.add_expense(valor, 'pix', 'alimentacao', 'mercado')
+        return asyncio.run(budgets.check(self.manager, 'alimentacao', valor))
+
+    def test_alerts_when_crossing_thresholds(self, tmp_path):
+        budgets = self.make_budgets(tmp_path)
+
+        assert self.spend(budgets, 40.0) is None
+        assert '60%' in self.spend(budgets, 20.0)
+        assert self.spend(budgets, 10.0) is None
+        assert '80%' in self.spend(budgets, 10.0)
+        assert 'estourado' in self.spend(budgets, 30.0)
+
+    def test_checks_do_not_read_storage_after_load(self, tmp_path):
+        budgets = self.make_budgets(tmp_path)
+        self.spend(budgets, 10.0)
+
+        with patch.object(self.storage, 'get_rows', side_effect=AssertionError('leu a planilha')):
+            assert '55%' in self.spend(budgets, 45.0)
+
+    def test_cold_cube_skips_alert_without_reading(self, tmp_path):
+        budgets = BudgetManager(JsonStore('budgets', path=str(tmp_path / 'budgets.json')), CubeRegistry())
+        budgets.set_budget(self.manager.tenant, 'alimentacao', 100.0)
+        self.manager.add_expense(90.0, 'pix', 'alimentacao', 'mercado')
+
+        async def check():
+            with patch.object(self.storage, 'get_rows', wraps=self.storage.get_rows) as get_rows:
+                alert = await budgets.check(self.manager, 'alimentacao', 90.0)
+                calls = get_rows.call_count
+            # A leitura agendada roda depois, fora da checagem
+            await asyncio.sleep(0.1)
+            return alert, calls
+
+        assert asyncio.run(check()) == (None, 0)
+        assert budgets.cubes.cube_for(self.manager).loaded
+
+    def test_no_budget_no_alert(self, tmp_path):
+        budgets = BudgetManager(JsonStore('budgets', path=str(tmp_path / 'budgets.json')), CubeRegistry())
+
+        assert self.spend(budgets, 1000.0) is None
+
+    def test_usage_and_remove(self, tmp_path):
+        budgets = self.make_budgets(tmp_path)
+        self.spend(budgets, 25.0)
+
+        assert asyncio.run(budgets.usage(self.manager)) == [('alimentacao', 25.0, 100.0)]
+        assert budgets.remove_budget(self.manager.tenant, 'alimentacao')
+        assert not budgets.remove_budget(self.manager.tenant, 'alimentacao')
+        assert asyncio.run(budgets.usage(self.manager)) == []
+
+    def test_current_month_format(self):
+        assert len(current_month()) == 7
+
+
+if __name__ == '__main__':
+    pytest.main([__file__])
@@ -0,0 +1,168 @@
+import pytest
+import sys
+import os
+import tempfile
+import uuid
+from unittest.mock import MagicMock, patch
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.categories import NameResolver, Vocabulary, canonical_key
+from src.google_sheets import GoogleSheetsManager
+from src.local_store import JsonStore
+from src.storage import HEADERS, GoogleSheetsStorage, InMemoryStorage, SQLiteStorage
+
+
+def expense(categoria, pagamento='pix'):
+    return ['05/01/2024 10:00:00', 10.0, pagamento, categoria, 'teste', '', '', '']
+
+
+class TestVocabulary:
+    def setup_method(self):
+        self.vocabulary = Vocabulary({'alimentacao': 'Alimentação', 'uber': 'uber'}, fuzzy=True)
+
+    def test_canonical_key_folds_accents_and_spaces(self):
+        assert canonical_key('Alimentação') == 'alimentacao'
+        assert canonical_key('Cartão  Visa') == 'cartaovisa'
+        assert canonical_key('Renda-Fixa') == 'rendafixa'
+
+    def test_typos_resolve_to_known_name(self):
+        for typo in ('alimentacap', 'alimentacaoo', 'alimentaca', 'almentacao'):
+            assert self.vocabulary.resolve(typo, typo) == ('Alimentação', True)
+        assert self.vocabulary.aliases['alimentacap'] == 'alimentacao'
+        assert self.vocabulary.resolve('alimentacap', 'Alimentacap') == ('Alimentação', False)
+
+    def test_short_names_are_not_fuzzy_matched(self):
+        assert self.vocabulary.resolve('ubre', 'Ubre') == ('Ubre', True)
+        assert self.vocabulary.names['ubre'] == 'Ubre'
+
+    def test_distant_names_stay_separate(self):
+        assert self.vocabulary.resolve('alimento', 'alimento') == ('alimento', True)
+
+    def test_fuzzy_matching_is_opt_in(self):
+        vocabulary = Vocabulary({'carro': 'carro'})
+        assert vocabulary.resolve('barro', 'barro') == ('barro', True)
+        assert vocabulary.aliases == {}
+
+    def test_reads_vocabularies_saved_as_keys(self):
+        assert Vocabulary(['alimentacao']).resolve('alimentacao', 'Alimentação') == ('alimentacao', False)
+
+
+class TestNameResolver:
+    def setup_method(self):
+        self.storage = InMemoryStorage()
+        self.manager = GoogleSheetsManager(storage=self.storage, resolver=NameResolver(JsonStore('categories', path=os.path.join(tempfile.mkdtemp(), 'categories.json'))))
+
+    def test_spellings_share_one_category(self):
+        names = {self.manager.resolve_name('categoria', text) for text in ('Alimentação', 'alimentacao', 'Alimentaçao', 'ALIMENTAÇÃO')}
+        assert names == {'Alimentação'}
+
+    def test_first_spelling_is_kept(self):
+        assert self.manager.resolve_name('pagamento', '  Cartão   Visa ') == 'Cartão Visa'
+        assert self.manager.resolve_name('pagamento', 'cartaovisa') == 'Cartão Visa'
+
+    def test_fields_have_separate_vocabularies(self):
+        self.manager.resolve_name('pagamento', 'Crédito')
+        assert self.manager.resolve_name('categoria', 'creditos') == 'creditos'
+
+    def test_expense_row_uses_canonical_names(self):
+        self.manager.resolve_name('categoria', 'Transporte')
+        row = self.manager.expense_row('05/01/2024 10:00:00', 50, 'cartão visa', 'transporte', 'uber')
+        assert row[2:4] == ['cartão visa', 'Transporte']
+
+    def test_typos_stay_separate_unless_fuzzy_matching_is_enabled(self, tmp_path):
+        self.manager.resolve_name('categoria', 'Transporte')
+        assert self.manager.resolve_name('categoria', 'Transprote') == 'Transprote'
+
+        resolver = NameResolver(JsonStore('categories', path=str(tmp_path / 'categories.json')), fuzzy=True)
+        manager = GoogleSheetsManager(storage=InMemoryStorage(), resolver=resolver)
+        manager.resolve_name('categoria', 'Transporte')
+        assert manager.resolve_name('categoria', 'Transprote') == 'Transporte'
+
+    def test_vocabulary_is_persisted_per_tenant(self, tmp_path):
+        store_path = str(tmp_path / 'categories.json')
+        storage = SQLiteStorage(str(tmp_path / 'bot.db'))
+        manager = GoogleSheetsManager(storage=storage, resolver=NameResolver(JsonStore('categories', path=store_path), fuzzy=True))
+        manager.resolve_name('categoria', 'Alimentação')
+        manager.resolve_name('categoria', 'Alimentacap')
+
+        reloaded = NameResolver(JsonStore('categories', path=store_path), fuzzy=True)
+        assert reloaded.resolve(manager, 'categoria', 'alimentacap') == 'Alimentação'
+        assert JsonStore('categories', path=store_path).get('default')['categoria'] == {
+            'names': {'alimentacao': 'Alimentação'}, 'aliases': {'alimentacap': 'alimentacao'}}
+
+    def test_renormalize_rewrites_old_rows(self):
+        self.storage.append_rows([
+            expense('Alimentação'), expense('alimentacao'), expense('Alimentaçao'),
+            expense('alimentacao', 'PIX'), expense('lazer'),
+        ])
+        version = self.storage.version
+
+        assert self.manager.resolver.renormalize(self.manager) == 3
+        rows = self.storage.get_rows()
+        assert [row[3] for row in rows] == ['Alimentação'] * 4 + ['lazer']
+        assert {row[2] for row in rows} == {'pix'}
+        assert self.storage.version > version
+        assert self.manager.resolver.renormalize(self.manager) == 0
+
+    def test_renormalize_keeps_amounts_numeric(self, tmp_path):
+        storage = SQLiteStorage(str(tmp_path / 'bot.db'))
+        manager = GoogleSheetsManager(storage=storage, resolver=NameResolver(JsonStore('categories', path=str(tmp_path / 'categories.json'))))
+        storage.append_rows([
+            ['05/01/2024 10:00:00', 100.5, 'pix', 'Alimentação ', 'mercado', '', '', ''],
+            ['05/01/2024 11:00:00', '', '', '', '', 1500.0, '', ''],
+        ])
+
+        assert manager.resolver.renormalize(manager) == 1
+        row = storage.get_rows()[0]
+        assert row[1:4] == [100.5, 'pix', 'Alimentação']
+        assert isinstance(row[1], float)
+
+    def test_renormalize_writes_only_name_cells_on_sheets(self, tmp_path):
+        spreadsheet = MagicMock()
+        worksheet = spreadsheet.worksheet.return_value
+        worksheet.row_values.return_value = list(HEADERS)
+        worksheet.get_all_values.return_value = [list(HEADERS), [
+            '05/01/2024 10:00:00', '100,5', 'PIX', 'alimentacao', 'mercado', '', '', '', '2024-01-05T10:00:00-03:00'
+        ]]
+        with patch('src.storage.sheets_client'):
+            storage = GoogleSheetsStorage(f'planilha-{uuid.uuid4()}', 'Gastos', spreadsheet=spreadsheet)
+        manager = GoogleSheetsManager(storage=storage, resolver=NameResolver(JsonStore('categories', path=str(tmp_path / 'categories.json'))))
+
+        manager.resolve_name('pagamento', 'pix')
+        manager.resolve_name('categoria', 'Alimentação')
+
+        assert manager.resolver.renormalize(manager) == 1
+        worksheet.batch_update.assert_called_once_with([
+            {'range': 'C2', 'values': [['pix']]},
+            {'range': 'D2', 'values': [['Alimentação']]},
+        ])
+
+    def test_sheets_full_row_update_writes_numbers(self):
+        storage = GoogleSheetsStorage.__new__(GoogleSheetsStorage)
+        storage.headers = HEADERS
+        storage.worksheet = MagicMock()
+        storage._listeners = []
+        storage.version = 0
+
+        storage.update_rows({0: ['05/01/2024 10:00:00', '100,5', 'pix', 'lazer', 'cinema', '', '', '']})
+
+        values = storage.worksheet.batch_update.call_args[0][0][0]['values'][0]
+        assert values[1] == 100.5
+
+
+class TestUpdateRows:
+    def test_sqlite_update_rows(self, tmp_path):
+        storage = SQLiteStorage(str(tmp_path / 'bot.db'))
+        storage.append_rows([expense('a'), expense('b'), expense('c')])
+
+        assert storage.update_rows({1: expense('lazer'), 2: ['06/01/2024 10:00:00', '', '', '', 'salario', 100.0, '', '']}) == 2
+        rows = storage.get_rows()
+        assert [row[3] for row in rows] == ['a', 'lazer', '']
+        assert rows[2][5] == 100.0
+        tipo = storage._conn.execute('SELECT tipo FROM transacoes ORDER BY id').fetchall()
+        assert [t[0] for t in tipo] == ['despesa', 'despesa', 'credito']
+
+
+if __name__ == '__main__':
+    pytest.main([__file__])
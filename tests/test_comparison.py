@@ -0,0 +1,81 @@
+import pytest
+import sys
+import os
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.comparison import Comparison, parse_month, percent
+from src.rollup import RollupCube
+from src.storage import InMemoryStorage
+
+
+def expense(data, valor, categoria, pagamento='pix'):
+    return [f'{data} 12:00:00', valor, pagamento, categoria, 'compra', '', '', '']
+
+
+class TestComparison:
+    def setup_method(self):
+        self.storage = InMemoryStorage()
+        self.storage.append_rows([
+            expense('10/03/2023', 200.0, 'alimentacao'),
+            expense('10/02/2024', 300.0, 'alimentacao'),
+            expense('12/02/2024', 50.0, 'lazer', 'cartaovisa'),
+            expense('05/03/2024', 500.0, 'alimentacao'),
+            expense('06/03/2024', 120.0, 'transporte', 'cartaovisa'),
+            ['07/03/2024 09:00:00', '', '', '', '', 3000.0, '', ''],
+        ])
+        self.cube = RollupCube(self.storage)
+        self.cube.load()
+
+    def test_totals_by_category_and_payment(self):
+        comparison = Comparison.build(self.cube, (2024, 3))
+
+        assert comparison.rows('categoria') == [
+            ('alimentacao', 500.0, 300.0, 200.0),
+            ('transporte', 120.0, 0.0, 0.0),
+            ('lazer', 0.0, 50.0, 0.0),
+        ]
+        assert comparison.rows('pagamento') == [('pix', 500.0, 300.0, 200.0), ('cartaovisa', 120.0, 50.0, 0.0)]
+        assert comparison.value(comparison.month, 'tipo', 'credito') == 3000.0
+
+    def test_biggest_deltas_first(self):
+        highlights = Comparison.build(self.cube, (2024, 3)).highlights()
+
+        assert [(dimension, name, delta) for dimension, name, delta, _, _ in highlights] == [
+            ('categoria', 'alimentacao', 200.0),
+            ('pagamento', 'pix', 200.0),
+            ('categoria', 'transporte', 120.0),
+        ]
+
+    def test_only_three_months_are_read(self):
+        with patch.object(self.cube, 'month_summary', wraps=self.cube.month_summary) as month_summary:
+            Comparison.build(self.cube, (2024, 1))
+        month_summary.assert_called_once_with(['01/2024', '12/2023', '01/2023'])
+
+    def test_follows_deleted_rows(self):
+        self.storage.delete_row(4, previous=self.storage._rows[4])
+
+        comparison = Comparison.build(self.cube, (2024, 3))
+
+        assert [row[0] for row in comparison.rows('categoria')] == ['alimentacao', 'lazer']
+        assert comparison.rows('pagamento') == [('pix', 500.0, 300.0, 200.0), ('cartaovisa', 0.0, 50.0, 0.0)]
+
+    def test_render(self):
+        text = Comparison.build(self.cube, (2024, 3)).render()
+
+        assert 'Comparativo de 03/2024' in text
+        assert 'Gastos: R$ 620.00 (+77% no mês, +210% no ano)' in text
+        assert 'alimentacao (categoria): R$ 300.00 → R$ 500.00 (+R$ 200.00, +67%)' in text
+        assert Comparison.build(self.cube, (2022, 5)).render() is None
+
+    def test_parse_month_and_percent(self):
+        assert parse_month('9/2024') == (2024, 9)
+        assert parse_month('13/2024') is None
+        assert parse_month('setembro') is None
+        assert percent(50.0, 0.0) == 'novo'
+        assert percent(50.0, 100.0) == '-50%'
+
+
+if __name__ == '__main__':
+    pytest.main([__file__])
@@ -0,0 +1,72 @@
+import pytest
+import sys
+import os
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.downsampling import choose_frequency, lttb, minmax_buckets, downsample, resample_sum, resample_last
+from src.statistics import StatisticsGenerator
+
+
+class TestDownsampling:
+    def test_choose_frequency(self):
+        assert choose_frequency(datetime(2024, 1, 1), datetime(2024, 3, 1)) == 'D'
+        assert choose_frequency(datetime(2022, 1, 1), datetime(2024, 1, 1)) == 'W'
+        assert choose_frequency(datetime(2015, 1, 1), datetime(2024, 1, 1)) == 'M'
+
+    def test_lttb_keeps_endpoints_and_peak(self):
+        x = np.arange(1000)
+        y = np.zeros(1000)
+        y[537] = 100
+
+        indices = lttb(x, y, 50)
+
+        assert len(indices) == 50
+        assert indices[0] == 0 and indices[-1] == 999
+        assert 537 in indices
+        assert list(indices) == sorted(indices)
+
+    def test_minmax_keeps_extremes(self):
+        y = np.sin(np.linspace(0, 20, 5000))
+        y[1234] = -5
+
+        indices = minmax_buckets(y, 100)
+
+        assert len(indices) <= 100
+        assert 1234 in indices
+        assert y[indices].max() == pytest.approx(y.max())
+
+    def test_short_series_untouched(self):
+        series = pd.Series([1.0, 2.0, 3.0], index=pd.date_range('2024-01-01', periods=3))
+
+        assert downsample(series, threshold=10) is series
+
+    def test_resample(self):
+        index = pd.to_datetime(['2024-01-01 10:00', '2024-01-01 18:00', '2024-01-03 09:00'])
+        series = pd.Series([10.0, 5.0, 7.0], index=index)
+
+        assert list(resample_sum(series, 'D').values) == [15.0, 7.0]
+        assert list(resample_last(series.cumsum(), 'D').values) == [15.0, 22.0]
+
+
+class TestLongHistoryCharts:
+    def test_long_history_renders(self):
+        dates = pd.date_range('2016-01-01', '2024-01-01', freq='6h')
+        data = [{
+            'Data e Hora': d.strftime('%d/%m/%Y %H:%M:%S'),
+            'Valor (R$)': '10.00', 'Tipo de pagamento': 'pix', 'Categoria': 'alimentacao',
+            'Descrição': 'mercado', 'Créditos': '', 'Investimento': '', 'Categoria Investimento': ''
+        } for d in dates]
+
+        stats_gen = StatisticsGenerator(data)
+
+        assert stats_gen.gastos_por_dia() is not None
+        assert stats_gen.evolucao_patrimonio() is not None
+
+
+if __name__ == '__main__':
+    pytest.main([__file__])
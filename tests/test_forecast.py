@@ -0,0 +1,92 @@
+import pytest
+import sys
+import os
+from datetime import date
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.forecast import forecast_months
+from src.rollup import RollupCube
+from src.storage import InMemoryStorage
+from src.google_sheets import GoogleSheetsManager
+from src.text_report import TextReport
+
+
+def expense(data, valor, categoria='alimentacao'):
+    return [f'{data} 12:00:00', valor, 'pix', categoria, 'compra', '', '', '']
+
+
+def credit(data, valor):
+    return [f'{data} 09:00:00', '', '', '', '', valor, '', '']
+
+
+class TestForecast:
+    def setup_method(self):
+        self.storage = InMemoryStorage()
+        self.storage.append_rows([
+            expense('05/01/2024', 100.0), expense('20/01/2024', 200.0), credit('05/01/2024', 3000.0),
+            expense('10/02/2024', 100.0), expense('25/02/2024', 100.0), credit('05/02/2024', 3000.0),
+            expense('03/03/2024', 150.0), credit('05/03/2024', 3000.0),
+        ])
+        self.cube = RollupCube(self.storage)
+        self.cube.load()
+
+    def test_month_to_date_plus_what_usually_comes_after(self):
+        forecast = self.cube.forecast(date(2024, 3, 15))
+
+        # Depois do dia 15: R$ 200 em janeiro e R$ 100 em fevereiro
+        assert forecast.total('despesa') == (150.0, pytest.approx(300.0))
+        assert forecast.total('credito') == (3000.0, 3000.0)
+        assert forecast.saldo == pytest.approx(2700.0)
+        assert forecast.categories() == [('alimentacao', 150.0, pytest.approx(300.0))]
+
+    def test_follows_new_rows_without_reading_the_storage(self):
+        with patch.object(self.storage, 'get_rows', wraps=self.storage.get_rows) as get_rows:
+            self.storage.append_row(expense('14/03/2024', 40.0, 'lazer'))
+            self.storage.delete_row(7, previous=self.storage._rows[7])
+            forecast = self.cube.forecast(date(2024, 3, 15))
+
+        get_rows.assert_not_called()
+        assert forecast.total('credito') == (0.0, 0.0)
+        assert dict((c, p) for c, _, p in forecast.categories()) == {'alimentacao': 300.0, 'lazer': 40.0}
+
+    def test_pace_when_there_are_no_previous_months(self):
+        cube = RollupCube.from_records([])
+        cube.add_rows([expense('05/04/2024', 60.0), expense('08/04/2024', 40.0)])
+
+        forecast = cube.forecast(date(2024, 4, 10))
+
+        assert forecast.total('despesa') == (100.0, pytest.approx(300.0))
+
+    def test_only_recent_months_are_used(self):
+        assert forecast_months(date(2024, 2, 10), 3) == [(2024, 2), (2024, 1), (2023, 12), (2023, 11)]
+        forecast = self.cube.forecast(date(2025, 3, 15))
+        assert forecast.empty and forecast.render() is None
+
+    def test_survives_dump_and_restore(self):
+        restored = RollupCube(InMemoryStorage())
+        restored.restore(self.cube.dump())
+
+        assert restored.forecast(date(2024, 3, 15)).projections == self.cube.forecast(date(2024, 3, 15)).projections
+
+    def test_render(self):
+        text = self.cube.forecast(date(2024, 3, 15)).render()
+
+        assert 'Previsão para 03/2024 (dia 15 de 31)' in text
+        assert 'R$ 150.00 até hoje → R$ 300.00' in text
+        assert 'Saldo do mês previsto: R$ 2700.00' in text
+
+
+class TestSummaryLine:
+    def test_text_summary_has_forecast(self):
+        storage = InMemoryStorage()
+        GoogleSheetsManager(storage=storage).add_expense(50.0, 'pix', 'alimentacao', 'mercado')
+        cube = RollupCube(storage)
+        cube.load()
+
+        assert '🔮 **Previsão para' in TextReport(snapshot=cube.snapshot()).summary()
+
+
+if __name__ == '__main__':
+    pytest.main([__file__])
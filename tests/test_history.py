@@ -0,0 +1,132 @@
+import pytest
+import sys
+import os
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.backups import BackupStore
+from src.categories import NameResolver
+from src.google_sheets import GoogleSheetsManager
+from src.history import RecentTransactions, describe_row
+from src.local_store import JsonStore
+from src.rollup import RollupCube
+from src.schema import iso_timestamp
+from src.search import SearchIndex
+from src.storage import InMemoryStorage, SQLiteStorage
+
+
+class TestUndoAndEdit:
+    def setup_method(self):
+        self.storage = InMemoryStorage()
+        self.history = RecentTransactions()
+        self.patcher = patch('src.google_sheets.recent_transactions', self.history)
+        self.patcher.start()
+        self.alice = GoogleSheetsManager(storage=self.storage, chat_id=1)
+        self.bob = GoogleSheetsManager(storage=self.storage, chat_id=2)
+
+    def teardown_method(self):
+        self.patcher.stop()
+
+    def test_undo_removes_last_row_of_the_chat(self):
+        self.alice.add_expense(50.0, 'pix', 'transporte', 'uber')
+        self.alice.add_credit(1500.0)
+        self.bob.add_expense(20.0, 'pix', 'lazer', 'cinema')
+
+        assert self.alice.undo_last()[5] == 1500.0
+        assert self.alice.undo_last()[4] == 'uber'
+        assert self.alice.undo_last() is None
+        assert [row[4] for row in self.storage.get_rows()] == ['cinema']
+
+    def test_positions_shift_after_a_removal(self):
+        self.alice.add_expense(50.0, 'pix', 'transporte', 'uber')
+        self.bob.add_expense(20.0, 'pix', 'lazer', 'cinema')
+
+        self.alice.undo_last()
+
+        assert self.history.last(self.bob)[0] == 2
+        assert self.bob.undo_last()[4] == 'cinema'
+        assert self.storage.count() == 0
+
+    def test_edit_field_and_whole_transaction(self):
+        self.alice.add_expense(50.0, 'pix', 'transporte', 'uber')
+
+        old, new = self.alice.edit_last('valor', 45.9)
+        assert old[1] == 50.0 and new[1] == 45.9
+        self.alice.edit_last('categoria', 'Lazer')
+        row = self.storage.get_rows()[0]
+        assert row[1:5] == [45.9, 'pix', 'Lazer', 'uber']
+
+        self.alice.edit_last('transacao', {'tipo': 'investimento', 'valor': 300.0, 'categoria_investimento': 'Renda Fixa'})
+        assert self.storage.get_rows()[0] == [row[0], '', '', '', '', '', 300.0, 'Renda Fixa', row[8]]
+
+    def test_field_must_exist_for_the_kind(self):
+        self.alice.add_credit(1500.0)
+        with pytest.raises(ValueError):
+            self.alice.edit_last('categoria', 'lazer')
+
+    def test_row_changed_outside_the_bot_is_not_touched(self):
+        self.alice.add_expense(50.0, 'pix', 'transporte', 'uber')
+        self.storage._rows[0][4] = 'editado na planilha'
+
+        assert self.alice.undo_last() is None
+        assert self.storage.count() == 1
+
+    def test_clear_forgets_everything(self, tmp_path):
+        self.alice.add_expense(50.0, 'pix', 'transporte', 'uber')
+        with patch('src.google_sheets.backups', BackupStore(str(tmp_path))):
+            self.alice.clear_table()
+        assert self.history.last(self.alice) is None
+
+    def test_describe_row(self):
+        self.alice.add_expense(50.0, 'Cartão Visa', 'Alimentação', 'mercado')
+        assert describe_row(self.storage.get_rows()[0]) == 'R$ 50.00 - Cartão Visa - Alimentação (mercado)'
+
+
+class TestViewsFollowEdits:
+    def setup_method(self):
+        self.storage = InMemoryStorage()
+        self.manager = GoogleSheetsManager(storage=self.storage, chat_id=1)
+        self.manager.add_expense(50.0, 'pix', 'transporte', 'uber centro')
+        self.manager.add_expense(30.0, 'pix', 'alimentacao', 'padaria')
+        self.cube = RollupCube(self.storage)
+        self.index = SearchIndex(self.storage)
+        self.cube.load()
+        self.index.load()
+
+    def test_edit_and_undo_without_reloading(self):
+        with patch.object(self.storage, 'get_rows', wraps=self.storage.get_rows) as get_rows:
+            self.manager.edit_last('descricao', 'lanche')
+            self.storage.delete_row(0, previous=self.storage._rows[0])
+
+        # Só a linha conferida pelo /editar foi lida
+        assert get_rows.call_count == 1
+        assert self.cube.loaded and self.index.loaded
+        assert self.cube.rows == 1 and self.index.rows == 1
+        assert {cell[2]: cell[4] for cell in self.cube.snapshot().cells} == {'alimentacao': 30.0}
+        assert len(self.index.search('uber')) == 0
+        assert len(self.index.search('padaria')) == 0
+        assert [doc[0] for doc in self.index.search('lanche').docs] == [0]
+
+
+class TestSQLiteEdits:
+    def test_update_and_delete_by_position(self, tmp_path):
+        storage = SQLiteStorage(str(tmp_path / 'bot.db'))
+        history = RecentTransactions()
+        with patch('src.google_sheets.recent_transactions', history):
+            manager = GoogleSheetsManager(storage=storage, chat_id=1,
+                                          resolver=NameResolver(JsonStore('categories', path=str(tmp_path / 'categories.json'))))
+            manager.add_expense(10.0, 'pix', 'lazer', 'cinema')
+            manager.add_expense(20.0, 'pix', 'lazer', 'teatro')
+
+            manager.edit_last('valor', 25.0)
+            assert manager.undo_last()[1] == 25.0
+            assert manager.edit_last('descricao', 'filme')[1][4] == 'filme'
+
+        rows = storage.get_rows()
+        assert rows == [[rows[0][0], 10.0, 'pix', 'lazer', 'filme', '', '', '', iso_timestamp(rows[0][0])]]
+        assert 'sqlite:' in next(iter(history.dump().values()))['identity']
+
+
+if __name__ == '__main__':
+    pytest.main([__file__])
@@ -0,0 +1,82 @@
+import pytest
+import sys
+import os
+import json
+import logging
+import queue
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.logging_config import (
+    JsonFormatter, BackgroundQueueHandler, truncate, summarize_update, should_sample, parse_levels
+)
+
+
+class TestJsonFormatter:
+    def test_structured_line_with_extras(self):
+        record = logging.makeLogRecord({
+            'name': 'src.tracing', 'levelname': 'INFO', 'msg': 'trace',
+            'trace': {'handler': 'statistics', 'duration_ms': 12.5}
+        })
+
+        entry = json.loads(JsonFormatter().format(record))
+
+        assert entry['logger'] == 'src.tracing'
+        assert entry['message'] == 'trace'
+        assert entry['trace']['handler'] == 'statistics'
+
+    def test_long_messages_truncated(self):
+        text = truncate('x' * 5000, limit=100)
+
+        assert len(text) < 200
+        assert '4900 caracteres omitidos' in text
+
+
+class TestBackgroundQueueHandler:
+    def test_enqueue_without_formatting(self):
+        log_queue = queue.SimpleQueue()
+        handler = BackgroundQueueHandler(log_queue)
+        handler.setFormatter(None)
+        logger = logging.getLogger('test_background_queue')
+        logger.propagate = False
+        logger.addHandler(handler)
+
+        try:
+            raise ValueError('falhou')
+        except ValueError:
+            logger.exception('Erro %s', 'interno')
+
+        record = log_queue.get_nowait()
+        assert record.msg == 'Erro interno'
+        assert record.args is None
+        assert record.exc_info is None
+        assert 'ValueError' in record.exc_text
+
+
+class TestPayloadHelpers:
+    def test_summarize_update_redacts_text(self):
+        update = {
+            'update_id': 7,
+            'message': {'chat': {'id': 55}, 'text': '100.50 - Pix - Alimentação (mercado)'}
+        }
+
+        summary = summarize_update(update)
+
+        assert summary == {'update_id': 7, 'chat_id': 55, 'text_length': 36}
+
+    def test_summarize_update_keeps_command(self):
+        summary = summarize_update({'update_id': 1, 'message': {'chat': {'id': 1}, 'text': '/statistics texto'}})
+
+        assert summary['command'] == '/statistics'
+
+    def test_sampling_disabled_by_default(self):
+        assert not should_sample(0)
+        assert should_sample(1)
+
+    def test_parse_levels(self):
+        levels = parse_levels('src.bot=DEBUG, httpx=warning,invalido')
+
+        assert levels == {'src.bot': logging.DEBUG, 'httpx': logging.WARNING}
+
+if __name__ == '__main__':
+    pytest.main([__file__])
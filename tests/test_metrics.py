@@ -0,0 +1,86 @@
+import pytest
+import sys
+import os
+import asyncio
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.metrics import Registry, instrument_handler, track_sheets_call, HANDLER_LATENCY, HANDLER_ERRORS, SHEETS_ERRORS
+
+
+class TestRegistry:
+    def setup_method(self):
+        self.registry = Registry()
+
+    def test_counter_rendering(self):
+        counter = self.registry.counter('calls_total', 'Chamadas', ['operation'])
+        counter.inc(operation='append_row')
+        counter.inc(2, operation='append_row')
+
+        output = self.registry.render()
+
+        assert '# TYPE calls_total counter' in output
+        assert 'calls_total{operation="append_row"} 3' in output
+
+    def test_histogram_buckets_are_cumulative(self):
+        histogram = self.registry.histogram('latency_seconds', 'Latência', ['handler'], buckets=(0.1, 1))
+        histogram.observe(0.05, handler='statistics')
+        histogram.observe(0.5, handler='statistics')
+        histogram.observe(5, handler='statistics')
+
+        output = self.registry.render()
+
+        assert 'latency_seconds_bucket{handler="statistics",le="0.1"} 1' in output
+        assert 'latency_seconds_bucket{handler="statistics",le="1"} 2' in output
+        assert 'latency_seconds_bucket{handler="statistics",le="+Inf"} 3' in output
+        assert 'latency_seconds_count{handler="statistics"} 3' in output
+        assert 'latency_seconds_sum{handler="statistics"} 5.55' in output
+
+    def test_gauge_callback(self):
+        self.registry.gauge('queue_depth', 'Fila', callback=lambda: 7)
+
+        assert 'queue_depth 7' in self.registry.render()
+
+    def test_wrong_labels(self):
+        counter = self.registry.counter('calls_total', 'Chamadas', ['operation'])
+
+        with pytest.raises(ValueError):
+            counter.inc(handler='start')
+
+    def test_label_escaping(self):
+        counter = self.registry.counter('calls_total', 'Chamadas', ['operation'])
+        counter.inc(operation='a"b')
+
+        assert 'calls_total{operation="a\\"b"} 1' in self.registry.render()
+
+
+class TestInstrumentation:
+    def test_instrument_handler_records_latency(self):
+        @instrument_handler('test_handler_ok')
+        async def handler():
+            return 'ok'
+
+        assert asyncio.run(handler()) == 'ok'
+        assert HANDLER_LATENCY.count(handler='test_handler_ok') == 1
+
+    def test_instrument_handler_counts_errors(self):
+        @instrument_handler('test_handler_error')
+        async def handler():
+            raise RuntimeError('falhou')
+
+        with pytest.raises(RuntimeError):
+            asyncio.run(handler())
+
+        assert HANDLER_ERRORS.value(handler='test_handler_error') == 1
+
+    def test_track_sheets_call_counts_errors(self):
+        def failing():
+            raise ConnectionError()
+
+        with pytest.raises(ConnectionError):
+            track_sheets_call('test_operation', failing)
+
+        assert SHEETS_ERRORS.value(operation='test_operation') == 1
+
+if __name__ == '__main__':
+    pytest.main([__file__])
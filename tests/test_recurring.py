@@ -0,0 +1,101 @@
+import pytest
+import sys
+import os
+from datetime import date
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.recurring import RecurringManager, next_occurrence, following_occurrence, occurrence, MAX_CATCH_UP
+from src.local_store import JsonStore
+from src.storage import InMemoryStorage
+from src.google_sheets import GoogleSheetsManager
+
+SALARIO = {'tipo': 'credito', 'valor': 3000.0}
+STREAMING = {
+    'tipo': 'despesa', 'valor': 39.9, 'tipo_pagamento': 'Cartão Visa',
+    'categoria': 'Assinaturas', 'descricao': 'streaming'
+}
+
+
+class TestOccurrences:
+    def test_day_clipped_to_month_length(self):
+        assert occurrence(2024, 2, 31) == date(2024, 2, 29)
+        assert occurrence(2023, 2, 31) == date(2023, 2, 28)
+
+    def test_next_occurrence(self):
+        assert next_occurrence(10, date(2024, 1, 5)) == date(2024, 1, 10)
+        assert next_occurrence(10, date(2024, 1, 10)) == date(2024, 1, 10)
+        assert next_occurrence(10, date(2024, 1, 11)) == date(2024, 2, 10)
+        assert following_occurrence(31, date(2024, 12, 31)) == date(2025, 1, 31)
+
+
+class TestRecurringManager:
+    def setup_method(self):
+        self.storage = InMemoryStorage()
+        self.manager = GoogleSheetsManager(storage=self.storage)
+
+    def make_recurring(self, tmp_path):
+        return RecurringManager(JsonStore('recurring', path=str(tmp_path / 'recurring.json')))
+
+    def test_catch_up_is_batched_and_idempotent(self, tmp_path):
+        recurring = self.make_recurring(tmp_path)
+        recurring.add_rule('default', 5, SALARIO, start=date(2024, 1, 1))
+        recurring.add_rule('default', 10, STREAMING, start=date(2024, 1, 1))
+
+        with patch.object(self.storage, 'append_rows', wraps=self.storage.append_rows) as append_rows:
+            assert recurring.materialize('default', date(2024, 3, 7), self.manager) == 5
+            assert recurring.materialize('default', date(2024, 3, 7), self.manager) == 0
+
+        assert append_rows.call_count == 1
+        dates = sorted(row[0] for row in self.storage.get_rows())
+        assert dates[0] == '05/01/2024 00:00:00'
+        assert '10/03/2024 00:00:00' not in dates
+        assert [r['proxima'] for r in recurring.rules('default')] == ['2024-04-05', '2024-03-10']
+
+    def test_rows_use_sheet_format(self, tmp_path):
+        recurring = self.make_recurring(tmp_path)
+        recurring.add_rule('default', 10, STREAMING, start=date(2024, 1, 10))
+
+        recurring.materialize('default', date(2024, 1, 10), self.manager)
+
+        assert self.storage.get_rows() == [['10/01/2024 00:00:00', 39.9, 'Cartão Visa', 'Assinaturas', 'streaming', '', '', '', '2024-01-10T00:00:00-03:00']]
+
+    def test_failed_write_does_not_advance(self, tmp_path):
+        recurring = self.make_recurring(tmp_path)
+        recurring.add_rule('default', 5, SALARIO, start=date(2024, 1, 1))
+
+        with patch.object(self.storage, 'append_rows', side_effect=Exception('API fora do ar')):
+            assert recurring.materialize('default', date(2024, 1, 5), self.manager) == 0
+
+        assert recurring.rules('default')[0]['proxima'] == '2024-01-05'
+        assert recurring.materialize('default', date(2024, 1, 5), self.manager) == 1
+
+    def test_long_downtime_is_capped(self, tmp_path):
+        recurring = self.make_recurring(tmp_path)
+        recurring.add_rule('default', 1, SALARIO, start=date(2000, 1, 1))
+
+        assert recurring.materialize('default', date(2024, 6, 15), self.manager) == MAX_CATCH_UP
+        assert recurring.rules('default')[0]['proxima'] == '2024-07-01'
+
+    def test_exactly_max_catch_up_due_is_not_repeated(self, tmp_path):
+        recurring = self.make_recurring(tmp_path)
+        recurring.add_rule('default', 5, SALARIO, start=date(2022, 1, 1))
+        until = date(2023, 12, 5)
+
+        assert recurring.materialize('default', until, self.manager) == MAX_CATCH_UP
+        assert recurring.rules('default')[0]['proxima'] == '2024-01-05'
+        assert recurring.materialize('default', until, self.manager) == 0
+        assert self.storage.count() == MAX_CATCH_UP
+
+    def test_remove_rule(self, tmp_path):
+        recurring = self.make_recurring(tmp_path)
+        rule = recurring.add_rule('default', 5, SALARIO)
+
+        assert recurring.remove_rule('default', rule['id'])
+        assert not recurring.remove_rule('default', rule['id'])
+        assert recurring.rules('default') == []
+
+
+if __name__ == '__main__':
+    pytest.main([__file__])
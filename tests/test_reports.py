@@ -0,0 +1,173 @@
+import pytest
+import sys
+import os
+import asyncio
+from unittest.mock import Mock, patch
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.reports import SingleFlight, Cooldown, ReportService, Report, build_report
+from src.storage import InMemoryStorage
+from src.google_sheets import GoogleSheetsManager
+
+
+class TestSingleFlight:
+    def test_concurrent_calls_share_one_execution(self):
+        flights = SingleFlight()
+        calls = []
+
+        async def compute(value):
+            calls.append(value)
+            await asyncio.sleep(0.05)
+            return value * 2
+
+        async def scenario():
+            return await asyncio.gather(*[flights.do('chave', compute, 21) for _ in range(5)])
+
+        assert asyncio.run(scenario()) == [42] * 5
+        assert calls == [21]
+        assert not flights.in_flight('chave')
+
+    def test_different_keys_run_separately(self):
+        flights = SingleFlight()
+        calls = []
+
+        async def compute(value):
+            calls.append(value)
+            await asyncio.sleep(0.01)
+            return value
+
+        async def scenario():
+            return await asyncio.gather(flights.do('a', compute, 1), flights.do('b', compute, 2))
+
+        assert asyncio.run(scenario()) == [1, 2]
+        assert sorted(calls) == [1, 2]
+
+    def test_error_delivered_to_all_waiters(self):
+        flights = SingleFlight()
+
+        async def compute():
+            await asyncio.sleep(0.01)
+            raise ValueError('falhou')
+
+        async def scenario():
+            return await asyncio.gather(flights.do('a', compute), flights.do('a', compute),
+                                        return_exceptions=True)
+
+        results = asyncio.run(scenario())
+        assert all(isinstance(r, ValueError) for r in results)
+
+
+class TestCooldown:
+    def test_repeated_hits_within_window(self):
+        cooldown = Cooldown(30)
+
+        assert cooldown.hit(1) == 0
+        assert cooldown.hit(1) > 0
+        assert cooldown.hit(2) == 0
+
+    def test_reset_allows_new_request(self):
+        cooldown = Cooldown(30)
+        cooldown.hit(1)
+        cooldown.reset(1)
+
+        assert cooldown.hit(1) == 0
+
+    def test_zero_disables_cooldown(self):
+        cooldown = Cooldown(0)
+        cooldown.hit(1)
+
+        assert cooldown.hit(1) == 0
+
+
+class TestReportService:
+    def setup_method(self):
+        self.manager = GoogleSheetsManager(storage=InMemoryStorage())
+
+    def test_empty_storage_returns_none(self):
+        assert build_report(self.manager) is None
+
+    def test_report_charts_can_be_sent_more_than_once(self):
+        report = Report('resumo', {'gastos_por_dia': b'png'}, 1)
+
+        first = dict(report.chart_files())
+        second = dict(report.chart_files())
+
+        assert first['gastos_por_dia'].read() == b'png'
+        assert second['gastos_por_dia'].read() == b'png'
+
+    def test_dump_does_not_encode_the_charts_again(self):
+        report = Report('resumo', {'gastos_por_dia': b'png'}, 1)
+
+        with patch('src.reports.base64.b64encode') as b64encode:
+            state = report.dump()
+            restored = Report.restore(state)
+            restored.dump()
+
+        b64encode.assert_not_called()
+        assert restored.charts == {'gastos_por_dia': b'png'}
+
+    def test_concurrent_requests_build_one_report(self):
+        self.manager.add_expense(50.0, 'pix', 'alimentacao', 'mercado')
+        service = ReportService(cooldown=0)
+
+        async def scenario():
+            return await asyncio.gather(*[service.get(self.manager) for _ in range(3)])
+
+        with patch('src.reports.build_report', wraps=build_report) as builder:
+            reports = asyncio.run(scenario())
+
+        assert builder.call_count == 1
+        assert reports[0] is reports[1] is reports[2]
+        assert reports[0].rows == 1
+        assert 'gastos_por_categoria' in reports[0].charts
+
+
+class TestReportCache:
+    def setup_method(self):
+        self.manager = GoogleSheetsManager(storage=InMemoryStorage())
+        self.manager.add_expense(50.0, 'pix', 'alimentacao', 'mercado')
+        self.service = ReportService(cooldown=0, quiet_seconds=0)
+
+    def test_cached_until_data_changes(self):
+        with patch('src.reports.build_report', wraps=build_report) as builder:
+            first = asyncio.run(self.service.get(self.manager))
+            second = asyncio.run(self.service.get(self.manager))
+            self.manager.add_credit(1500.0)
+            third = asyncio.run(self.service.get(self.manager))
+
+        assert first is second
+        assert third is not first
+        assert third.rows == 2
+        assert builder.call_count == 2
+
+    def test_refresh_skips_unchanged_tenants(self):
+        asyncio.run(self.service.get(self.manager))
+
+        with patch('src.reports.build_report', wraps=build_report) as builder:
+            assert asyncio.run(self.service.refresh_stale()) == 0
+            self.manager.add_credit(1500.0)
+            assert asyncio.run(self.service.refresh_stale()) == 1
+
+        assert builder.call_count == 1
+        assert self.service.cached(self.manager).rows == 2
+
+    def test_refresh_waits_for_quiet_period(self):
+        service = ReportService(cooldown=0, quiet_seconds=60)
+        asyncio.run(service.get(self.manager))
+        self.manager.add_credit(1500.0)
+
+        assert not service.needs_refresh(self.manager)
+        assert asyncio.run(service.refresh_stale()) == 0
+
+    def test_schedule_without_job_queue(self):
+        from src.reports import schedule_report_refresh
+
+        application = Mock()
+        application.job_queue = None
+
+        assert schedule_report_refresh(application) is None
+
+
+if __name__ == '__main__':
+    pytest.main([__file__])
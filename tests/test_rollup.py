@@ -0,0 +1,124 @@
+import pytest
+import sys
+import os
+import asyncio
+import pandas as pd
+from datetime import date
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.rollup import RollupCube, CubeRegistry
+from src.backups import BackupStore
+from src.budgets import current_month
+from src.storage import InMemoryStorage
+from src.google_sheets import GoogleSheetsManager
+from src.statistics import StatisticsGenerator
+from src.text_report import TextReport
+
+
+class TestRollupCube:
+    def setup_method(self):
+        self.storage = InMemoryStorage()
+        self.manager = GoogleSheetsManager(storage=self.storage)
+
+    def test_load_then_incremental_updates(self):
+        self.manager.add_expense(100.0, 'pix', 'alimentacao', 'mercado')
+        cube = RollupCube(self.storage)
+        cube.load()
+        self.manager.add_expense(50.0, 'pix', 'alimentacao', 'padaria')
+        self.manager.add_credit(1500.0)
+
+        assert cube.month_total('despesa', 'alimentacao', current_month()) == 150.0
+        assert cube.month_total('credito', '', current_month()) == 1500.0
+        assert cube.rows == 3
+        assert cube.version == self.storage.version
+
+    def test_cells_by_day_kind_category_and_payment(self):
+        self.storage.append_row(['15/01/2000 10:30:00', 80.0, 'pix', 'alimentacao', 'mercado', '', '', ''])
+        self.storage.append_row(['15/01/2000 18:00:00', '20,00', 'pix', 'alimentacao', 'padaria', '', '', ''])
+        self.storage.append_row(['16/01/2000 09:00:00', '', '', '', '', '', 300, 'rendafixa'])
+        cube = RollupCube(self.storage)
+        cube.load()
+
+        cells = sorted(cube.snapshot().cells)
+
+        assert cells == [
+            (date(2000, 1, 15), 'despesa', 'alimentacao', 'pix', 100.0, 2),
+            (date(2000, 1, 16), 'investimento', 'rendafixa', '', 300.0, 1),
+        ]
+        assert cube.month_total('despesa', 'alimentacao', current_month()) == 0.0
+        assert cube.month_total('despesa', 'alimentacao', '01/2000') == 100.0
+
+    def test_day_comes_from_iso_column(self):
+        self.storage.append_row(['31/01/2000 23:30:00', 80.0, 'pix', 'lazer', 'show', '', '', '', '2000-02-01T00:30:00-02:00'])
+        self.storage.append_row(['15/01/2000 10:30:00', 20.0, 'pix', 'lazer', 'cinema', '', '', '', ''])
+        cube = RollupCube(self.storage)
+        cube.load()
+
+        assert sorted(cell[0] for cell in cube.snapshot().cells) == [date(2000, 1, 15), date(2000, 2, 1)]
+        assert cube.month_total('despesa', 'lazer', '02/2000') == 80.0
+
+    def test_clear_resets_cube(self, tmp_path):
+        cube = RollupCube(self.storage)
+        cube.load()
+        self.manager.add_expense(100.0, 'pix', 'alimentacao', 'mercado')
+        with patch('src.google_sheets.backups', BackupStore(str(tmp_path))):
+            self.manager.clear_table()
+
+        assert cube.month_total('despesa', 'alimentacao', current_month()) == 0.0
+        assert cube.snapshot().empty
+
+    def test_registry_loads_once(self):
+        registry = CubeRegistry()
+        self.manager.add_expense(10.0, 'pix', 'alimentacao', 'mercado')
+        asyncio.run(registry.loaded(self.manager))
+        self.manager.add_expense(5.0, 'pix', 'alimentacao', 'mercado')
+
+        with patch.object(self.storage, 'get_rows', side_effect=AssertionError('leu a planilha')):
+            cube = asyncio.run(registry.loaded(self.manager))
+
+        assert cube.month_total('despesa', 'alimentacao', current_month()) == 15.0
+
+
+class TestReportsFromCube:
+    def setup_method(self):
+        self.records = [
+            {'Data e Hora': '15/01/2024 10:30:00', 'Valor (R$)': '50.00', 'Tipo de pagamento': 'pix',
+             'Categoria': 'alimentacao', 'Descrição': 'mercado', 'Créditos': '', 'Investimento': '',
+             'Categoria Investimento': ''},
+            {'Data e Hora': '15/01/2024 12:00:00', 'Valor (R$)': '30.00', 'Tipo de pagamento': 'credito',
+             'Categoria': 'transporte', 'Descrição': 'uber', 'Créditos': '', 'Investimento': '',
+             'Categoria Investimento': ''},
+            {'Data e Hora': '20/02/2024 11:00:00', 'Valor (R$)': '', 'Tipo de pagamento': '',
+             'Categoria': '', 'Descrição': '', 'Créditos': '1500,00', 'Investimento': '',
+             'Categoria Investimento': ''},
+        ]
+
+    def test_same_summary_from_records_and_snapshot(self):
+        snapshot = RollupCube.from_records(self.records).snapshot()
+
+        assert (StatisticsGenerator(self.records).get_summary_text()
+                == StatisticsGenerator.from_cube(snapshot).get_summary_text())
+        assert TextReport(self.records).render() == TextReport(snapshot=snapshot).render()
+
+    def test_most_frequent_category_tie_keeps_pandas_mode(self):
+        records = [dict(self.records[0], Categoria=categoria)
+                   for categoria in ('transporte', 'lazer', 'transporte', 'lazer', 'Alimentação', 'Alimentação')]
+        expected = pd.Series([record['Categoria'] for record in records]).mode()[0]
+        snapshot = RollupCube.from_records(records).snapshot()
+
+        line = f'**Categoria de gasto mais frequente**: {expected}'
+        assert line in StatisticsGenerator.from_cube(snapshot).get_summary_text()
+        assert line in TextReport(snapshot=snapshot).summary()
+
+    def test_charts_from_snapshot(self):
+        stats_gen = StatisticsGenerator.from_cube(RollupCube.from_records(self.records).snapshot())
+
+        assert stats_gen.df.empty
+        assert stats_gen.rows == 3
+        assert set(stats_gen.generate_all_statistics()) >= {'gastos_por_categoria', 'evolucao_patrimonio'}
+
+
+if __name__ == '__main__':
+    pytest.main([__file__])
@@ -0,0 +1,127 @@
+import pytest
+import sys
+import os
+import uuid
+from unittest.mock import MagicMock, patch
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.schema import BASE_HEADERS, ISO_COLUMN, Migration, Schema, iso_timestamp
+from src.storage import HEADERS, GoogleSheetsStorage, SQLiteStorage
+
+EXPENSE_ROW = ['15/01/2024 10:30:00', 50.0, 'pix', 'alimentacao', 'mercado', '', '', '']
+
+
+def month(row):
+    return [str(row[0])[3:10]]
+
+
+MONTH = Migration(2, ['Mês'], ['mes'], backfill=month)
+NOTES = Migration(3, ['Notas'], ['notas'])
+
+
+class TestSchema:
+    def setup_method(self):
+        self.schema = Schema([MONTH, NOTES])
+
+    def test_versions_and_headers(self):
+        assert self.schema.version == 3
+        assert self.schema.headers == BASE_HEADERS + ['Mês', 'Notas']
+        assert self.schema.columns[-2:] == ['mes', 'notas']
+
+    def test_version_of(self):
+        assert self.schema.version_of(BASE_HEADERS) == 1
+        assert self.schema.version_of(BASE_HEADERS + ['Mês', '']) == 2
+        assert self.schema.version_of(self.schema.headers + ['Coluna do usuário']) == 3
+        assert self.schema.version_of(BASE_HEADERS[:3]) == 1
+        assert self.schema.version_of([]) == 1
+        assert self.schema.version_of(['Data', 'Valor']) is None
+        assert self.schema.version_of(BASE_HEADERS + ['Coluna do usuário']) is None
+
+    def test_upgrade_row(self):
+        assert self.schema.upgrade_row(EXPENSE_ROW, 1) == EXPENSE_ROW + ['01/2024', '']
+        assert self.schema.upgrade_row(EXPENSE_ROW[:5], 1)[5:] == ['', '', '', '01/2024', '']
+
+    def test_migrations_must_be_sequential(self):
+        with pytest.raises(ValueError):
+            Schema([NOTES])
+
+
+class TestSheetsMigration:
+    def make_storage(self, headers, rows=(), schema=None, col_count=8):
+        spreadsheet = MagicMock()
+        worksheet = spreadsheet.worksheet.return_value
+        worksheet.row_values.return_value = list(headers)
+        worksheet.get_all_values.return_value = [list(headers)] + [list(row) for row in rows]
+        worksheet.col_count = col_count
+        with patch('src.storage.sheets_client'):
+            storage = GoogleSheetsStorage(f'planilha-{uuid.uuid4()}', 'Gastos', spreadsheet=spreadsheet, schema=schema)
+        return storage, worksheet
+
+    def test_missing_headers_written_in_one_call(self):
+        storage, worksheet = self.make_storage(BASE_HEADERS[:5])
+
+        worksheet.batch_update.assert_called_once_with([{'range': 'A1:I1', 'values': [HEADERS]}])
+        worksheet.update_cell.assert_not_called()
+
+    def test_current_headers_are_left_alone(self):
+        storage, worksheet = self.make_storage(HEADERS)
+        worksheet.batch_update.assert_not_called()
+
+    def test_backfill_in_a_single_batch(self):
+        rows = [EXPENSE_ROW, ['03/02/2024 08:00:00', '', '', '', '', 1500.0, '', '']]
+        storage, worksheet = self.make_storage(BASE_HEADERS, rows, schema=Schema([MONTH, NOTES]))
+
+        worksheet.add_cols.assert_called_once_with(2)
+        worksheet.batch_update.assert_called_once()
+        data = worksheet.batch_update.call_args[0][0]
+        assert data[0] == {'range': 'A1:J1', 'values': [BASE_HEADERS + ['Mês', 'Notas']]}
+        assert data[1] == {'range': 'I2:J3', 'values': [['01/2024', ''], ['02/2024', '']]}
+
+    def test_checked_once_per_process(self):
+        storage, worksheet = self.make_storage(HEADERS)
+        worksheet.row_values.reset_mock()
+
+        with patch('src.storage.sheets_client'):
+            GoogleSheetsStorage(storage.sheet_id, 'Gastos', spreadsheet=storage.spreadsheet)
+
+        worksheet.row_values.assert_not_called()
+
+    def test_unknown_headers_are_not_touched(self):
+        storage, worksheet = self.make_storage(['Data', 'Valor', 'Obs'])
+        worksheet.batch_update.assert_not_called()
+
+
+class TestSQLiteMigration:
+    def test_adds_and_backfills_columns(self, tmp_path):
+        path = str(tmp_path / 'finance.db')
+        storage = SQLiteStorage(path)
+        storage.append_rows([EXPENSE_ROW, ['03/02/2024 08:00:00', '', '', '', '', 1500.0, '', '']])
+
+        migrated = SQLiteStorage(path, schema=Schema([MONTH, NOTES]))
+
+        rows = migrated.get_rows()
+        assert [row[8:] for row in rows] == [['01/2024', ''], ['02/2024', '']]
+        migrated.append_row(EXPENSE_ROW + ['01/2024', 'nota'])
+        assert migrated.get_rows(2)[0][9] == 'nota'
+
+
+
+class TestIsoColumn:
+    def test_iso_timestamp(self):
+        assert iso_timestamp('15/01/2024 10:30:00') == '2024-01-15T10:30:00-03:00'
+        assert iso_timestamp('15/01/2018 10:30:00') == '2018-01-15T10:30:00-02:00'
+        assert iso_timestamp('ontem') == ''
+
+    def test_old_sqlite_table_gets_the_iso_column(self, tmp_path):
+        path = str(tmp_path / 'finance.db')
+        SQLiteStorage(path, schema=Schema()).append_rows([EXPENSE_ROW, ['data inválida', '', '', '', '', 10.0, '', '']])
+
+        rows = SQLiteStorage(path).get_rows()
+
+        assert HEADERS[ISO_COLUMN] == 'Data ISO'
+        assert [row[ISO_COLUMN] for row in rows] == ['2024-01-15T10:30:00-03:00', '']
+
+
+if __name__ == '__main__':
+    pytest.main([__file__])
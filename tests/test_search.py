@@ -0,0 +1,113 @@
+import pytest
+import sys
+import os
+import asyncio
+import time
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.search import SearchIndex, fold, tokenize, within_distance, parse_query, PAGE_SIZE
+from src.rollup import ViewRegistry
+from src.storage import InMemoryStorage, SQLiteStorage
+from src.google_sheets import GoogleSheetsManager
+
+
+class TestSearchHelpers:
+    def test_fold_and_tokenize(self):
+        assert fold('Alimentação') == 'alimentacao'
+        assert tokenize('Café-da-manhã (PADARIA)') == ['cafe', 'da', 'manha', 'padaria']
+
+    def test_within_distance(self):
+        assert within_distance('uber', 'ubre', 2)
+        assert within_distance('mercado', 'mercdo', 1)
+        assert not within_distance('uber', 'pix', 1)
+
+    def test_parse_query(self):
+        assert parse_query(['uber']) == ('uber', 1)
+        assert parse_query(['uber', 'centro', 'página', '3']) == ('uber centro', 3)
+        assert parse_query(['pagina', '2']) == ('pagina 2', 1)
+
+
+class TestSearchIndex:
+    def setup_method(self):
+        self.storage = InMemoryStorage()
+        self.manager = GoogleSheetsManager(storage=self.storage)
+        self.manager.add_expense(25.0, 'pix', 'transporte', 'Uber centro')
+        self.manager.add_expense(30.0, 'credito', 'transporte', 'uber aeroporto')
+        self.manager.add_expense(120.0, 'pix', 'alimentacao', 'Mercado São João')
+        self.manager.add_investment(500.0, 'rendafixa')
+        self.index = SearchIndex(self.storage)
+        self.index.load()
+
+    def test_prefix_and_case_insensitive(self):
+        result = self.index.search('UB')
+
+        assert len(result) == 2
+        assert result.totals['despesa'] == 55.0
+        # Mais recentes primeiro
+        assert result.docs[0][2] == 'uber aeroporto'
+
+    def test_accents_and_all_terms(self):
+        assert len(self.index.search('sao joao')) == 1
+        assert len(self.index.search('uber pix')) == 1
+        assert len(self.index.search('uber rendafixa')) == 0
+
+    def test_fuzzy(self):
+        assert len(self.index.search('mercdo')) == 1
+        assert len(self.index.search('xyz')) == 0
+
+    def test_category_of_investment(self):
+        result = self.index.search('renda')
+
+        assert result.totals['investimento'] == 500.0
+
+    def test_incremental_updates(self):
+        self.manager.add_expense(18.0, 'pix', 'transporte', 'uber noite')
+
+        with patch.object(self.storage, 'get_rows', side_effect=AssertionError('leu a planilha')):
+            assert len(self.index.search('uber')) == 3
+
+    def test_pagination(self):
+        self.manager.add_rows([self.manager.expense_row('15/01/2024 10:00:00', 1.0, 'pix', 'cafe', 'cafe')] * 25)
+
+        result = self.index.search('cafe')
+
+        assert result.pages == 3
+        assert len(result.page(1)) == PAGE_SIZE
+        assert len(result.page(3)) == 25 - 2 * PAGE_SIZE
+
+    def test_snapshot_round_trip(self, tmp_path):
+        storage = SQLiteStorage(str(tmp_path / 'finance.db'))
+        storage.append_row(['15/01/2024 10:00:00', 25.0, 'pix', 'transporte', 'Uber', '', '', ''])
+        index = SearchIndex(storage)
+        index.load()
+
+        restored = SearchIndex(storage)
+        restored.restore(index.dump())
+        storage.append_row(['16/01/2024 10:00:00', 30.0, 'pix', 'transporte', 'uber', '', '', ''])
+        restored.load()
+
+        assert len(restored.search('uber')) == 2
+
+
+class TestStaleViews:
+    def test_stale_view_served_while_reloading(self):
+        manager = GoogleSheetsManager(storage=InMemoryStorage())
+        manager.add_expense(25.0, 'pix', 'transporte', 'uber')
+        registry = ViewRegistry(SearchIndex, max_age=60)
+
+        async def scenario():
+            index = await registry.loaded(manager)
+            index.loaded_at = time.monotonic() - 120
+            with patch.object(index, 'load') as load:
+                stale = await registry.loaded(manager, stale_ok=True)
+                assert len(stale.search('uber')) == 1
+                await asyncio.sleep(0.1)
+            return load.call_count
+
+        assert asyncio.run(scenario()) == 1
+
+
+if __name__ == '__main__':
+    pytest.main([__file__])
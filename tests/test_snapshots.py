@@ -0,0 +1,170 @@
+import pytest
+import sys
+import os
+import asyncio
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.snapshots import WarmState
+from src.rollup import CubeRegistry, cubes
+from src.reports import Report, ReportService, build_report
+from src.budgets import current_month
+from src.storage import SQLiteStorage, InMemoryStorage
+from src.google_sheets import GoogleSheetsManager
+from src.webhook_server import RecentUpdates
+from src.categories import NameResolver
+from src.local_store import JsonStore
+
+
+def local_resolver(path):
+    return NameResolver(JsonStore('categories', path=f'{path}.categories.json'))
+
+
+class TestWarmState:
+    def setup_method(self):
+        self.values = {'a': 1}
+        self.restored = []
+
+    def make_state(self, path):
+        state = WarmState(path=path)
+        state.register('teste', lambda: dict(self.values), self.restored.append)
+        return state
+
+    def test_round_trip(self, tmp_path):
+        path = str(tmp_path / 'warm_state.json.gz')
+        assert self.make_state(path).save()
+
+        assert self.make_state(path).restore()
+        assert self.restored == [{'a': 1}]
+
+    def test_skips_unchanged_state(self, tmp_path):
+        state = self.make_state(str(tmp_path / 'warm_state.json.gz'))
+
+        assert state.save()
+        assert not state.save()
+        self.values['a'] = 2
+        assert state.save()
+
+    def test_ignores_other_backend(self, tmp_path):
+        path = str(tmp_path / 'warm_state.json.gz')
+        with patch('src.snapshots.backend_name', return_value='sqlite'):
+            self.make_state(path).save()
+
+        with patch('src.snapshots.backend_name', return_value='sheets'):
+            assert not self.make_state(path).restore()
+        assert self.restored == []
+
+    def test_missing_or_corrupt_file(self, tmp_path):
+        path = tmp_path / 'warm_state.json.gz'
+        assert not self.make_state(str(path)).restore()
+
+        path.write_bytes(b'lixo')
+        assert not self.make_state(str(path)).restore()
+
+
+class TestCubeReconciliation:
+    def setup_method(self):
+        self.registry = CubeRegistry()
+
+    def manager(self, path):
+        return GoogleSheetsManager(storage=SQLiteStorage(path), tenant='snapshot', resolver=local_resolver(path))
+
+    def test_restored_cube_reads_only_new_rows(self, tmp_path):
+        path = str(tmp_path / 'finance.db')
+        manager, registry = self.manager(path), CubeRegistry()
+        manager.add_expense(100.0, 'pix', 'alimentacao', 'mercado')
+        manager.add_expense(20.0, 'pix', 'alimentacao', 'padaria')
+        asyncio.run(registry.loaded(manager))
+        states = registry.dump()
+
+        # Novo processo: mesmo banco, cubo vindo do snapshot
+        manager, registry = self.manager(path), CubeRegistry()
+        registry.restore(states)
+        manager.add_expense(5.0, 'pix', 'alimentacao', 'cafe')
+        get_rows = manager.storage.get_rows
+        with patch.object(manager.storage, 'get_rows', side_effect=get_rows) as read:
+            cube = asyncio.run(registry.loaded(manager))
+
+        read.assert_called_once_with(2)
+        assert cube.month_total('despesa', 'alimentacao', current_month()) == 125.0
+        assert cube.rows == 3
+
+    def test_full_reload_when_rows_were_removed(self, tmp_path):
+        path = str(tmp_path / 'finance.db')
+        manager, registry = self.manager(path), CubeRegistry()
+        manager.add_expense(100.0, 'pix', 'alimentacao', 'mercado')
+        asyncio.run(registry.loaded(manager))
+        states = registry.dump()
+
+        manager, registry = self.manager(path), CubeRegistry()
+        manager.storage.clear()
+        registry.restore(states)
+        cube = asyncio.run(registry.loaded(manager))
+
+        assert cube.rows == 0
+        assert cube.month_total('despesa', 'alimentacao', current_month()) == 0.0
+
+    def test_memory_backend_is_not_persisted(self):
+        manager = GoogleSheetsManager(storage=InMemoryStorage(), tenant='snapshot')
+        asyncio.run(self.registry.loaded(manager))
+
+        assert self.registry.dump() == {}
+
+
+class TestRestoredReports:
+    def test_restored_report_served_until_new_rows(self, tmp_path):
+        path = str(tmp_path / 'finance.db')
+        manager = GoogleSheetsManager(storage=SQLiteStorage(path), tenant='snapshot_reports', resolver=local_resolver(path))
+        manager.add_expense(50.0, 'pix', 'alimentacao', 'mercado')
+        service = ReportService(cooldown=0)
+        asyncio.run(service.get(manager, 'texto'))
+        states = cubes.dump(), service.dump()
+
+        manager = GoogleSheetsManager(storage=SQLiteStorage(path), tenant='snapshot_reports', resolver=local_resolver(path))
+        service = ReportService(cooldown=0)
+        cubes.restore(states[0])
+        service.restore(states[1])
+        with patch('src.reports.build_text_report', side_effect=AssertionError('recalculou')):
+            report = asyncio.run(service.get(manager, 'texto'))
+
+        assert 'alimentacao' in report.summary
+        assert report.version == manager.storage.version
+
+        manager.add_expense(10.0, 'pix', 'transporte', 'onibus')
+        assert 'transporte' in asyncio.run(service.get(manager, 'texto')).summary
+
+    def test_chart_report_round_trip(self):
+        manager = GoogleSheetsManager(storage=InMemoryStorage())
+        manager.add_expense(50.0, 'pix', 'alimentacao', 'mercado')
+        report = build_report(manager)
+
+        restored = Report.restore(report.dump())
+
+        assert restored.charts == report.charts
+        assert restored.summary == report.summary
+
+
+class TestRecentUpdates:
+    def test_window(self):
+        updates = RecentUpdates(size=2)
+
+        assert not updates.seen(1)
+        assert updates.seen(1)
+        assert not updates.seen(2)
+        assert not updates.seen(3)
+        assert not updates.seen(1)
+
+    def test_forget_and_restore(self):
+        updates = RecentUpdates(size=10)
+        updates.seen(1)
+        updates.forget(1)
+        assert not updates.seen(1)
+
+        restored = RecentUpdates(size=10)
+        restored.restore(updates.dump())
+        assert restored.seen(1)
+
+
+if __name__ == '__main__':
+    pytest.main([__file__])
@@ -192,5 +192,16 @@ class TestStatisticsGenerator:
         assert stats.df['Data e Hora'].dtype == 'datetime64[ns]'
         assert len(stats.df['Data'].unique()) == 2
 
+    def test_iso_column_preferred_over_legacy_date(self):
+        records = [dict(record, **{'Data ISO': ''}) for record in self.sample_data]
+        # Data e Hora em outro formato: só a Data ISO é lida
+        records[0].update({'Data e Hora': '2024-01-20 10:30', 'Data ISO': '2024-01-20T10:30:00-03:00'})
+        stats = StatisticsGenerator(records)
+
+        assert stats.df['Data e Hora'].dtype == 'datetime64[ns]'
+        assert stats.df['Data e Hora'].iloc[0] == datetime(2024, 1, 20, 10, 30)
+        assert stats.df['Data e Hora'].iloc[1] == datetime(2024, 1, 15, 11, 0)
+
+
 if __name__ == '__main__':
-    pytest.main([__file__]) 
\ No newline at end of file
+    pytest.main([__file__])
@@ -0,0 +1,124 @@
+import pytest
+import sys
+import os
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.storage import InMemoryStorage, SQLiteStorage, HEADERS, create_storage
+from src.google_sheets import GoogleSheetsManager
+from src.backups import BackupStore
+
+EXPENSE_ROW = ['15/01/2024 10:30:00', 50.0, 'pix', 'alimentacao', 'mercado', '', '', '', '2024-01-15T10:30:00-03:00']
+CREDIT_ROW = ['15/01/2024 11:00:00', '', '', '', '', 1500.0, '', '', '2024-01-15T11:00:00-03:00']
+INVESTMENT_ROW = ['16/01/2024 09:00:00', '', '', '', '', '', 500.0, 'rendafixa', '2024-01-16T09:00:00-03:00']
+
+
+class StorageContract:
+    def make_storage(self, tmp_path):
+        raise NotImplementedError
+
+    def test_append_and_count(self, tmp_path):
+        storage = self.make_storage(tmp_path)
+
+        assert storage.count() == 0 and storage.is_empty()
+        assert storage.append_row(EXPENSE_ROW) == 2
+        assert storage.append_row(CREDIT_ROW) == 3
+        assert storage.count() == 2 and not storage.is_empty()
+
+    def test_append_rows_in_bulk(self, tmp_path):
+        storage = self.make_storage(tmp_path)
+        storage.append_row(EXPENSE_ROW)
+
+        first = storage.append_rows([CREDIT_ROW, INVESTMENT_ROW])
+
+        assert first == 3
+        assert storage.count() == 3
+
+    def test_range_read(self, tmp_path):
+        storage = self.make_storage(tmp_path)
+        storage.append_rows([EXPENSE_ROW, CREDIT_ROW, INVESTMENT_ROW])
+
+        assert storage.get_rows() == [EXPENSE_ROW, CREDIT_ROW, INVESTMENT_ROW]
+        assert storage.get_rows(1) == [CREDIT_ROW, INVESTMENT_ROW]
+        assert storage.get_rows(0, 1) == [EXPENSE_ROW]
+        assert storage.get_rows(3) == []
+
+    def test_records_use_headers(self, tmp_path):
+        storage = self.make_storage(tmp_path)
+        storage.append_row(EXPENSE_ROW)
+
+        record = storage.get_records()[0]
+
+        assert list(record.keys()) == HEADERS
+        assert record['Categoria'] == 'alimentacao'
+        assert record['Créditos'] == ''
+
+    def test_clear(self, tmp_path):
+        storage = self.make_storage(tmp_path)
+        storage.append_rows([EXPENSE_ROW, CREDIT_ROW])
+
+        storage.clear()
+
+        assert storage.count() == 0
+        assert storage.append_row(INVESTMENT_ROW) == 2
+
+
+class TestInMemoryStorage(StorageContract):
+    def make_storage(self, tmp_path):
+        return InMemoryStorage()
+
+
+class TestSQLiteStorage(StorageContract):
+    def make_storage(self, tmp_path):
+        return SQLiteStorage(str(tmp_path / 'finance.db'))
+
+    def test_indexes_created(self, tmp_path):
+        storage = self.make_storage(tmp_path)
+
+        indexes = {row[1] for row in storage._conn.execute("PRAGMA index_list('transacoes')")}
+
+        assert {'idx_transacoes_timestamp', 'idx_transacoes_tipo', 'idx_transacoes_categoria'} <= indexes
+
+    def test_persists_between_connections(self, tmp_path):
+        self.make_storage(tmp_path).append_row(EXPENSE_ROW)
+
+        assert self.make_storage(tmp_path).count() == 1
+
+
+class TestStorageFactory:
+    def test_create_memory_backend(self):
+        assert isinstance(create_storage('memory'), InMemoryStorage)
+
+    def test_unknown_backend(self):
+        with pytest.raises(ValueError):
+            create_storage('planilha')
+
+
+class TestGoogleSheetsManagerWithStorage:
+    def setup_method(self):
+        self.storage = InMemoryStorage()
+        self.manager = GoogleSheetsManager(storage=self.storage)
+
+    def test_add_transactions(self):
+        assert self.manager.add_expense(50.0, 'Cartão Visa', 'Alimentação', 'mercado')
+        assert self.manager.add_credit(1500.0)
+        assert self.manager.add_investment(500.0, 'Renda Fixa')
+
+        records = self.manager.get_all_data()
+
+        assert len(records) == 3
+        assert records[0]['Tipo de pagamento'] == 'Cartão Visa'
+        assert records[1]['Créditos'] == 1500.0
+        assert records[2]['Categoria Investimento'] == 'Renda Fixa'
+
+    def test_clear_table(self, tmp_path):
+        self.manager.add_credit(100.0)
+
+        with patch('src.google_sheets.backups', BackupStore(str(tmp_path))) as backups:
+            assert self.manager.clear_table()
+        assert self.manager.get_all_data() == []
+        assert [backup['rows'] for backup in backups.list('default')] == [1]
+
+if __name__ == '__main__':
+    pytest.main([__file__])
@@ -0,0 +1,151 @@
+import pytest
+import sys
+import os
+import json
+import asyncio
+from unittest.mock import MagicMock, patch
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.storage import configure_storage, InMemoryStorage, HEADERS
+from src.tenants import (
+    TenantRouter, LRUCache, HandleRegistry, TenantWriteScheduler, QuotaExceeded, DEFAULT_TENANT
+)
+
+
+class TestTenantRouter:
+    def test_single_mode_uses_default_tenant(self):
+        router = TenantRouter(mode='single')
+
+        assert router.resolve(123) == DEFAULT_TENANT
+        assert router.resolve(None) == DEFAULT_TENANT
+
+    def test_chat_mode_gives_each_chat_a_tenant(self):
+        router = TenantRouter(mode='chat')
+
+        assert router.resolve(123) == 'chat_123'
+        assert router.resolve(456) == 'chat_456'
+
+    def test_tenants_file_groups_chats(self, tmp_path):
+        tenants_file = tmp_path / 'tenants.json'
+        tenants_file.write_text(json.dumps({
+            'familia': {'chats': [123, '456'], 'sheet_id': 'abc', 'sheet_name': 'Familia'}
+        }))
+        router = TenantRouter(mode='chat', tenants_file=str(tenants_file))
+
+        assert router.resolve(123) == 'familia'
+        assert router.resolve(456) == 'familia'
+        assert router.resolve(789) == 'chat_789'
+        assert router.spec('familia')['sheet_name'] == 'Familia'
+        assert router.spec('chat_789')['sheet_name'] == 'chat_789'
+
+
+class TestLRUCache:
+    def test_evicts_least_recently_used(self):
+        cache = LRUCache(2)
+        cache.get_or_create('a', lambda: 1)
+        cache.get_or_create('b', lambda: 2)
+        cache.get_or_create('a', lambda: 99)
+        cache.get_or_create('c', lambda: 3)
+
+        assert 'a' in cache
+        assert 'b' not in cache
+        assert len(cache) == 2
+
+
+class TestHandleRegistry:
+    def setup_method(self):
+        self.default_storage = InMemoryStorage()
+        configure_storage(self.default_storage)
+
+    def teardown_method(self):
+        configure_storage(None)
+
+    def test_default_tenant_uses_global_storage(self):
+        registry = HandleRegistry(TenantRouter(mode='chat'))
+
+        assert registry.get(DEFAULT_TENANT) is self.default_storage
+
+    def test_memory_tenants_survive_eviction(self):
+        registry = HandleRegistry(TenantRouter(mode='chat'), maxsize=1)
+        first = registry.get('chat_1')
+        first.append_row(['15/01/2024 10:30:00', 50.0, 'pix', 'alimentacao', 'mercado', '', '', ''])
+        registry.get('chat_2')
+
+        assert registry.get('chat_1') is first
+        assert registry.get('chat_1').count() == 1
+        assert registry.get('chat_2').count() == 0
+
+    def test_sheets_handle_opens_on_first_access(self):
+        registry = HandleRegistry(TenantRouter(mode='chat'))
+        spreadsheet = MagicMock()
+        spreadsheet.worksheet.return_value.row_values.return_value = list(HEADERS)
+        spreadsheet.worksheet.return_value.col_values.return_value = ['Data e Hora']
+
+        with patch('src.storage.backend_name', return_value='sheets'), patch('src.storage.sheets_client'), \
+                patch('src.storage.open_spreadsheet', return_value=spreadsheet) as open_spreadsheet:
+            handle = registry.get('chat_1')
+            open_spreadsheet.assert_not_called()
+
+            assert handle.count() == 0
+            assert registry.get('chat_2').count() == 0
+
+        open_spreadsheet.assert_called_once()
+        assert [c.args[0] for c in spreadsheet.worksheet.call_args_list] == ['chat_1', 'chat_2']
+
+
+class TestTenantWriteScheduler:
+    def test_runs_write_and_returns_result(self):
+        scheduler = TenantWriteScheduler(workers=1, rate_per_minute=60, burst=5)
+
+        result = asyncio.run(scheduler.submit('chat_1', lambda a, b: a + b, 2, 3))
+
+        assert result == 5
+        assert scheduler.pending('chat_1') == 0
+
+    def test_quota_is_per_chat(self):
+        scheduler = TenantWriteScheduler(workers=1, rate_per_minute=1, burst=2)
+
+        async def scenario():
+            await scheduler.submit(DEFAULT_TENANT, lambda: True, quota_key=1)
+            await scheduler.submit(DEFAULT_TENANT, lambda: True, quota_key=1)
+            with pytest.raises(QuotaExceeded):
+                await scheduler.submit(DEFAULT_TENANT, lambda: True, quota_key=1)
+            # Outro chat na mesma planilha ainda tem cota
+            return await scheduler.submit(DEFAULT_TENANT, lambda: 'ok', quota_key=2)
+
+        assert asyncio.run(scenario()) == 'ok'
+
+    def test_quotas_are_bounded(self):
+        scheduler = TenantWriteScheduler(workers=1, rate_per_minute=60, burst=5, max_buckets=2)
+
+        async def scenario():
+            for chat_id in range(10):
+                await scheduler.submit(DEFAULT_TENANT, lambda: True, quota_key=chat_id)
+
+        asyncio.run(scenario())
+        assert len(scheduler._buckets) == 2
+        assert 9 in scheduler._buckets and 0 not in scheduler._buckets
+
+    def test_writes_of_a_tenant_are_serialized(self):
+        scheduler = TenantWriteScheduler(workers=4, rate_per_minute=600, burst=50)
+        active = []
+        overlaps = []
+
+        def write():
+            import time
+            active.append(1)
+            overlaps.append(len(active))
+            time.sleep(0.01)
+            active.pop()
+
+        async def scenario():
+            await asyncio.gather(*[scheduler.submit('chat_1', write) for _ in range(5)])
+
+        asyncio.run(scenario())
+
+        assert max(overlaps) == 1
+
+
+if __name__ == '__main__':
+    pytest.main([__file__])
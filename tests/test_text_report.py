@@ -0,0 +1,95 @@
+import pytest
+import sys
+import os
+import asyncio
+import subprocess
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.text_report import TextReport, bar, sparkline, bucket
+from src.reports import ReportService, parse_format
+from src.storage import InMemoryStorage
+from src.google_sheets import GoogleSheetsManager
+
+
+class TestTextHelpers:
+    def test_sparkline(self):
+        assert sparkline([0, 1, 2, 3, 4, 5, 6, 7]) == '▁▂▃▄▅▆▇█'
+        assert sparkline([5, 5]) == '▁▁'
+        assert sparkline([]) == ''
+
+    def test_bar(self):
+        assert bar(10, 10, width=4) == '████'
+        assert bar(5, 10, width=4) == '██'
+        assert bar(0, 10) == ''
+
+    def test_bucket(self):
+        assert bucket([1, 2, 3, 4], 2, sum) == [3, 7]
+        assert bucket([1, 2], 5, sum) == [1, 2]
+
+    def test_parse_format(self):
+        assert parse_format('TEXTO') == 'texto'
+        assert parse_format('gráficos') == 'graficos'
+        assert parse_format('pdf') is None
+
+
+class TestTextReport:
+    def setup_method(self):
+        self.records = [
+            {'Data e Hora': '15/01/2024 10:30:00', 'Valor (R$)': '50.00', 'Tipo de pagamento': 'pix',
+             'Categoria': 'alimentacao', 'Descrição': 'mercado', 'Créditos': '', 'Investimento': '',
+             'Categoria Investimento': ''},
+            {'Data e Hora': '15/01/2024 11:00:00', 'Valor (R$)': '', 'Tipo de pagamento': '',
+             'Categoria': '', 'Descrição': '', 'Créditos': '1500,00', 'Investimento': '',
+             'Categoria Investimento': ''},
+            {'Data e Hora': '16/02/2024 09:00:00', 'Valor (R$)': '', 'Tipo de pagamento': '',
+             'Categoria': '', 'Descrição': '', 'Créditos': '', 'Investimento': 500,
+             'Categoria Investimento': 'rendafixa'},
+        ]
+
+    def test_totals(self):
+        report = TextReport(self.records)
+
+        assert report.total_debitos == 50.0
+        assert report.total_creditos == 1500.0
+        assert report.total_investimentos == 500.0
+        assert report.saldo_liquido == 950.0
+
+    def test_render_sections(self):
+        text = TextReport(self.records).render()
+
+        assert 'R$ 950.00' in text
+        assert 'GASTOS POR CATEGORIA' in text
+        assert 'INVESTIMENTOS POR CATEGORIA' in text
+        assert '01/2024' in text
+        assert 'EVOLUÇÃO DO PATRIMÔNIO' in text
+        assert len(text) < 4096
+
+    def test_empty(self):
+        assert TextReport([]).render() is None
+
+    def test_served_through_report_service(self):
+        manager = GoogleSheetsManager(storage=InMemoryStorage())
+        manager.add_expense(50.0, 'pix', 'alimentacao', 'mercado')
+
+        report = asyncio.run(ReportService(cooldown=0).get(manager, 'texto'))
+
+        assert report.charts == {}
+        assert 'alimentacao' in report.summary
+
+    def test_bot_never_imports_matplotlib(self):
+        code = (
+            "import sys; sys.path.insert(0, '.');"
+            "import src.bot;"
+            "from src.text_report import TextReport;"
+            "TextReport([{'Data e Hora': '15/01/2024 10:30:00', 'Valor (R$)': 1}]).render();"
+            "assert 'matplotlib' not in sys.modules"
+        )
+        root = os.path.join(os.path.dirname(__file__), '..')
+        result = subprocess.run([sys.executable, '-c', code], cwd=root, capture_output=True, text=True)
+
+        assert result.returncode == 0, result.stderr
+
+
+if __name__ == '__main__':
+    pytest.main([__file__])
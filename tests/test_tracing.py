@@ -0,0 +1,174 @@
+import pytest
+import sys
+import os
+import asyncio
+import logging
+import pstats
+from unittest.mock import Mock, AsyncMock, patch
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.tracing import traced_handler, span, current_trace
+from src.profiling import StatisticsProfiler, profiled, profile_in_thread, profiler, is_admin
+from src.reports import Cooldown, ReportService
+from src.storage import InMemoryStorage
+from src.google_sheets import GoogleSheetsManager
+
+
+class TestTracing:
+    def make_update(self):
+        update = Mock()
+        update.update_id = 42
+        update.effective_chat.id = 1001
+        return update
+
+    def test_spans_exported_as_structured_log(self, caplog):
+        @traced_handler('statistics')
+        async def handler(update, context):
+            with span('storage'):
+                pass
+            with span('render', chart='gastos_por_dia'):
+                pass
+
+        with caplog.at_level(logging.INFO, logger='src.tracing'):
+            asyncio.run(handler(self.make_update(), Mock()))
+
+        trace = caplog.records[-1].trace
+        assert trace['handler'] == 'statistics'
+        assert trace['update_id'] == 42
+        assert trace['chat_id'] == 1001
+        assert [s['name'] for s in trace['spans']] == ['storage', 'render']
+        assert trace['spans'][1]['chart'] == 'gastos_por_dia'
+        assert trace['duration_ms'] >= 0
+
+    def test_error_recorded(self, caplog):
+        @traced_handler('handle_transaction')
+        async def handler(update, context):
+            raise ValueError('falhou')
+
+        with caplog.at_level(logging.INFO, logger='src.tracing'):
+            with pytest.raises(ValueError):
+                asyncio.run(handler(self.make_update(), Mock()))
+
+        assert 'ValueError' in caplog.records[-1].trace['error']
+
+    def test_span_outside_trace_is_noop(self):
+        with span('parse'):
+            assert current_trace() is None
+
+
+class TestProfiling:
+    def test_profiler_counts_down(self):
+        stats_profiler = StatisticsProfiler()
+        stats_profiler.arm(2, 10)
+
+        assert stats_profiler.take() == 10
+        assert stats_profiler.take() == 10
+        assert stats_profiler.take() is None
+
+    def test_is_admin(self):
+        with patch.dict(os.environ, {'ADMIN_CHAT_IDS': '10, 20'}):
+            assert is_admin(10)
+            assert not is_admin(30)
+
+    def test_profiled_sends_profile_files(self):
+        @profiled('statistics')
+        async def handler(update, context):
+            return await asyncio.to_thread(profile_in_thread(sum), range(1000))
+
+        context = Mock()
+        context.bot.send_document = AsyncMock()
+        profiler.arm(1, 99)
+
+        asyncio.run(handler(Mock(), context))
+        asyncio.run(handler(Mock(), context))
+
+        assert context.bot.send_document.await_count == 2
+        filenames = [call.kwargs['document'].filename for call in context.bot.send_document.await_args_list]
+        assert filenames[0].endswith('.prof')
+        assert filenames[1].endswith('.txt')
+
+    def test_concurrent_calls_only_measure_their_own_work(self):
+        def build_a():
+            return sorted(range(1000))
+
+        def build_b():
+            return max(range(1000))
+
+        @profiled('statistics')
+        async def handler(update, context, build):
+            await asyncio.sleep(0.01)
+            return await asyncio.to_thread(profile_in_thread(build))
+
+        profiles = {}
+
+        async def capture(bot, chat_id, name, *found, outcome=None):
+            profiles[len(profiles)] = {func for profile in found for (_, _, func) in pstats.Stats(profile).stats}
+
+        async def run():
+            await asyncio.gather(handler(Mock(), Mock(), build_a), handler(Mock(), Mock(), build_b))
+
+        profiler.arm(2, 99)
+        with patch('src.profiling._send_profile', side_effect=capture):
+            asyncio.run(run())
+
+        assert sorted(('build_a' in f, 'build_b' in f) for f in profiles.values()) == [(False, True), (True, False)]
+
+    def make_context(self):
+        context = Mock()
+        context.bot.send_message = AsyncMock()
+        context.bot.send_document = AsyncMock()
+        return context
+
+    def test_cached_call_sends_a_note(self):
+        service = ReportService(cooldown=0)
+        manager = GoogleSheetsManager(storage=InMemoryStorage())
+        manager.add_expense(50.0, 'pix', 'alimentacao', 'mercado')
+        asyncio.run(service.get(manager, 'texto'))
+
+        @profiled('statistics')
+        async def handler(update, context):
+            return await service.get(manager, 'texto')
+
+        context = self.make_context()
+        profiler.arm(1, 99)
+        asyncio.run(handler(Mock(), context))
+
+        context.bot.send_document.assert_not_awaited()
+        assert 'veio do cache' in context.bot.send_message.await_args.kwargs['text']
+
+    def test_coalesced_call_is_not_reported_as_cache(self):
+        service = ReportService(cooldown=0)
+        manager = GoogleSheetsManager(storage=InMemoryStorage())
+        manager.add_expense(50.0, 'pix', 'alimentacao', 'mercado')
+
+        @profiled('statistics')
+        async def handler(update, context):
+            return await service.get(manager, 'texto')
+
+        async def run(context):
+            await asyncio.gather(handler(Mock(), context), handler(Mock(), context))
+
+        context = self.make_context()
+        profiler.arm(2, 99)
+        asyncio.run(run(context))
+
+        assert context.bot.send_document.await_count == 2
+        assert 'unido a um cálculo já em andamento' in context.bot.send_message.await_args.kwargs['text']
+
+    def test_cooldown_is_reported(self):
+        cooldown = Cooldown(60)
+        cooldown.hit(1)
+
+        @profiled('statistics')
+        async def handler(update, context):
+            return cooldown.hit(1)
+
+        context = self.make_context()
+        profiler.arm(1, 99)
+        asyncio.run(handler(Mock(), context))
+
+        assert 'recusado pelo cooldown' in context.bot.send_message.await_args.kwargs['text']
+
+if __name__ == '__main__':
+    pytest.main([__file__])
@@ -0,0 +1,78 @@
+import pytest
+import sys
+import os
+import time
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.warmup import Warmup, warm_matplotlib
+from src import webhook_server
+
+
+class TestWarmup:
+    def setup_method(self):
+        self.warmup = Warmup()
+
+    def test_tasks_run_concurrently(self):
+        started = time.perf_counter()
+        self.warmup.start({'a': lambda: time.sleep(0.3), 'b': lambda: time.sleep(0.3)})
+
+        assert self.warmup.wait(timeout=5)
+        assert time.perf_counter() - started < 0.55
+        status = self.warmup.status()
+        assert status['ready'] and not status['degraded']
+        assert status['stages']['a']['seconds'] >= 0.3
+
+    def test_failed_stage_is_reported(self):
+        def fail():
+            raise RuntimeError('sem credenciais')
+
+        self.warmup.start({'storage': fail})
+        self.warmup.wait(timeout=5)
+
+        stage = self.warmup.status()['stages']['storage']
+        assert stage['status'] == 'failed'
+        assert 'sem credenciais' in stage['error']
+        assert self.warmup.status()['degraded']
+
+    def test_pending_stage_blocks_readiness(self):
+        self.warmup.expect('telegram')
+
+        assert not self.warmup.ready
+        assert not self.warmup.wait('telegram', timeout=0.05)
+
+        with self.warmup.stage('telegram'):
+            pass
+
+        assert self.warmup.ready
+        assert self.warmup.wait('telegram', timeout=0)
+
+    def test_warm_matplotlib(self):
+        warm_matplotlib()
+
+
+class TestHealthEndpoint:
+    def setup_method(self):
+        self.warmup = Warmup()
+        self.client = webhook_server.app.test_client()
+
+    def test_reports_readiness_and_stages(self):
+        self.warmup.expect('telegram')
+        with patch.object(webhook_server, 'warmup', self.warmup):
+            response = self.client.get('/health')
+            assert response.status_code == 503
+            assert response.get_json()['status'] == 'starting'
+
+            with self.warmup.stage('telegram'):
+                pass
+            response = self.client.get('/health')
+
+        body = response.get_json()
+        assert response.status_code == 200
+        assert body['status'] == 'healthy'
+        assert body['stages']['telegram']['status'] == 'ok'
+
+
+if __name__ == '__main__':
+    pytest.main([__file__])